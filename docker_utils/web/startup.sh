@@ -2,5 +2,9 @@
 
 python manage.py migrate
 python manage.py collectstatic --no-input
+# Requests spend most of their time waiting on storage backends, so each
+# worker process serves several at once in threads.
 gunicorn --env DJANGO_SETTINGS_MODULE=sky_write_django.settings \
-  sky_write_django.wsgi --bind 0.0.0.0:8000 --workers 4 "$RELOAD"
+  sky_write_django.wsgi --bind 0.0.0.0:8000 \
+  --workers "${WEB_WORKERS:-4}" --worker-class gthread \
+  --threads "${WEB_THREADS:-16}" "$RELOAD"
@@ -0,0 +1,36 @@
+import typing as t
+
+from sky_write_app.backends.base import ObjectStat, StorageBackend
+from sky_write_app.backends.dropbox import DropboxStorageBackend
+from sky_write_app.backends.local import LocalStorageBackend
+from sky_write_app.backends.s3 import S3StorageBackend
+from sky_write_app.clients import dropbox_clients, s3_clients
+from sky_write_django.settings import LOCAL_STORAGE_ROOT, S3_BUCKET
+from users_app.models import CustomConfig, DefaultStorage
+
+__all__ = [
+    "DropboxStorageBackend",
+    "LocalStorageBackend",
+    "ObjectStat",
+    "S3StorageBackend",
+    "StorageBackend",
+    "get_backend",
+    "get_content_name",
+]
+
+
+def get_backend(config: CustomConfig) -> t.Optional[StorageBackend]:
+    """Return the backend for a user's default storage, or ``None`` if
+    they haven't chosen one yet."""
+    if config.default_storage == DefaultStorage.DROPBOX:
+        return DropboxStorageBackend(dropbox_clients.get(config))
+    if config.default_storage == DefaultStorage.S3:
+        return S3StorageBackend(s3_clients.get(), S3_BUCKET, f"{config.user_id}/")
+    if config.default_storage == DefaultStorage.LOCAL_STORAGE:
+        return LocalStorageBackend(LOCAL_STORAGE_ROOT)
+    return None
+
+
+def get_content_name(storage_object) -> str:
+    """The name under which a file's content is stored."""
+    return f"{str(storage_object.file_uuid)}.txt"
@@ -0,0 +1,93 @@
+import itertools
+import typing as t
+from datetime import datetime
+
+from sky_write_django.settings import STORAGE_CHUNK_SIZE
+
+
+def batched(iterable: t.Iterable, size: int) -> t.Iterator[list]:
+    """Split an iterable into lists of at most ``size`` items."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class ObjectStat(t.NamedTuple):
+    size: int
+    modified: datetime
+
+
+class StorageBackend:
+    """
+    Interface for places where file content is kept.
+
+    Content is addressed by name and handled as bytes. Reading and
+    writing go through file-like objects, so content can be streamed in
+    chunks rather than held in memory all at once. Missing content is
+    reported with ``FileNotFoundError``.
+    """
+
+    chunk_size = STORAGE_CHUNK_SIZE
+
+    def open_read(self, name: str) -> t.ContextManager[t.BinaryIO]:
+        """Return a context manager for a readable binary file."""
+        raise NotImplementedError
+
+    def open_write(self, name: str) -> t.ContextManager[t.BinaryIO]:
+        """Return a context manager for a writable binary file. The
+        content replaces any existing content when the block exits
+        without an exception, and is discarded otherwise."""
+        raise NotImplementedError
+
+    def delete(self, name: str):
+        raise NotImplementedError
+
+    def try_delete(self, name: str) -> t.Optional[str]:
+        """Delete content, returning an error message rather than raising
+        if that fails. Missing content counts as deleted."""
+        try:
+            self.delete(name)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            return str(e) or type(e).__name__
+        return None
+
+    def delete_many(self, names: t.Iterable[str]) -> t.Dict[str, str]:
+        """Delete content in bulk, carrying on past failures. Returns an
+        error message for each name that couldn't be deleted."""
+        failures = {}
+        for name in names:
+            error = self.try_delete(name)
+            if error is not None:
+                failures[name] = error
+        return failures
+
+    def stat(self, name: str) -> ObjectStat:
+        raise NotImplementedError
+
+    def exists(self, name: str) -> bool:
+        try:
+            self.stat(name)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def iter_chunks(self, name: str) -> t.Iterator[bytes]:
+        """Yield content in chunks of at most ``chunk_size`` bytes."""
+        with self.open_read(name) as file:
+            while True:
+                chunk = file.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def read(self, name: str) -> bytes:
+        return b"".join(self.iter_chunks(name))
+
+    def write(self, name: str, content: bytes):
+        with self.open_write(name) as file:
+            file.write(content)
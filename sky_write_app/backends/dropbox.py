@@ -0,0 +1,181 @@
+import io
+import time
+from contextlib import contextmanager
+from datetime import timezone
+
+from dropbox import Dropbox
+from dropbox.exceptions import ApiError
+from dropbox.files import CommitInfo, DeleteArg, UploadSessionCursor, WriteMode
+
+from sky_write_app.backends.base import ObjectStat, StorageBackend, batched
+from sky_write_django.settings import DBX_UPLOAD_CHUNK_SIZE
+
+# The most paths Dropbox accepts in one batch delete
+DELETE_BATCH_SIZE = 1000
+# Longest wait between checks on a batch delete that is still running
+DELETE_BATCH_MAX_POLL_INTERVAL = 2
+
+
+def is_not_found(error: ApiError):
+    """Whether a Dropbox API error means that a path doesn't exist."""
+    return is_lookup_not_found(error.error)
+
+
+def is_lookup_not_found(lookup_error):
+    """Whether the error union of a Dropbox route means that a path
+    doesn't exist."""
+    if getattr(lookup_error, "is_path", lambda: False)():
+        lookup_error = lookup_error.get_path()
+    elif getattr(lookup_error, "is_path_lookup", lambda: False)():
+        lookup_error = lookup_error.get_path_lookup()
+    return getattr(lookup_error, "is_not_found", lambda: False)()
+
+
+class DropboxUploadWriter(io.RawIOBase):
+    """
+    A writable file that uploads to Dropbox.
+
+    Content is buffered up to ``chunk_size`` bytes. Small content is sent
+    with a single upload when the file is closed; larger content is sent
+    in chunks through an upload session, which is committed on close.
+    """
+
+    def __init__(self, client: Dropbox, path: str, chunk_size: int):
+        super().__init__()
+        self.client = client
+        self.path = path
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.session_id = None
+        self.offset = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.chunk_size:
+            chunk = bytes(self.buffer[: self.chunk_size])
+            del self.buffer[: self.chunk_size]
+            self.send_chunk(chunk)
+        return len(data)
+
+    def send_chunk(self, chunk):
+        if self.session_id is None:
+            self.session_id = self.client.files_upload_session_start(chunk).session_id
+        else:
+            self.client.files_upload_session_append_v2(chunk, self.get_cursor())
+        self.offset += len(chunk)
+
+    def get_cursor(self):
+        return UploadSessionCursor(session_id=self.session_id, offset=self.offset)
+
+    def commit(self):
+        if self.session_id is None:
+            self.client.files_upload(
+                bytes(self.buffer), self.path, mode=WriteMode.overwrite
+            )
+        else:
+            self.client.files_upload_session_finish(
+                bytes(self.buffer),
+                self.get_cursor(),
+                CommitInfo(path=self.path, mode=WriteMode.overwrite),
+            )
+        self.buffer.clear()
+
+
+class DropboxStorageBackend(StorageBackend):
+    """Content kept in the root of the app folder in a user's Dropbox."""
+
+    upload_chunk_size = DBX_UPLOAD_CHUNK_SIZE
+
+    def __init__(self, client: Dropbox):
+        self.client = client
+
+    @staticmethod
+    def get_path(name):
+        return f"/{name}"
+
+    @contextmanager
+    def open_read(self, name):
+        try:
+            _metadata, response = self.client.files_download(self.get_path(name))
+        except ApiError as e:
+            if is_not_found(e):
+                raise FileNotFoundError(name) from e
+            raise
+        with response:
+            response.raw.decode_content = True
+            yield response.raw
+
+    @contextmanager
+    def open_write(self, name):
+        writer = DropboxUploadWriter(
+            self.client, self.get_path(name), self.upload_chunk_size
+        )
+        with writer:
+            yield writer
+            writer.commit()
+
+    def delete(self, name):
+        try:
+            self.client.files_delete_v2(self.get_path(name))
+        except ApiError as e:
+            if is_not_found(e):
+                raise FileNotFoundError(name) from e
+            raise
+
+    def delete_many(self, names):
+        failures = {}
+        for batch in batched(names, DELETE_BATCH_SIZE):
+            failures.update(self.delete_batch(batch))
+        return failures
+
+    def delete_batch(self, names):
+        if len(names) == 1:
+            # A single delete takes one request instead of two.
+            return super().delete_many(names)
+        try:
+            launch = self.client.files_delete_batch(
+                [DeleteArg(self.get_path(name)) for name in names]
+            )
+            if launch.is_complete():
+                result = launch.get_complete()
+            else:
+                result = self.wait_for_batch(launch.get_async_job_id())
+        except ApiError as e:
+            return dict.fromkeys(names, str(e))
+        if result is None:
+            return dict.fromkeys(names, "Batch delete failed")
+
+        failures = {}
+        # Results are in the same order as the paths.
+        for name, entry in zip(names, result.entries):
+            if entry.is_failure() and not is_lookup_not_found(entry.get_failure()):
+                failures[name] = str(entry.get_failure())
+        return failures
+
+    def wait_for_batch(self, async_job_id):
+        """Wait for a batch delete to finish. Returns its result, or
+        ``None`` if the whole batch failed."""
+        interval = 0.1
+        while True:
+            status = self.client.files_delete_batch_check(async_job_id)
+            if status.is_complete():
+                return status.get_complete()
+            if not status.is_in_progress():
+                return None
+            time.sleep(interval)
+            interval = min(interval * 2, DELETE_BATCH_MAX_POLL_INTERVAL)
+
+    def stat(self, name):
+        try:
+            metadata = self.client.files_get_metadata(self.get_path(name))
+        except ApiError as e:
+            if is_not_found(e):
+                raise FileNotFoundError(name) from e
+            raise
+        return ObjectStat(
+            size=metadata.size,
+            modified=metadata.server_modified.replace(tzinfo=timezone.utc),
+        )
@@ -0,0 +1,55 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from sky_write_app.backends.base import ObjectStat, StorageBackend
+from sky_write_django.settings import STORAGE_DELETE_WORKERS
+
+
+class LocalStorageBackend(StorageBackend):
+    """Content kept in files in a local directory. For development only;
+    not for production."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def get_path(self, name):
+        return os.path.join(self.root, name)
+
+    @contextmanager
+    def open_read(self, name):
+        with open(self.get_path(name), "rb") as file:
+            yield file
+
+    @contextmanager
+    def open_write(self, name):
+        # Write to a temporary file first, so that readers never see
+        # partially written content.
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                yield file
+            os.replace(temp_path, self.get_path(name))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def delete(self, name):
+        os.remove(self.get_path(name))
+
+    def delete_many(self, names):
+        names = list(names)
+        # Deleting files mostly waits on the filesystem, so several
+        # deletes run at once.
+        with ThreadPoolExecutor(max_workers=STORAGE_DELETE_WORKERS) as executor:
+            errors = list(executor.map(self.try_delete, names))
+        return {name: error for name, error in zip(names, errors) if error is not None}
+
+    def stat(self, name):
+        result = os.stat(self.get_path(name))
+        return ObjectStat(
+            size=result.st_size,
+            modified=datetime.fromtimestamp(result.st_mtime, tz=timezone.utc),
+        )
@@ -0,0 +1,233 @@
+import io
+from contextlib import contextmanager
+
+from botocore.exceptions import ClientError
+
+from sky_write_app.backends.base import ObjectStat, StorageBackend, batched
+from sky_write_django.settings import S3_MULTIPART_CHUNK_SIZE, S3_RANGE_SIZE
+
+# The most keys S3 accepts in one batch delete
+DELETE_BATCH_SIZE = 1000
+
+
+def is_not_found(error: ClientError):
+    """Whether an S3 error means that a key doesn't exist."""
+    return error.response.get("Error", {}).get("Code") in {
+        "404",
+        "NoSuchKey",
+        "NotFound",
+    }
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    A readable file that downloads an S3 object one range at a time.
+
+    Each range is fetched with its own GET request, and only when the
+    previous one has been read, so memory use is bounded by the chunk
+    size no matter how large the object is.
+    """
+
+    def __init__(self, client, bucket: str, key: str, range_size: int):
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.range_size = range_size
+        self.position = 0
+        self.size = None
+        self.body = None
+        # Fetch the first range right away, so that a missing object is
+        # reported when the file is opened.
+        self.open_range()
+
+    def readable(self):
+        return True
+
+    def open_range(self):
+        end = self.position + self.range_size - 1
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=self.key, Range=f"bytes={self.position}-{end}"
+            )
+        except ClientError as e:
+            if is_not_found(e):
+                raise FileNotFoundError(self.key) from e
+            if e.response.get("Error", {}).get("Code") == "InvalidRange":
+                # Empty objects have no valid ranges at all.
+                self.size = 0
+                return
+            raise
+        if self.size is None:
+            content_range = response.get("ContentRange")
+            self.size = (
+                int(content_range.rsplit("/", 1)[1])
+                if content_range
+                else response["ContentLength"]
+            )
+        self.body = response["Body"]
+
+    def readinto(self, buffer):
+        while self.position < self.size:
+            if self.body is None:
+                self.open_range()
+            data = self.body.read(len(buffer))
+            if data:
+                count = len(data)
+                buffer[:count] = data
+                self.position += count
+                return count
+            self.body.close()
+            self.body = None
+        return 0
+
+    def close(self):
+        if self.body is not None:
+            self.body.close()
+            self.body = None
+        super().close()
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    A writable file that uploads to S3.
+
+    Content is buffered up to ``chunk_size`` bytes. Small content is sent
+    with a single PUT when the file is closed; larger content is sent as a
+    multipart upload, one part per chunk, which is completed on close.
+    """
+
+    def __init__(self, client, bucket: str, key: str, chunk_size: int):
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.chunk_size:
+            chunk = bytes(self.buffer[: self.chunk_size])
+            del self.buffer[: self.chunk_size]
+            self.send_part(chunk)
+        return len(data)
+
+    def send_part(self, chunk):
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key
+            )["UploadId"]
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=chunk,
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    def commit(self):
+        if self.upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer)
+            )
+        else:
+            if self.buffer:
+                self.send_part(bytes(self.buffer))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": self.parts},
+            )
+        self.buffer.clear()
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id
+            )
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Content kept in an S3-compatible bucket, under a per-user prefix.
+
+    S3 deletes are idempotent, so deleting missing content isn't
+    reported as an error.
+    """
+
+    multipart_chunk_size = S3_MULTIPART_CHUNK_SIZE
+    range_size = S3_RANGE_SIZE
+
+    def __init__(self, client, bucket: str, prefix: str = ""):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get_key(self, name):
+        return f"{self.prefix}{name}"
+
+    @contextmanager
+    def open_read(self, name):
+        with S3RangeReader(
+            self.client, self.bucket, self.get_key(name), self.range_size
+        ) as reader:
+            yield reader
+
+    @contextmanager
+    def open_write(self, name):
+        writer = S3MultipartWriter(
+            self.client, self.bucket, self.get_key(name), self.multipart_chunk_size
+        )
+        with writer:
+            try:
+                yield writer
+                writer.commit()
+            except BaseException:
+                writer.abort()
+                raise
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self.get_key(name))
+
+    def delete_many(self, names):
+        failures = {}
+        for batch in batched(names, DELETE_BATCH_SIZE):
+            names_by_key = {self.get_key(name): name for name in batch}
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={
+                        "Objects": [{"Key": key} for key in names_by_key],
+                        "Quiet": True,
+                    },
+                )
+            except ClientError as e:
+                failures.update(dict.fromkeys(batch, str(e)))
+                continue
+            for error in response.get("Errors", []):
+                failures[
+                    names_by_key[error["Key"]]
+                ] = f"{error.get('Code')}: {error.get('Message')}"
+        return failures
+
+    def stat(self, name):
+        try:
+            response = self.client.head_object(
+                Bucket=self.bucket, Key=self.get_key(name)
+            )
+        except ClientError as e:
+            if is_not_found(e):
+                raise FileNotFoundError(name) from e
+            raise
+        return ObjectStat(
+            size=response["ContentLength"], modified=response["LastModified"]
+        )
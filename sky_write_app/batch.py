@@ -0,0 +1,190 @@
+"""
+Creating many storage objects with a single request.
+
+Objects can be put in existing folders, or in folders from the same
+batch, which are referred to by client-side temporary IDs. The whole
+batch is checked before anything is created. Contents are then uploaded
+concurrently, before the transaction that inserts the rows, so that the
+user's revision isn't locked while they upload. Rows are inserted one
+level of nesting at a time, so that every folder has an ID before its
+contents are inserted.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from sky_write_app import ordering
+from sky_write_app.backends import get_content_name
+from sky_write_app.models import RevisionCounter, StorageObject
+from sky_write_app.utils import (
+    discard_uploaded_contents,
+    queue_contents,
+    upload_contents,
+)
+
+
+class InvalidBatch(Exception):
+    """Raised when a batch refers to folders that can't be used."""
+
+
+class BatchUploadFailed(Exception):
+    """Raised when content couldn't be saved, after which nothing in the
+    batch is kept."""
+
+    def __init__(self, failures):
+        super().__init__(f"{len(failures)} file(s) couldn't be saved.")
+        self.failures = failures
+
+
+def get_levels(items):
+    """Return the index of each item's parent in the batch (or ``None``),
+    and the items' indexes grouped by how deeply they are nested inside
+    other items."""
+    indexes_by_temp_id = {}
+    for index, item in enumerate(items):
+        temp_id = item.get("temp_id")
+        if temp_id is None:
+            continue
+        if temp_id in indexes_by_temp_id:
+            raise InvalidBatch(f"A temp_id was sent more than once ({temp_id})")
+        indexes_by_temp_id[temp_id] = index
+
+    parents = []
+    for item in items:
+        folder_temp_id = item.get("folder_temp_id")
+        if folder_temp_id is None:
+            parents.append(None)
+            continue
+        parent = indexes_by_temp_id.get(folder_temp_id)
+        if parent is None or items[parent].get("is_file", True):
+            raise InvalidBatch(f"An invalid folder temp_id was sent ({folder_temp_id})")
+        parents.append(parent)
+
+    depths = [None] * len(items)
+    for index in range(len(items)):
+        chain = []
+        current = index
+        while current is not None and depths[current] is None:
+            if current in chain:
+                raise InvalidBatch(
+                    "A folder temp_id cycle was sent "
+                    f"({items[current].get('temp_id')})"
+                )
+            chain.append(current)
+            current = parents[current]
+        depth = -1 if current is None else depths[current]
+        for current in reversed(chain):
+            depth += 1
+            depths[current] = depth
+
+    levels = defaultdict(list)
+    for index, depth in enumerate(depths):
+        levels[depth].append(index)
+    return parents, [levels[depth] for depth in sorted(levels)]
+
+
+def get_existing_folders(user, items):
+    """Fetch the existing folders that items are put in, with one query."""
+    folder_ids = {
+        item["folder_id"] for item in items if item.get("folder_id") is not None
+    }
+    folders = StorageObject.objects.filter(
+        user=user, id__in=folder_ids, is_file=False
+    ).in_bulk()
+    for folder_id in folder_ids:
+        if folder_id not in folders:
+            raise InvalidBatch(f"An invalid folder ID was sent ({folder_id})")
+    return folders
+
+
+def allocate_ordering(user, items, parents):
+    """Return an ordering parameter for each item, placing items after
+    the existing contents of their folder, in the order they were sent."""
+    groups = defaultdict(list)
+    for index, (item, parent) in enumerate(zip(items, parents)):
+        key = ("temp", parent) if parent is not None else item.get("folder_id")
+        groups[key].append(index)
+
+    ordering_parameters = [None] * len(items)
+    for key, indexes in groups.items():
+        if isinstance(key, tuple):
+            # New folders have no contents yet.
+            values = ordering.following(count=len(indexes))
+        else:
+            values = ordering.allocate_last(user.id, key, len(indexes))
+        for index, value in zip(indexes, values):
+            ordering_parameters[index] = value
+    return ordering_parameters
+
+
+def get_content_bytes(content):
+    if isinstance(content, bytes):
+        return content
+    return bytes(content, "utf-8")
+
+
+def create_batch(user, items, on_created=None):
+    """Create storage objects and their content from validated
+    ``BatchItemSerializer`` data, where content may also be bytes.
+    Returns the objects in the order the items were given.
+
+    ``on_created`` is called with the objects in the transaction that
+    creates them, for anything that must be committed with them."""
+    parents, levels = get_levels(items)
+    config = user.custom_config
+    # Checked before uploading anything, and again in the transaction,
+    # where their ancestry is read.
+    get_existing_folders(user, items)
+
+    objects = [
+        StorageObject(
+            user=user,
+            name=item["name"],
+            name_iv=item.get("name_iv"),
+            content_iv=item.get("content_iv"),
+            is_file=item.get("is_file", True),
+        )
+        for item in items
+    ]
+    contents = [
+        (obj, get_content_bytes(item.get("content", "")))
+        for obj, item in zip(objects, items)
+        if obj.is_file
+    ]
+    names = [get_content_name(obj) for obj, _content in contents]
+    failures = upload_contents(config, contents)
+    if failures:
+        # Nothing in the batch is kept, so the content that was saved
+        # isn't needed either.
+        discard_uploaded_contents(
+            config, [name for name in names if name not in failures]
+        )
+        raise BatchUploadFailed(failures)
+
+    try:
+        with transaction.atomic():
+            # The counter is locked first, so the folders can't be moved
+            # or deleted between being read here and being written to.
+            revision = RevisionCounter.allocate(user.id)
+            folders = get_existing_folders(user, items)
+            ordering_parameters = allocate_ordering(user, items, parents)
+            for level in levels:
+                for index in level:
+                    obj = objects[index]
+                    if parents[index] is not None:
+                        obj.folder = objects[parents[index]]
+                    else:
+                        obj.folder = folders.get(items[index].get("folder_id"))
+                    obj.ordering_parameter = ordering_parameters[index]
+                    obj.ancestry = obj.folder.descendant_ancestry if obj.folder else ""
+                    obj.content_revision = 1 if obj.is_file else 0
+                    obj.revision = revision
+                StorageObject.objects.bulk_create(objects[index] for index in level)
+            queue_contents(contents)
+            if on_created is not None:
+                on_created(objects)
+    except Exception:
+        discard_uploaded_contents(config, names)
+        raise
+
+    return objects
@@ -0,0 +1,94 @@
+import threading
+import typing as t
+from collections import OrderedDict
+
+from sky_write_django.settings import CONTENT_CACHE_MAX_BYTES
+
+
+class ContentCache:
+    """
+    File content kept in memory, so that unchanged notes aren't
+    downloaded from storage again.
+
+    Content is cached per ``file_uuid`` along with a version; a lookup
+    only hits if the version still matches, so content that was saved
+    since (possibly by another process) is never served. The least
+    recently used content is dropped once the cache holds more than
+    ``max_bytes``, and content larger than ``max_item_bytes`` is never
+    cached.
+    """
+
+    def __init__(self, max_bytes=CONTENT_CACHE_MAX_BYTES, max_item_bytes=None):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = (
+            max_bytes // 8 if max_item_bytes is None else max_item_bytes
+        )
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version) -> t.Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, version, content: bytes):
+        if len(content) > self.max_item_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (version, content)
+            self._size += len(content)
+            while self._size > self.max_bytes:
+                _version, evicted = self._entries.popitem(last=False)[1]
+                self._size -= len(evicted)
+
+    def discard(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def iter_through(self, key, version, chunks: t.Iterable[bytes]):
+        """Yield ``chunks``, and cache them once they've all been read,
+        unless there turn out to be too many to cache."""
+        collected = []
+        size = 0
+        for chunk in chunks:
+            if collected is not None:
+                size += len(chunk)
+                if size > self.max_item_bytes:
+                    collected = None
+                else:
+                    collected.append(chunk)
+            yield chunk
+        if collected is not None:
+            self.set(key, version, b"".join(collected))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+content_cache = ContentCache()
@@ -0,0 +1,43 @@
+"""
+Syncing a user's storage objects by revision.
+
+Every change to a user's storage objects is given the user's next
+revision (see ``RevisionCounter``): objects record the revision at which
+they last changed, and deleted objects leave a ``DeletedStorageObject``
+behind. A client that has seen revision ``n`` only needs what has a
+later revision to catch up.
+"""
+import typing as t
+
+from sky_write_app.models import DeletedStorageObject, RevisionCounter, StorageObject
+
+
+def record_deletions(user_id, object_ids: t.Collection[int], revision=None):
+    """Record that objects were deleted, at ``revision`` if the caller
+    has allocated one already. Must be called in the transaction that
+    deletes them."""
+    if not object_ids:
+        return
+    if revision is None:
+        revision = RevisionCounter.allocate(user_id)
+    DeletedStorageObject.objects.bulk_create(
+        DeletedStorageObject(user_id=user_id, storage_object_id=pk, revision=revision)
+        for pk in object_ids
+    )
+
+
+def get_changes(user, since: int):
+    """Return the user's current revision, the objects changed after
+    revision ``since``, and the IDs of objects deleted after it."""
+    # Read first: everything up to this revision has been committed, and
+    # anything newer that's returned as well will be returned again.
+    revision = RevisionCounter.current(user.id)
+    changed = StorageObject.objects.filter(user=user, revision__gt=since).order_by(
+        "revision", "id"
+    )
+    deleted = (
+        DeletedStorageObject.objects.filter(user=user, revision__gt=since)
+        .order_by("revision", "storage_object_id")
+        .values_list("storage_object_id", flat=True)
+    )
+    return revision, list(changed), list(deleted)
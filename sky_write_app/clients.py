@@ -0,0 +1,155 @@
+import threading
+from collections import OrderedDict
+
+import boto3
+from botocore.config import Config as BotoConfig
+from dropbox import Dropbox, create_session
+
+from sky_write_django.settings import (
+    DBX_APP_KEY,
+    DBX_APP_SECRET,
+    DBX_MAX_CLIENTS,
+    DBX_MAX_CONNECTIONS,
+    S3_ACCESS_KEY_ID,
+    S3_ENDPOINT_URL,
+    S3_MAX_CONNECTIONS,
+    S3_REGION,
+    S3_SECRET_ACCESS_KEY,
+)
+
+
+class DropboxClientRegistry:
+    """
+    Dropbox clients, one per user, reused across requests.
+
+    All clients share one HTTP session, so connections to Dropbox are
+    pooled instead of re-established for every request. Each client
+    keeps its access token until shortly before it expires (the Dropbox
+    SDK refreshes it five minutes early), rather than refreshing it for
+    every call. The least recently used clients are dropped once there
+    are more than ``max_clients``.
+    """
+
+    def __init__(
+        self,
+        max_clients=DBX_MAX_CLIENTS,
+        session_factory=None,
+        app_key=DBX_APP_KEY,
+        app_secret=DBX_APP_SECRET,
+    ):
+        self.max_clients = max_clients
+        self.session_factory = session_factory or (
+            lambda: create_session(max_connections=DBX_MAX_CONNECTIONS)
+        )
+        self.app_key = app_key
+        self.app_secret = app_secret
+        self._session = None
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    @property
+    def session(self):
+        """The HTTP session shared by all clients."""
+        with self._lock:
+            if self._session is None:
+                self._session = self.session_factory()
+            return self._session
+
+    def get(self, config):
+        """Return a ready-to-use client for a user's ``CustomConfig``."""
+        session = self.session
+        with self._lock:
+            entry = self._clients.get(config.user_id)
+            if entry is not None and entry[0] == config.dropbox_token:
+                self._clients.move_to_end(config.user_id)
+                self.hits += 1
+            else:
+                # Either there's no client yet, or the user has connected
+                # Dropbox again since it was created.
+                entry = (
+                    config.dropbox_token,
+                    Dropbox(
+                        oauth2_refresh_token=config.dropbox_token,
+                        app_key=self.app_key,
+                        app_secret=self.app_secret,
+                        session=session,
+                    ),
+                    threading.Lock(),
+                )
+                self._clients[config.user_id] = entry
+                self.misses += 1
+                while len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+
+        _refresh_token, client, client_lock = entry
+        with client_lock:
+            access_token = client._oauth2_access_token
+            client.check_and_refresh_access_token()
+            if client._oauth2_access_token != access_token:
+                with self._lock:
+                    self.refreshes += 1
+        return client
+
+    def discard(self, user_id):
+        """Drop a user's client, e.g. after their token was revoked."""
+        with self._lock:
+            self._clients.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+            self.hits = self.misses = self.refreshes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+            }
+
+
+dropbox_clients = DropboxClientRegistry()
+
+
+class S3ClientPool:
+    """
+    A single S3 client shared by all requests and threads.
+
+    boto3 clients are thread-safe and keep their own connection pool, so
+    one client (created on first use) serves every user.
+    """
+
+    def __init__(self, **client_kwargs):
+        self.client_kwargs = client_kwargs
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._client is None:
+                self._client = boto3.client(
+                    "s3",
+                    config=BotoConfig(
+                        max_pool_connections=S3_MAX_CONNECTIONS,
+                        retries={"mode": "standard"},
+                    ),
+                    **self.client_kwargs,
+                )
+            return self._client
+
+    def clear(self):
+        with self._lock:
+            self._client = None
+
+
+s3_clients = S3ClientPool(
+    endpoint_url=S3_ENDPOINT_URL,
+    region_name=S3_REGION,
+    aws_access_key_id=S3_ACCESS_KEY_ID,
+    aws_secret_access_key=S3_SECRET_ACCESS_KEY,
+)
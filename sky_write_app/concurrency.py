@@ -0,0 +1,42 @@
+import itertools
+import typing as t
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+
+def iter_concurrently(
+    func: t.Callable, items: t.Iterable, max_workers: int, ordered: bool = False
+) -> t.Iterator[t.Tuple[t.Any, Future]]:
+    """
+    Call ``func`` on each item in a pool of ``max_workers`` threads, and
+    yield ``(item, future)`` pairs as the calls complete, or in the order
+    of ``items`` if ``ordered``.
+
+    Items are submitted as earlier ones are yielded, with at most twice
+    ``max_workers`` in flight, so memory use doesn't grow with the number
+    of items. Calls that haven't started are cancelled if iteration stops
+    early.
+    """
+    items = iter(items)
+    window = 2 * max_workers
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    in_flight = deque()
+    try:
+        for item in itertools.islice(items, window):
+            in_flight.append((item, executor.submit(func, item)))
+        while in_flight:
+            if ordered:
+                item, future = in_flight.popleft()
+                wait([future])
+            else:
+                done, _pending = wait(
+                    [future for _item, future in in_flight],
+                    return_when=FIRST_COMPLETED,
+                )
+                item, future = next(entry for entry in in_flight if entry[1] in done)
+                in_flight.remove((item, future))
+            for next_item in itertools.islice(items, 1):
+                in_flight.append((next_item, executor.submit(func, next_item)))
+            yield item, future
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
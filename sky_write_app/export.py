@@ -0,0 +1,185 @@
+"""
+Exporting all of a user's storage objects as an archive.
+
+The archive starts with ``manifest.json``, which lists every object with
+its encrypted name, IVs, ordering parameter, path, and the archive member
+holding its content. Folders follow the structure of the user's storage,
+and each file holds a note's content exactly as it is stored. Archives
+are produced while they're being sent: content is read a few files ahead
+in parallel, and each member is sent as soon as it's written.
+"""
+import io
+import json
+import tarfile
+import time
+import zipfile
+from urllib.parse import quote
+
+from sky_write_app.listing import ROW_FIELDS, RowTree
+from sky_write_app.models import StorageObject
+from sky_write_app.utils import iter_file_contents
+
+CONTENT_DIRECTORY = "notes"
+MANIFEST_NAME = "manifest.json"
+EXPORT_FIELDS = (*ROW_FIELDS, "content_iv", "file_uuid", "content_revision")
+
+
+class StreamBuffer(io.RawIOBase):
+    """A write-only file whose content is taken out as it's written, so
+    an archive can be sent without being held in memory."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class TarArchive:
+    extension = "tar"
+    content_type = "application/x-tar"
+
+    def __init__(self, fileobj):
+        # Pass each block on straight away, rather than buffering them.
+        self.tar = tarfile.open(fileobj=fileobj, mode="w|", bufsize=tarfile.BLOCKSIZE)
+        self.mtime = time.time()
+
+    def add_folder(self, name):
+        info = tarfile.TarInfo(name)
+        info.type = tarfile.DIRTYPE
+        info.mode = 0o755
+        info.mtime = self.mtime
+        self.tar.addfile(info)
+
+    def add_file(self, name, content: bytes):
+        info = tarfile.TarInfo(name)
+        info.size = len(content)
+        info.mode = 0o644
+        info.mtime = self.mtime
+        self.tar.addfile(info, io.BytesIO(content))
+
+    def close(self):
+        self.tar.close()
+
+
+class ZipArchive:
+    extension = "zip"
+    content_type = "application/zip"
+
+    def __init__(self, fileobj):
+        # Content is encrypted, so it wouldn't compress anyway.
+        self.zip = zipfile.ZipFile(fileobj, mode="w", compression=zipfile.ZIP_STORED)
+        self.date_time = time.localtime()[:6]
+
+    def add_folder(self, name):
+        self.zip.writestr(zipfile.ZipInfo(f"{name}/", self.date_time), b"")
+
+    def add_file(self, name, content: bytes):
+        self.zip.writestr(zipfile.ZipInfo(name, self.date_time), content)
+
+    def close(self):
+        self.zip.close()
+
+
+ARCHIVE_FORMATS = {archive.extension: archive for archive in (TarArchive, ZipArchive)}
+
+
+def get_safe_segment(segment):
+    """Encoded names never contain slashes, but they can be "." or "..",
+    which mean something else in a path."""
+    if segment in {".", ".."}:
+        return segment.replace(".", "%2E")
+    return segment
+
+
+def get_member_names(tree: RowTree):
+    """Return the archive member name for every object, following the
+    paths of the objects. Names that would clash get the object's ID, and
+    the contents of a folder are named after its member name, so they stay
+    inside it."""
+    names = {}
+    used = set()
+    folders = [(None, CONTENT_DIRECTORY)]
+    while folders:
+        folder_id, folder_name = folders.pop()
+        for row in tree.get_contents(folder_id):
+            segment = get_safe_segment(quote(row["name"], safe=""))
+            name = f"{folder_name}/{segment}"
+            if name in used:
+                name = f"{name} ({row['id']})"
+            used.add(name)
+            names[row["id"]] = name
+            if not row["is_file"]:
+                folders.append((row["id"], name))
+    return names
+
+
+def get_manifest(user, tree: RowTree, paths, names) -> dict:
+    return {
+        "username": user.username,
+        "storage_objects": [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "name_iv": row["name_iv"],
+                "content_iv": row["content_iv"],
+                "is_file": row["is_file"],
+                "folder_id": row["folder_id"],
+                "ordering_parameter": str(row["ordering_parameter"]),
+                "path": paths[row["id"]],
+                "member": names[row["id"]],
+            }
+            for row in tree.rows.values()
+        ],
+    }
+
+
+def iter_export(user, archive_class):
+    """Yield an archive of all of a user's storage objects, a piece at a
+    time. Content that couldn't be read is listed in ``errors.json`` at
+    the end of the archive."""
+    tree = RowTree.for_user(user, EXPORT_FIELDS)
+    paths = dict((row["id"], path) for row, path in tree.iter_paths())
+    names = get_member_names(tree)
+    buffer = StreamBuffer()
+    archive = archive_class(buffer)
+
+    archive.add_file(
+        MANIFEST_NAME, json.dumps(get_manifest(user, tree, paths, names)).encode()
+    )
+    yield buffer.take()
+
+    # Paths are listed with each folder before its contents.
+    for pk in paths:
+        if not tree.rows[pk]["is_file"]:
+            archive.add_folder(names[pk])
+    yield buffer.take()
+
+    # ``iter_file_contents`` takes objects, which the rows are enough for.
+    files = [StorageObject(**row) for row in tree.rows.values() if row["is_file"]]
+    errors = []
+    contents = iter_file_contents(user.custom_config, files, ordered=True)
+    for obj, future in contents:
+        try:
+            content = future.result()
+        except Exception as e:
+            errors.append({"id": obj.id, "error": type(e).__name__})
+            continue
+        if content is not None:
+            archive.add_file(names[obj.id], content)
+            yield buffer.take()
+
+    if errors:
+        archive.add_file("errors.json", json.dumps(errors).encode())
+    archive.close()
+    yield buffer.take()
@@ -0,0 +1,173 @@
+"""
+Importing an archive of folders and notes into a user's storage.
+
+Archives are read member by member as a stream, so they can be any size.
+Archives made by ``export`` are recognized by their manifest, which
+gives each object its encrypted name and IVs; in any other archive,
+member names are used as they are. Notes are created in batches, each
+in one transaction that also records how many archive members have been
+imported, so an interrupted import resumes where it stopped.
+"""
+import json
+import sys
+import tarfile
+import typing as t
+import zipfile
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from sky_write_app.batch import create_batch
+from sky_write_app.export import CONTENT_DIRECTORY, MANIFEST_NAME
+from sky_write_app.models import ImportedFolder, ImportJob, ImportStatus
+from sky_write_django.settings import IMPORT_BATCH_SIZE
+
+
+class Member(t.NamedTuple):
+    name: str
+    is_dir: bool
+    read: t.Callable[[], bytes]
+
+
+def iter_tar_members(tar):
+    for info in tar:
+        if info.isdir():
+            yield Member(info.name, True, lambda: b"")
+        elif info.isfile():
+            yield Member(
+                info.name, False, lambda info=info: tar.extractfile(info).read()
+            )
+
+
+def iter_zip_members(archive):
+    for info in archive.infolist():
+        yield Member(info.filename, info.is_dir(), lambda info=info: archive.read(info))
+
+
+@contextmanager
+def open_archive(source):
+    """Open a zip or tar archive (optionally compressed) for reading its
+    members in order. ``-`` reads a tar archive from standard input."""
+    if source == "-":
+        with tarfile.open(fileobj=sys.stdin.buffer, mode="r|*") as tar:
+            yield iter_tar_members(tar)
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            yield iter_zip_members(archive)
+    else:
+        with tarfile.open(source, mode="r|*") as tar:
+            yield iter_tar_members(tar)
+
+
+class ArchiveImporter:
+    def __init__(self, job: ImportJob, batch_size: int = IMPORT_BATCH_SIZE):
+        self.job = job
+        self.batch_size = batch_size
+        self.folders = dict(job.folders.values_list("path", "storage_object_id"))
+        self.manifest = None
+        self.batch = []
+
+    def run(self, members: t.Iterable[Member]):
+        members_done = self.job.members_done
+        for index, member in enumerate(members):
+            if member.name == MANIFEST_NAME:
+                # Needed even when resuming past it.
+                self.manifest = {
+                    entry["member"]: entry
+                    for entry in json.loads(member.read())["storage_objects"]
+                }
+            if index < self.job.members_done:
+                continue
+            self.import_member(member)
+            members_done = index + 1
+            if len(self.batch) >= self.batch_size:
+                self.flush(members_done)
+        self.flush(members_done)
+
+    def get_segments(self, name):
+        """Split a member name into the names of folders in the user's
+        storage, or return ``None`` if it isn't part of the tree."""
+        segments = [segment for segment in name.split("/") if segment not in {"", "."}]
+        if self.manifest is not None:
+            if segments[:1] != [CONTENT_DIRECTORY]:
+                return None
+            segments = segments[1:]
+        if not segments or ".." in segments:
+            return None
+        return segments
+
+    def get_item(self, segments, is_file, folder_id):
+        if self.manifest is not None:
+            entry = self.manifest.get("/".join([CONTENT_DIRECTORY, *segments]))
+            if entry is not None:
+                return {
+                    "name": entry["name"],
+                    "name_iv": entry["name_iv"],
+                    "content_iv": entry["content_iv"],
+                    "is_file": is_file,
+                    "folder_id": folder_id,
+                }
+        return {"name": segments[-1], "is_file": is_file, "folder_id": folder_id}
+
+    def get_folder_id(self, segments):
+        """Return the ID of the folder for the given path, creating it
+        (and any folders above it) if needed."""
+        if not segments:
+            return self.job.folder_id
+        path = "/".join(segments)
+        if path not in self.folders:
+            parent_id = self.get_folder_id(segments[:-1])
+            with transaction.atomic():
+                [folder] = create_batch(
+                    self.job.user, [self.get_item(segments, False, parent_id)]
+                )
+                ImportedFolder.objects.create(
+                    job=self.job, path=path, storage_object=folder
+                )
+            self.folders[path] = folder.id
+        return self.folders[path]
+
+    def import_member(self, member: Member):
+        segments = self.get_segments(member.name)
+        if segments is None:
+            return
+        if member.is_dir:
+            self.get_folder_id(segments)
+            return
+        item = self.get_item(segments, True, self.get_folder_id(segments[:-1]))
+        item["content"] = member.read()
+        self.batch.append(item)
+
+    def flush(self, members_done):
+        """Create the notes read so far, and record the progress."""
+
+        def record_progress(_objects=None):
+            self.job.members_done = members_done
+            self.job.save(update_fields=["members_done", "updated_at"])
+
+        if self.batch:
+            # Recorded in the transaction that creates the notes, after
+            # their content has been uploaded.
+            create_batch(self.job.user, self.batch, on_created=record_progress)
+        else:
+            record_progress()
+        self.batch = []
+
+
+def run_import(job: ImportJob, batch_size: int = IMPORT_BATCH_SIZE):
+    """Import a job's archive, starting after the members that have been
+    imported already."""
+    if job.status != ImportStatus.RUNNING:
+        job.status = ImportStatus.RUNNING
+        job.save(update_fields=["status", "updated_at"])
+    try:
+        with open_archive(job.source) as members:
+            ArchiveImporter(job, batch_size).run(members)
+    except Exception as e:
+        job.status = ImportStatus.FAILED
+        job.error = str(e) or type(e).__name__
+        job.save(update_fields=["status", "error", "updated_at"])
+        raise
+    job.status = ImportStatus.COMPLETE
+    job.error = ""
+    job.save(update_fields=["status", "error", "updated_at"])
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Rollback(Exception):
+    """Raised to discard everything a benchmark created once it's done."""
+
+
+class BenchmarkCommand(BaseCommand):
+    """A command that runs ``run`` in a transaction that is rolled back,
+    so whatever it seeds is never kept."""
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        raise NotImplementedError
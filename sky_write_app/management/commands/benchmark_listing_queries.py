@@ -0,0 +1,170 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from sky_write_app.listing import ROW_FIELDS
+from sky_write_app.management.benchmark import BenchmarkCommand
+from sky_write_app.models import StorageObject
+from sky_write_app.ordering import allocate_last
+from sky_write_app.pagination import paginate
+from sky_write_django.settings import ORDERING_MAX
+
+INDEX_NAME = "storage_object_listing"
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Seed a large StorageObject table and compare query plans and latency "
+        "of the helpers behind folder listings and appends with and without "
+        "the composite "
+        f"{INDEX_NAME} index. Everything runs in a transaction that is rolled "
+        "back, but the table is locked while it runs, so only use a scratch "
+        "database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--folders", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--yes",
+            action="store_true",
+            help="Confirm that the configured database is a scratch database.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["yes"]:
+            raise CommandError(
+                "This benchmark locks the StorageObject table; run it against a "
+                "scratch database and pass --yes."
+            )
+        super().handle(*args, **options)
+
+    def run(self, options):
+        user, folder = self.seed(options)
+        contents = StorageObject.objects.filter(folder_id=folder.id, user=user)
+        _rows, cursor = paginate(contents.values(*ROW_FIELDS))
+        # As the views call them
+        queries = {
+            # RootContentsView
+            "root contents": lambda: paginate(
+                StorageObject.objects.filter(user=user, folder_id=None).values(
+                    *ROW_FIELDS
+                )
+            ),
+            # FolderContentsView
+            "folder contents": lambda: paginate(contents.values(*ROW_FIELDS)),
+            "folder contents, next page": lambda: paginate(
+                contents.values(*ROW_FIELDS), cursor
+            ),
+            # StorageObjectView.post, batches and StorageObjectReOrganizeView
+            "last object in folder": lambda: allocate_last(user.id, folder.id),
+        }
+
+        index = next(
+            index for index in StorageObject._meta.indexes if index.name == INDEX_NAME
+        )
+        # The schema editor isn't entered as a context manager, because
+        # SQLite refuses that inside a transaction; the statements are
+        # executed directly instead.
+        schema_editor = connection.schema_editor()
+        schema_editor.execute(index.remove_sql(StorageObject, schema_editor))
+        self.analyze()
+        before = self.measure(queries, options["repeat"])
+
+        schema_editor.execute(index.create_sql(StorageObject, schema_editor))
+        self.analyze()
+        after = self.measure(queries, options["repeat"])
+
+        for name in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, results in (("without index", before), ("with index", after)):
+                plan, seconds = results[name]
+                self.stdout.write(f"  {label}: {seconds * 1000:.3f} ms")
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+    def seed(self, options):
+        """Create ``--users`` users sharing ``--rows`` objects. The first
+        user gets a tenth of all rows, half of them spread across
+        ``--folders`` folders."""
+        User.objects.bulk_create(
+            User(username=f"benchmark user {index}")
+            for index in range(options["users"])
+        )
+        users = list(
+            User.objects.filter(username__startswith="benchmark user ").order_by("id")
+        )
+        user = users[0]
+        StorageObject.objects.bulk_create(
+            StorageObject(
+                name=f"folder {index}",
+                user=user,
+                is_file=False,
+                ordering_parameter=index + 1,
+            )
+            for index in range(options["folders"])
+        )
+        folders = list(StorageObject.objects.filter(user=user, is_file=False))
+        heavy_rows = options["rows"] // 10
+        step = Decimal(ORDERING_MAX) / (options["rows"] + 1)
+
+        batch = []
+        for index in range(options["rows"] - len(folders)):
+            if index < heavy_rows:
+                owner = user
+                folder = folders[index % len(folders)] if index % 2 else None
+            else:
+                owner = users[1 + index % (len(users) - 1)] if len(users) > 1 else user
+                folder = None
+            batch.append(
+                StorageObject(
+                    name=f"note {index}",
+                    user=owner,
+                    folder=folder,
+                    ancestry=f"{folder.id}/" if folder is not None else "",
+                    ordering_parameter=(step * (options["rows"] - index)).quantize(
+                        Decimal("1.00000000000")
+                    ),
+                )
+            )
+            if len(batch) >= options["batch_size"]:
+                StorageObject.objects.bulk_create(batch)
+                batch = []
+        StorageObject.objects.bulk_create(batch)
+        return user, folders[0]
+
+    @staticmethod
+    def analyze():
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {StorageObject._meta.db_table}")
+
+    @staticmethod
+    def explain(run):
+        """Return the plans of the queries ``run`` makes."""
+        with CaptureQueriesContext(connection) as context:
+            run()
+        prefix = connection.ops.explain_query_prefix()
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                cursor.execute(f"{prefix} {query['sql']}")
+                # The plan's text is the last column on every database.
+                plans.extend(str(row[-1]) for row in cursor.fetchall())
+        return "\n".join(plans)
+
+    def measure(self, queries, repeat):
+        results = {}
+        for name, run in queries.items():
+            plan = self.explain(run)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                run()
+            results[name] = (plan, (time.perf_counter() - start) / repeat)
+        return results
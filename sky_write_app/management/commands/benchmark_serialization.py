@@ -0,0 +1,239 @@
+import time
+from collections import defaultdict
+from functools import cached_property
+from urllib.parse import quote
+
+from django.contrib.auth.models import User
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from sky_write_app.listing import ROW_FIELDS, get_me_data, iter_listing
+from sky_write_app.management.benchmark import BenchmarkCommand
+from sky_write_app.models import RevisionCounter, StorageObject
+from sky_write_app.renderers import ORJSONRenderer
+from sky_write_app.streaming import JSONArray, iter_json
+from sky_write_app.utils import format_path
+
+
+class ItemSerializer(serializers.ModelSerializer):
+    """The baseline: a DRF serializer per object, as ``/me/`` and folder
+    listings used before they were built from rows. Contents come from
+    the ``contents`` context, by folder ID, so only serializing is timed
+    rather than queries."""
+
+    files = serializers.SerializerMethodField()
+    path = serializers.SerializerMethodField()
+
+    class Meta:
+        fields = [
+            "id",
+            "name",
+            "name_iv",
+            "is_file",
+            "files",
+            "path",
+            "ordering_parameter",
+        ]
+        model = StorageObject
+
+    def get_files(self, obj):
+        contents = self.context["contents"].get(obj.id, [])
+        context = {**self.context, "folder_path": self.get_path(obj)}
+        return ItemSerializer(contents, many=True, context=context).data
+
+    def get_path(self, obj):
+        name = quote(obj.name, safe="")
+        folder_path = self.context["folder_path"]
+        return name if folder_path is None else f"{folder_path}/{name}"
+
+
+class MeSerializer(serializers.ModelSerializer):
+    storage_objects = serializers.SerializerMethodField()
+    encryption_key = serializers.SerializerMethodField()
+    last_file = serializers.SerializerMethodField()
+    path_to_last_file = serializers.SerializerMethodField()
+    revision = serializers.SerializerMethodField()
+
+    class Meta:
+        fields = [
+            "username",
+            "storage_objects",
+            "encryption_key",
+            "last_file",
+            "path_to_last_file",
+            "revision",
+        ]
+        model = User
+
+    @cached_property
+    def objects(self):
+        return {
+            obj.id: obj
+            for obj in StorageObject.objects.filter(user=self.instance).order_by(
+                "ordering_parameter", "id"
+            )
+        }
+
+    @cached_property
+    def last_file_object(self):
+        config = getattr(self.instance, "custom_config", None)
+        if config is None:
+            return None
+        return self.objects.get(config.last_file)
+
+    def get_storage_objects(self, _user):
+        contents = defaultdict(list)
+        for obj in self.objects.values():
+            contents[obj.folder_id].append(obj)
+        context = {"contents": contents, "folder_path": None}
+        return ItemSerializer(contents[None], many=True, context=context).data
+
+    @staticmethod
+    def get_encryption_key(user):
+        config = getattr(user, "custom_config", None)
+        return config.encryption_key if config is not None else None
+
+    def get_last_file(self, _user):
+        obj = self.last_file_object
+        return obj.id if obj is not None else None
+
+    def get_path_to_last_file(self, _user):
+        obj = self.last_file_object
+        return obj.path_ids if obj is not None else None
+
+    def get_revision(self, _user):
+        return self.context["revision"]
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Seed a tree of storage objects and compare the time spent "
+        "serializing and rendering /me/ and a folder listing with DRF "
+        "serializers, and from rows with JSONRenderer and with orjson. "
+        "Everything runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--nodes", type=int, default=10_000)
+        parser.add_argument(
+            "--fanout", type=int, default=10, help="Sub-folders in each folder."
+        )
+        parser.add_argument(
+            "--depth", type=int, default=3, help="Levels of nested folders."
+        )
+        parser.add_argument(
+            "--listing",
+            type=int,
+            default=1000,
+            help="Files in the first folder, which is the one listed.",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def run(self, options):
+        user, folder = self.seed(options)
+        revision = RevisionCounter.current(user.id)
+        contents = StorageObject.objects.filter(folder=folder, user=user).order_by(
+            "ordering_parameter", "id"
+        )
+        folder_path = format_path(folder)
+
+        def listing_serializer():
+            context = {"contents": {}, "folder_path": folder_path}
+            files = ItemSerializer(contents, many=True, context=context).data
+            return JSONRenderer().render({"files": files, "next": None})
+
+        def listing_json_renderer():
+            files = list(iter_listing(contents.values(*ROW_FIELDS), folder_path))
+            return JSONRenderer().render({"files": files, "next": None})
+
+        def listing_streamed():
+            files = iter_listing(contents.values(*ROW_FIELDS), folder_path)
+            return b"".join(iter_json({"files": JSONArray(files), "next": None}))
+
+        cases = {
+            "/me/": {
+                "serializers and JSONRenderer": lambda: JSONRenderer().render(
+                    MeSerializer(user, context={"revision": revision}).data
+                ),
+                "rows and JSONRenderer": lambda: JSONRenderer().render(
+                    get_me_data(user, revision)
+                ),
+                "rows and orjson": lambda: ORJSONRenderer().render(
+                    get_me_data(user, revision)
+                ),
+                "rows and orjson, streamed": lambda: b"".join(
+                    iter_json(get_me_data(user, revision, lazy=True))
+                ),
+            },
+            f"folder listing ({contents.count()} objects)": {
+                "serializers and JSONRenderer": listing_serializer,
+                "rows and JSONRenderer": listing_json_renderer,
+                "rows and orjson, streamed": listing_streamed,
+            },
+        }
+
+        for name, renderers in cases.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            bodies = set()
+            baseline = None
+            for label, render in renderers.items():
+                bodies.add(render())
+                start = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    render()
+                seconds = (time.perf_counter() - start) / options["repeat"]
+                baseline = baseline or seconds
+                self.stdout.write(
+                    f"  {label}: {seconds * 1000:.1f} ms ({baseline / seconds:.1f}x)"
+                )
+            if len(bodies) != 1:
+                self.stderr.write(f"  {name} rendered differently!")
+
+    @staticmethod
+    def seed(options):
+        """Create ``--depth`` levels of folders, each with ``--fanout``
+        sub-folders, put ``--listing`` files in the first folder, and spread
+        more across every folder and the root until there are ``--nodes``
+        objects. Return the user and the first folder."""
+        user = User.objects.create_user("benchmark serialization user")
+        parents = [None]
+        folders = []
+        for level in range(options["depth"]):
+            StorageObject.objects.bulk_create(
+                StorageObject(
+                    name=f"folder {level}.{index}",
+                    user=user,
+                    folder=parent,
+                    ancestry=parent.descendant_ancestry if parent else "",
+                    is_file=False,
+                    ordering_parameter=index,
+                )
+                for parent in parents
+                for index in range(options["fanout"])
+            )
+            # Fetched again, because not every database returns new IDs.
+            parents = list(
+                StorageObject.objects.filter(
+                    user=user, is_file=False, name__startswith=f"folder {level}."
+                )
+            )
+            folders.extend(parents)
+
+        parents = [None, *folders]
+        notes = []
+        for index in range(max(options["nodes"] - len(folders), 0)):
+            if index < options["listing"]:
+                parent = folders[0]
+            else:
+                parent = parents[index % len(parents)]
+            notes.append(
+                StorageObject(
+                    name=f"note {index}",
+                    user=user,
+                    folder=parent,
+                    ancestry=parent.descendant_ancestry if parent else "",
+                    ordering_parameter=index,
+                )
+            )
+        StorageObject.objects.bulk_create(notes, batch_size=1000)
+        return user, folders[0]
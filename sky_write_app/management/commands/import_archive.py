@@ -0,0 +1,81 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from sky_write_app.imports import run_import
+from sky_write_app.models import ImportJob, ImportStatus, StorageObject
+from sky_write_django.settings import IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a zip or tar archive of folders and notes into a user's storage. "
+        "Progress is saved as the import goes, so an import that was interrupted "
+        "can be resumed with --resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "source",
+            nargs="?",
+            help="Path of the archive, or - to read a tar archive from stdin.",
+        )
+        parser.add_argument("--user", help="Username of the user to import for.")
+        parser.add_argument(
+            "--folder-id", type=int, help="Folder to import into (default: root)."
+        )
+        parser.add_argument("--resume", type=int, help="ID of an import to resume.")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Run the import in the Celery worker.",
+        )
+
+    def handle(self, *args, **options):
+        if options["resume"] is not None:
+            job = ImportJob.objects.filter(id=options["resume"]).first()
+            if job is None:
+                raise CommandError(f"Import {options['resume']} doesn't exist.")
+            if job.status == ImportStatus.COMPLETE:
+                raise CommandError(f"Import {job.id} is already complete.")
+        else:
+            job = self.create_job(options)
+
+        if options["background"]:
+            if job.source == "-":
+                raise CommandError("Imports from stdin can't run in the background.")
+            from sky_write_app.tasks import import_archive
+
+            import_archive.delay(job.id)
+            self.stdout.write(f"Queued import {job.id}.")
+            return
+
+        self.stdout.write(f"Running import {job.id}.")
+        try:
+            run_import(job, options["batch_size"])
+        except Exception as e:
+            raise CommandError(
+                f"Import {job.id} failed after {job.members_done} archive members "
+                f"({e}); resume it with --resume {job.id}."
+            ) from e
+        self.stdout.write(
+            f"Imported {job.members_done} archive members for {job.user.username}."
+        )
+
+    @staticmethod
+    def create_job(options):
+        if options["source"] is None or options["user"] is None:
+            raise CommandError("Pass an archive and --user, or --resume.")
+        user = User.objects.filter(username=options["user"]).first()
+        if user is None:
+            raise CommandError(f"User {options['user']} doesn't exist.")
+        folder = None
+        if options["folder_id"] is not None:
+            folder = StorageObject.objects.filter(
+                id=options["folder_id"], user=user, is_file=False
+            ).first()
+            if folder is None:
+                raise CommandError(f"Folder {options['folder_id']} doesn't exist.")
+        return ImportJob.objects.create(
+            user=user, source=options["source"], folder=folder
+        )
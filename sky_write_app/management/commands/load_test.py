@@ -0,0 +1,81 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent requests to a running server and report throughput "
+        "and latency. Run it against a single worker process (e.g. "
+        "WEB_WORKERS=1) with different WEB_THREADS values to see how many "
+        "requests one process serves at once while they wait on storage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url")
+        parser.add_argument("--token", help="A user's API token.")
+        parser.add_argument("--method", default="GET")
+        parser.add_argument("--data", help="A JSON request body.")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--timeout", type=float, default=30)
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+        headers = {"Accept": "application/json"}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+        data = None
+        if options["data"] is not None:
+            data = json.dumps(json.loads(options["data"])).encode()
+            headers["Content-Type"] = "application/json"
+
+        def send(_index):
+            request = urllib.request.Request(
+                options["url"], data=data, headers=headers, method=options["method"]
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=options["timeout"]) as r:
+                    r.read()
+                    status = r.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except OSError as e:
+                status = type(e).__name__
+            return status, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            results = list(executor.map(send, range(options["requests"])))
+        elapsed = time.perf_counter() - start
+
+        statuses = Counter(status for status, _seconds in results)
+        latencies = sorted(seconds for _status, seconds in results)
+        percentiles = statistics.quantiles(latencies, n=100) if len(results) > 1 else []
+
+        def milliseconds(seconds):
+            return f"{seconds * 1000:.1f} ms"
+
+        self.stdout.write(
+            f"{len(results)} requests, {options['concurrency']} at a time, "
+            f"in {elapsed:.2f} s"
+        )
+        self.stdout.write(f"  throughput: {len(results) / elapsed:.1f} requests/s")
+        # Little's law: the average number of requests being served at once.
+        self.stdout.write(f"  served concurrently: {sum(latencies) / elapsed:.1f}")
+        self.stdout.write(
+            f"  latency p50: {milliseconds(statistics.median(latencies))}"
+        )
+        if percentiles:
+            self.stdout.write(f"  latency p95: {milliseconds(percentiles[94])}")
+        self.stdout.write(f"  latency max: {milliseconds(latencies[-1])}")
+        for status, count in sorted(statuses.items(), key=str):
+            self.stdout.write(f"  {status}: {count}")
@@ -0,0 +1,149 @@
+"""
+Compressing responses with brotli or gzip, whichever the client prefers.
+
+Unlike Django's ``GZipMiddleware``, streamed responses are only
+compressed once they have produced ``COMPRESSION_MIN_BYTES``: at most that
+much is held back to decide, so small bodies aren't inflated by
+compression and large ones still start sending straight away. Every
+chunk of a streamed response is flushed through the compressor as it
+arrives, so clients can read each one without waiting for the next.
+"""
+import itertools
+import re
+import typing as t
+import zlib
+
+import brotli
+from django.utils.cache import patch_vary_headers
+
+from sky_write_django.settings import COMPRESSION_MIN_BYTES
+
+# Archives and most stored content are compressed already.
+COMPRESSIBLE_CONTENT_TYPES = {
+    "application/json",
+    "application/msgpack",
+    "application/x-ndjson",
+    "text/html",
+    "text/plain",
+}
+
+# Dynamic responses favour speed over size; these are the usual levels
+# for compressing as a response is sent.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+accept_encoding_re = re.compile(r"^\s*([^\s;]+)\s*(?:;\s*q\s*=\s*([0-9.]+)\s*)?$")
+
+
+class Compressor:
+    """Compresses a body a chunk at a time."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # A window of 16 + 15 bits writes a gzip header and trailer.
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.process(data)
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.flush()
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+def get_encoding(accept_encoding: str) -> t.Optional[str]:
+    """Return the encoding the client prefers, of "br" and "gzip", or
+    ``None`` if it accepts neither. Brotli wins ties."""
+    weights = {}
+    for value in accept_encoding.split(","):
+        match = accept_encoding_re.match(value)
+        if match is None:
+            continue
+        coding, weight = match.groups()
+        try:
+            weights[coding.lower()] = float(weight or 1)
+        except ValueError:
+            continue
+    default = weights.get("*", 0)
+    best, best_weight = None, 0
+    for encoding in ("br", "gzip"):
+        weight = weights.get(encoding, default)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def iter_compressed(
+    compressor: Compressor, chunks: t.Iterable[bytes]
+) -> t.Iterator[bytes]:
+    """Compress chunks, flushing after each so none is held back."""
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+        if content_type not in COMPRESSIBLE_CONTENT_TYPES or response.has_header(
+            "Content-Encoding"
+        ):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = get_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            chunks = iter(response.streaming_content)
+            head = []
+            head_bytes = 0
+            for chunk in chunks:
+                head.append(chunk)
+                head_bytes += len(chunk)
+                if head_bytes >= COMPRESSION_MIN_BYTES:
+                    break
+            else:
+                # The whole body is small, so it's sent as it is.
+                response.streaming_content = head
+                return response
+            response.streaming_content = iter_compressed(
+                Compressor(encoding), itertools.chain(head, chunks)
+            )
+            # The length, if set, was of the uncompressed content.
+            del response["Content-Length"]
+        else:
+            if len(response.content) < COMPRESSION_MIN_BYTES:
+                return response
+            compressor = Compressor(encoding)
+            content = compressor.compress(response.content) + compressor.finish()
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response["Content-Length"] = str(len(response.content))
+
+        # The compressed body is a different representation, so a strong
+        # ETag no longer identifies it byte for byte.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = f"W/{etag}"
+        response["Content-Encoding"] = encoding
+        return response
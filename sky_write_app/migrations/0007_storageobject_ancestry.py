@@ -0,0 +1,60 @@
+# Generated by Django 4.0.5 on 2026-10-18 15:13
+
+from django.db import migrations, models
+
+
+def populate_ancestry(apps, schema_editor):
+    StorageObject = apps.get_model("sky_write_app", "StorageObject")
+    parents = dict(StorageObject.objects.values_list("id", "folder_id"))
+    ancestries = {}
+
+    def get_ancestry(pk):
+        chain = []
+        folder_id = parents[pk]
+        while folder_id is not None and folder_id not in ancestries:
+            chain.append(folder_id)
+            folder_id = parents.get(folder_id)
+        ancestry = ""
+        if folder_id is not None:
+            ancestry = f"{ancestries[folder_id]}{folder_id}/"
+        for folder_id in reversed(chain):
+            ancestries[folder_id] = ancestry
+            ancestry = f"{ancestry}{folder_id}/"
+        return ancestry
+
+    objects = []
+    for obj in StorageObject.objects.only("id", "folder_id").iterator():
+        obj.ancestry = get_ancestry(obj.id)
+        objects.append(obj)
+    StorageObject.objects.bulk_update(objects, ["ancestry"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sky_write_app", "0006_alter_storageobject_ordering_parameter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="storageobject",
+            name="ancestry",
+            field=models.TextField(
+                blank=True,
+                default="",
+                help_text=(
+                    "IDs of all containing folders, outermost first, each "
+                    "followed by a slash; empty for objects at the root"
+                ),
+            ),
+        ),
+        migrations.RunPython(populate_ancestry, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="storageobject",
+            index=models.Index(
+                fields=["ancestry"],
+                name="storage_object_ancestry",
+                opclasses=["text_pattern_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.0.5 on 2026-10-18 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sky_write_app", "0007_storageobject_ancestry"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="storageobject",
+            index=models.Index(
+                fields=["user", "folder", "ordering_parameter"],
+                name="storage_object_listing",
+            ),
+        ),
+    ]
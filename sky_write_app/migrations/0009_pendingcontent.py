@@ -0,0 +1,46 @@
+# Generated by Django 4.0.5 on 2026-10-18 15:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sky_write_app", "0008_storageobject_listing_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingContent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content", models.BinaryField()),
+                (
+                    "revision",
+                    models.PositiveIntegerField(
+                        default=1,
+                        help_text="Incremented whenever the content is replaced",
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "storage_object",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pending_content",
+                        to="sky_write_app.storageobject",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.0.5 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sky_write_app", "0009_pendingcontent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="storageobject",
+            name="content_revision",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Incremented whenever the content is saved"
+            ),
+        ),
+    ]
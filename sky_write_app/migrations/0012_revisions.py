@@ -0,0 +1,78 @@
+# Generated by Django 4.0.5 on 2026-10-18 15:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("sky_write_app", "0011_importjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeletedStorageObject",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("storage_object_id", models.BigIntegerField()),
+                ("revision", models.PositiveBigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RevisionCounter",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("revision", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="storageobject",
+            name="revision",
+            field=models.PositiveBigIntegerField(
+                default=0,
+                help_text="The owner's revision at which this object last changed",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="storageobject",
+            index=models.Index(
+                fields=["user", "revision"], name="storage_object_revision"
+            ),
+        ),
+        migrations.AddField(
+            model_name="deletedstorageobject",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="deletedstorageobject",
+            index=models.Index(
+                fields=["user", "revision"], name="deleted_object_revision"
+            ),
+        ),
+    ]
@@ -1,7 +1,27 @@
 from uuid import uuid4
 
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+from django.utils.translation import gettext_lazy as _
+
+
+class StorageObjectQuerySet(models.QuerySet):
+    def descendants_of(self, storage_object):
+        """All objects inside a folder, at any depth."""
+        return self.filter(ancestry__startswith=storage_object.descendant_ancestry)
+
+    def rebase_ancestry(self, old_prefix, new_prefix):
+        """Replace the leading ``old_prefix`` of the ancestry of every
+        object under it with ``new_prefix``, in a single query."""
+        return self.filter(ancestry__startswith=old_prefix).update(
+            ancestry=Concat(
+                Value(new_prefix),
+                Substr("ancestry", len(old_prefix) + 1),
+                output_field=models.TextField(),
+            )
+        )
 
 
 class StorageObject(models.Model):
@@ -30,3 +50,240 @@ class StorageObject(models.Model):
         blank=True,
         null=False,
     )
+    ancestry = models.TextField(
+        blank=True,
+        default="",
+        help_text=(
+            "IDs of all containing folders, outermost first, each followed by "
+            "a slash; empty for objects at the root"
+        ),
+    )
+
+    content_revision = models.PositiveIntegerField(
+        default=0,
+        help_text="Incremented whenever the content is saved",
+    )
+    revision = models.PositiveBigIntegerField(
+        default=0,
+        help_text="The owner's revision at which this object last changed",
+    )
+
+    objects = StorageObjectQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["ancestry"],
+                name="storage_object_ancestry",
+                opclasses=["text_pattern_ops"],
+            ),
+            # Folder listings filter on user and folder, then sort by
+            # ordering parameter.
+            models.Index(
+                fields=["user", "folder", "ordering_parameter"],
+                name="storage_object_listing",
+            ),
+            models.Index(
+                fields=["user", "revision"],
+                name="storage_object_revision",
+            ),
+        ]
+
+    _loaded_folder_id = None
+    _loaded_ancestry = ""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_folder_id = instance.__dict__.get("folder_id")
+        instance._loaded_ancestry = instance.__dict__.get("ancestry", "")
+        return instance
+
+    @property
+    def path_ids(self):
+        """IDs of the folders containing this object, outermost first."""
+        return [int(pk) for pk in self.ancestry.split("/") if pk]
+
+    @property
+    def descendant_ancestry(self):
+        """The ancestry prefix shared by everything inside this object."""
+        return f"{self.ancestry}{self.id}/"
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        moved = adding or self.folder_id != self._loaded_folder_id
+        old_descendant_ancestry = f"{self._loaded_ancestry}{self.id}/"
+        extra_update_fields = ["revision"]
+
+        if moved:
+            if self.folder_id is None:
+                self.ancestry = ""
+            else:
+                if self.folder_id == self.id or self.folder.ancestry.startswith(
+                    old_descendant_ancestry
+                ):
+                    raise ValueError(
+                        f"StorageObject {self.id} cannot be moved inside itself."
+                    )
+                self.ancestry = self.folder.descendant_ancestry
+            extra_update_fields.append("ancestry")
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *extra_update_fields}
+
+        with transaction.atomic():
+            self.revision = RevisionCounter.allocate(self.user_id)
+            super().save(*args, **kwargs)
+            if moved and not adding and not self.is_file:
+                StorageObject.objects.rebase_ancestry(
+                    old_descendant_ancestry, self.descendant_ancestry
+                )
+        self._loaded_folder_id = self.folder_id
+        self._loaded_ancestry = self.ancestry
+
+
+class RevisionCounter(models.Model):
+    """The latest revision of a user's storage objects. Every change to
+    them is given the next revision, so clients can ask for everything
+    that changed after the revision they last saw."""
+
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+    revision = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, user_id) -> int:
+        """
+        Return the user's next revision.
+
+        Must be called in a transaction: the counter stays locked until
+        the transaction ends, so that changes are committed in the order
+        of their revisions, and a client that has seen a revision can't
+        miss an earlier one.
+        """
+        counter = cls.objects.filter(user_id=user_id)
+        if not counter.update(revision=F("revision") + 1):
+            cls.objects.get_or_create(user_id=user_id)
+            counter.update(revision=F("revision") + 1)
+        return counter.values_list("revision", flat=True).get()
+
+    @classmethod
+    def current(cls, user_id) -> int:
+        counter = cls.objects.filter(user_id=user_id).first()
+        return counter.revision if counter is not None else 0
+
+
+class DeletedStorageObject(models.Model):
+    """A record that a storage object was deleted, for clients that last
+    saw the user's storage before then."""
+
+    user = models.ForeignKey(
+        User,
+        related_name="+",
+        blank=False,
+        null=False,
+        on_delete=models.CASCADE,
+    )
+    storage_object_id = models.BigIntegerField()
+    revision = models.PositiveBigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "revision"],
+                name="deleted_object_revision",
+            ),
+        ]
+
+
+class PendingContent(models.Model):
+    """Content that has been saved, but not yet written to the user's
+    storage backend. Used when ``CONTENT_WRITE_BEHIND`` is on."""
+
+    storage_object = models.OneToOneField(
+        StorageObject,
+        related_name="pending_content",
+        blank=False,
+        null=False,
+        on_delete=models.CASCADE,
+    )
+    content = models.BinaryField()
+    revision = models.PositiveIntegerField(
+        default=1,
+        help_text="Incremented whenever the content is replaced",
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class ImportStatus(models.TextChoices):
+    """Enum for the states of an import job."""
+
+    RUNNING = "RUNNING", _("Running")
+    COMPLETE = "COMPLETE", _("Complete")
+    FAILED = "FAILED", _("Failed")
+
+
+class ImportJob(models.Model):
+    """An archive being imported into a user's storage, with how far the
+    import has got, so that it can be resumed."""
+
+    user = models.ForeignKey(
+        User,
+        related_name="import_jobs",
+        blank=False,
+        null=False,
+        on_delete=models.CASCADE,
+    )
+    source = models.TextField(help_text="Path of the archive")
+    folder = models.ForeignKey(
+        StorageObject,
+        related_name="+",
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        help_text="Folder to import into; the root if empty",
+    )
+    status = models.CharField(
+        max_length=8,
+        choices=ImportStatus.choices,
+        default=ImportStatus.RUNNING,
+    )
+    members_done = models.PositiveIntegerField(
+        default=0,
+        help_text="Archive members imported so far, in archive order",
+    )
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class ImportedFolder(models.Model):
+    """A folder created by an import job, by its path in the archive."""
+
+    job = models.ForeignKey(
+        ImportJob,
+        related_name="folders",
+        blank=False,
+        null=False,
+        on_delete=models.CASCADE,
+    )
+    path = models.TextField()
+    storage_object = models.ForeignKey(
+        StorageObject,
+        related_name="+",
+        blank=False,
+        null=False,
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "path"], name="imported_folder_unique_path"
+            ),
+        ]
@@ -0,0 +1,160 @@
+"""
+Allocation of ``ordering_parameter`` values.
+
+Appended siblings are spaced ``ORDERING_STEP`` apart, so appending never
+narrows the room left for later appends. Inserting between neighbours
+takes their midpoint, which only touches the new object. When the room
+runs out, the siblings around the cramped spot are renumbered; all other
+siblings keep their values.
+"""
+from bisect import bisect_left
+from decimal import ROUND_FLOOR, Decimal
+
+from django.db import transaction
+from django.db.models import F, Max
+
+from sky_write_app.models import RevisionCounter, StorageObject
+from sky_write_django.settings import ORDERING_MAX, ORDERING_STEP
+
+# Matches ``decimal_places`` of ``StorageObject.ordering_parameter``.
+ORDERING_PRECISION = Decimal("0.00000000001")
+
+
+class OrderingGapExhausted(Exception):
+    """Raised when there is no room left for new values in a gap."""
+
+
+def quantize(value):
+    return Decimal(value).quantize(ORDERING_PRECISION, rounding=ROUND_FLOOR)
+
+
+def between(before=None, after=None):
+    """Return a value between two neighbours. ``None`` stands for the
+    start or end of the range of values."""
+    lower = Decimal(0) if before is None else before
+    upper = Decimal(ORDERING_MAX) if after is None else after
+    value = quantize((lower + upper) / 2)
+    if not lower < value < upper:
+        raise OrderingGapExhausted(f"No room between {lower} and {upper}.")
+    return value
+
+
+def following(last=None, count=1):
+    """Return ``count`` increasing values after ``last``. They are
+    ``ORDERING_STEP`` apart if there is room, and squeezed evenly into
+    what's left otherwise."""
+    lower = Decimal(0) if last is None else last
+    upper = Decimal(ORDERING_MAX)
+    step = Decimal(ORDERING_STEP)
+    if lower + step * count >= upper:
+        step = quantize((upper - lower) / (count + 1))
+        if step <= 0:
+            raise OrderingGapExhausted(f"No room for {count} after {lower}.")
+    return [lower + step * (index + 1) for index in range(count)]
+
+
+def following_expression(last, values_max):
+    """
+    Return an expression that moves ``ordering_parameter`` values up to
+    ``values_max`` after ``last``, keeping their order, along with the
+    value that ``values_max`` moves to.
+
+    Values are shifted if there's room for them, and scaled down to fit
+    what's left otherwise, so objects can be moved with a single UPDATE.
+    """
+    lower = Decimal(0) if last is None else last
+    upper = Decimal(ORDERING_MAX)
+    if lower + values_max < upper:
+        return F("ordering_parameter") + lower, lower + values_max
+    scale = quantize((upper - lower) / upper)
+    if scale <= 0:
+        raise OrderingGapExhausted(f"No room after {lower}.")
+    return F("ordering_parameter") * scale + lower, lower + values_max * scale
+
+
+def get_last_ordering_parameter(user_id, folder_id):
+    return StorageObject.objects.filter(user_id=user_id, folder_id=folder_id).aggregate(
+        last=Max("ordering_parameter")
+    )["last"]
+
+
+def allocate_last(user_id, folder_id, count=1):
+    """Return ``count`` values that place new objects after all of their
+    siblings in a folder.
+
+    If there's no room left at the end, the last siblings are renumbered
+    immediately. If there's room now but the next append wouldn't get a
+    full step, the renumbering is deferred to a background task."""
+    last = get_last_ordering_parameter(user_id, folder_id)
+    try:
+        values = following(last, count)
+    except OrderingGapExhausted:
+        rebalance(user_id, folder_id, last)
+        last = get_last_ordering_parameter(user_id, folder_id)
+        values = following(last, count)
+    if values and values[-1] + ORDERING_STEP >= ORDERING_MAX:
+        schedule_rebalance(user_id, folder_id, values[-1])
+    return values
+
+
+def schedule_rebalance(user_id, folder_id, around):
+    """Run ``rebalance`` in the background once the current transaction
+    has been committed."""
+    from sky_write_app.tasks import rebalance_siblings
+
+    transaction.on_commit(
+        lambda: rebalance_siblings.delay(user_id, folder_id, str(around))
+    )
+
+
+def rebalance(user_id, folder_id, around):
+    """
+    Renumber the siblings around the value ``around``, so that they are
+    ``ORDERING_STEP`` apart again where possible.
+
+    Starting with the sibling at ``around``, the range is widened by one
+    sibling on each side until the room between its outer neighbours (or
+    the ends of the range of values) is wide enough; only siblings inside
+    it are updated. Returns the number of siblings that were renumbered.
+    """
+    with transaction.atomic():
+        # The counter is locked before the siblings, as everywhere else.
+        revision = RevisionCounter.allocate(user_id)
+        siblings = list(
+            StorageObject.objects.select_for_update()
+            .filter(user_id=user_id, folder_id=folder_id)
+            .order_by("ordering_parameter", "id")
+            .only("id", "ordering_parameter")
+        )
+        if not siblings:
+            return 0
+        values = [sibling.ordering_parameter for sibling in siblings]
+        step = Decimal(ORDERING_STEP)
+
+        def get_bounds(low, high):
+            lower = values[low - 1] if low > 0 else Decimal(0)
+            upper = values[high + 1] if high + 1 < len(values) else ORDERING_MAX
+            return lower, Decimal(upper)
+
+        low = high = min(bisect_left(values, Decimal(around)), len(values) - 1)
+        lower, upper = get_bounds(low, high)
+        if min(values[low] - lower, upper - values[high]) >= step:
+            # There's room already, e.g. thanks to an earlier task.
+            return 0
+        while True:
+            lower, upper = get_bounds(low, high)
+            count = high - low + 1
+            if (upper - lower) / (count + 1) >= step or count == len(values):
+                break
+            low = max(0, low - 1)
+            high = min(len(values) - 1, high + 1)
+
+        spacing = quantize((upper - lower) / (count + 1))
+        renumbered = [siblings[index] for index in range(low, high + 1)]
+        for index, sibling in enumerate(renumbered):
+            sibling.ordering_parameter = lower + spacing * (index + 1)
+            sibling.revision = revision
+        StorageObject.objects.bulk_update(
+            renumbered, ["ordering_parameter", "revision"]
+        )
+        return len(renumbered)
@@ -0,0 +1,69 @@
+"""
+Keyset pagination of folder listings.
+
+Objects are listed by ``(ordering_parameter, id)``, and each page ends
+with a cursor encoding the last object's position in that order. The
+next page starts after that position, so fetching it costs the same no
+matter how far into the folder it is, and objects moved or created
+between requests never cause others to be skipped or repeated.
+"""
+import base64
+import binascii
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+from sky_write_django.settings import LISTING_MAX_PAGE_SIZE, LISTING_PAGE_SIZE
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor or page size can't be used."""
+
+
+def encode_cursor(row: dict) -> str:
+    position = [str(row["ordering_parameter"]), row["id"]]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        ordering_parameter, pk = json.loads(base64.urlsafe_b64decode(cursor))
+        ordering_parameter = Decimal(ordering_parameter)
+        pk = int(pk)
+    except (binascii.Error, InvalidOperation, TypeError, ValueError) as e:
+        raise InvalidCursor("An invalid cursor was sent") from e
+    if not ordering_parameter.is_finite():
+        raise InvalidCursor("An invalid cursor was sent")
+    return ordering_parameter, pk
+
+
+def get_page_size(value) -> int:
+    if value is None:
+        return LISTING_PAGE_SIZE
+    try:
+        page_size = int(value)
+    except ValueError:
+        raise InvalidCursor(f"An invalid page size was sent ({value})")
+    if page_size < 1:
+        raise InvalidCursor(f"An invalid page size was sent ({value})")
+    return min(page_size, LISTING_MAX_PAGE_SIZE)
+
+
+def paginate(queryset, cursor=None, page_size=LISTING_PAGE_SIZE):
+    """Return a page of ``queryset``, whose rows are dicts from
+    ``.values()``, starting after ``cursor``, and the cursor for the next
+    page, or ``None`` if this is the last page."""
+    queryset = queryset.order_by("ordering_parameter", "id")
+    if cursor is not None:
+        ordering_parameter, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(ordering_parameter__gt=ordering_parameter)
+            | Q(ordering_parameter=ordering_parameter, id__gt=pk)
+        )
+    # One extra object tells whether there is another page.
+    objects = list(queryset[: page_size + 1])
+    if len(objects) <= page_size:
+        return objects, None
+    objects = objects[:page_size]
+    return objects, encode_cursor(objects[-1])
@@ -0,0 +1,76 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renders JSON with orjson, which is many times faster than the
+    standard library, with the same output as ``JSONRenderer``.
+
+    Types orjson doesn't support are converted by ``JSONRenderer``'s
+    encoder, and anything else it can't render (e.g. indented output) is
+    rendered by ``JSONRenderer`` itself. Responses don't contain floats,
+    which orjson formats slightly differently (``1e16`` rather than
+    ``1e+16``, and NaN as ``null``).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                # Formatted by the encoder, as JSONRenderer does.
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer, so the output is a strict JavaScript
+        # subset.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders MessagePack, for clients that ask for it with
+    ``Accept: application/msgpack``. It's smaller and quicker to parse
+    than JSON.
+
+    Fields in ``numeric_fields`` are sent as numbers rather than decimal
+    strings. They are doubles, which have fewer significant digits than
+    ``ordering_parameter`` may, so clients should only compare them.
+    Other types are converted as ``JSONRenderer`` converts them.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+    numeric_fields = {"ordering_parameter"}
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(self.prepare(data), default=JSONEncoder().default)
+
+    def prepare(self, data):
+        if isinstance(data, dict):
+            return {
+                key: (
+                    float(value)
+                    if key in self.numeric_fields and value is not None
+                    else self.prepare(value)
+                )
+                for key, value in data.items()
+            }
+        if isinstance(data, (list, tuple)):
+            return [self.prepare(item) for item in data]
+        return data
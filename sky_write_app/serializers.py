@@ -1,8 +1,25 @@
-from django.contrib.auth.models import User
 from rest_framework import serializers
 
 from sky_write_app.models import StorageObject
-from sky_write_app.utils import format_path, get_calculated_path_ids
+
+
+def validate_object_ids(data, max_length=None):
+    """Check that a request body is a list of object IDs, and return them
+    as integers. Raises ``ValidationError`` otherwise."""
+    field = serializers.ListField(
+        child=serializers.IntegerField(),
+        max_length=max_length,
+        error_messages={
+            "not_a_list": "Request body must be a list of object IDs.",
+            "max_length": "Can't use more than {max_length} storage objects at once.",
+        },
+    )
+    return field.run_validation(data)
+
+
+class ReOrganizeSerializer(serializers.Serializer):
+    files = serializers.ListField(child=serializers.IntegerField())
+    folder_id = serializers.IntegerField(allow_null=True)
 
 
 class StorageObjectSerializer(serializers.ModelSerializer):
@@ -22,124 +39,53 @@ class StorageObjectSerializer(serializers.ModelSerializer):
     def validate(self, data):
         folder_id = self.initial_data.get("folder_id")
         if folder_id is not None:
-            folder = StorageObject.objects.filter(id=folder_id).first()
+            folder = StorageObject.objects.filter(
+                id=folder_id, user=self.context["request"].user, is_file=False
+            ).first()
             if folder is None:
                 raise serializers.ValidationError(
                     f"Invalid folder_id: StorageObject {folder_id} does not exist."
                 )
+            if self.instance is not None and (
+                folder.id == self.instance.id or self.instance.id in folder.path_ids
+            ):
+                raise serializers.ValidationError(
+                    f"Invalid folder_id: StorageObject {self.instance.id} cannot "
+                    "be moved inside itself."
+                )
             data["folder_id"] = folder.id
         return data
 
 
-class FileSerializer(serializers.ModelSerializer):
-    files = serializers.SerializerMethodField()
-    path = serializers.SerializerMethodField()
-
-    class Meta:
-        fields = [
-            "id",
-            "name",
-            "name_iv",
-            "is_file",
-            "files",
-            "path",
-            "ordering_parameter",
-        ]
-        model = StorageObject
-
-    @staticmethod
-    def get_files(_):
-        return []
-
-    @staticmethod
-    def get_path(file):
-        return format_path(file)
+class BatchItemSerializer(serializers.ModelSerializer):
+    """One new object in a batch. Its folder is either an existing folder
+    (``folder_id``) or another object in the batch (``folder_temp_id``,
+    matching that object's ``temp_id``). Folders are checked as a whole
+    by ``batch.create_batch``."""
 
-
-class FolderSerializer(serializers.ModelSerializer):
-    files = serializers.SerializerMethodField()
-    path = serializers.SerializerMethodField()
+    temp_id = serializers.CharField(required=False)
+    folder_id = serializers.IntegerField(required=False, allow_null=True)
+    folder_temp_id = serializers.CharField(required=False, allow_null=True)
+    content = serializers.CharField(
+        required=False, allow_blank=True, trim_whitespace=False
+    )
 
     class Meta:
         fields = [
-            "id",
+            "temp_id",
             "name",
             "name_iv",
+            "content_iv",
             "is_file",
-            "files",
-            "path",
-            "ordering_parameter",
+            "folder_id",
+            "folder_temp_id",
+            "content",
         ]
         model = StorageObject
 
-    @staticmethod
-    def get_files(folder):
-        ret = []
-        for storage_obj in folder.contents.order_by("ordering_parameter").all():
-            if storage_obj.is_file:
-                ret.append(FileSerializer(storage_obj).data)
-            else:
-                ret.append(FolderSerializer(storage_obj).data)
-        return ret
-
-    @staticmethod
-    def get_path(folder):
-        return format_path(folder)
-
-
-class MeSerializer(serializers.ModelSerializer):
-    storage_objects = serializers.SerializerMethodField()
-    encryption_key = serializers.SerializerMethodField()
-    last_file = serializers.SerializerMethodField()
-    path_to_last_file = serializers.SerializerMethodField()
-
-    class Meta:
-        fields = [
-            "username",
-            "storage_objects",
-            "encryption_key",
-            "last_file",
-            "path_to_last_file",
-        ]
-        model = User
-
-    @staticmethod
-    def get_storage_objects(user):
-        ret = []
-        for storage_object in (
-            user.storage_objects.filter(folder_id=None)
-            .order_by("ordering_parameter")
-            .all()
-        ):
-            if storage_object.is_file:
-                ret.append(FileSerializer(storage_object).data)
-            else:
-                ret.append(FolderSerializer(storage_object).data)
-        return ret
-
-    @staticmethod
-    def get_encryption_key(user):
-        if hasattr(user, "custom_config"):
-            return user.custom_config.encryption_key
-        return None
-
-    @staticmethod
-    def get_last_file(user):
-        if hasattr(user, "custom_config"):
-            last_file_id = user.custom_config.last_file
-            last_obj = StorageObject.objects.filter(id=last_file_id).first()
-            if last_obj is not None:
-                return user.custom_config.last_file
-        return None
-
-    @staticmethod
-    def get_path_to_last_file(user):
-        if not hasattr(user, "custom_config"):
-            return None
-        file_id = user.custom_config.last_file
-        if file_id is None:
-            return None
-        obj = StorageObject.objects.filter(id=file_id).first()
-        if obj is not None:
-            return get_calculated_path_ids(obj)
-        return None
+    def validate(self, data):
+        if data.get("folder_id") is not None and data.get("folder_temp_id"):
+            raise serializers.ValidationError(
+                "Only one of folder_id and folder_temp_id can be given."
+            )
+        return data
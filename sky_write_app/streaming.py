@@ -0,0 +1,169 @@
+import codecs
+import itertools
+import json
+import typing as t
+
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from sky_write_app.renderers import ORJSONRenderer
+from sky_write_django.settings import STORAGE_CHUNK_SIZE
+
+
+def escape_json_string(text: str) -> str:
+    """Escape text for use inside a JSON string, exactly as DRF's
+    ``JSONRenderer`` would."""
+    escaped = json.dumps(text, ensure_ascii=False)[1:-1]
+    return escaped.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+
+
+def iter_json_string(chunks: t.Iterable[bytes]) -> t.Iterator[bytes]:
+    """Encode UTF-8 chunks as a JSON string, one chunk at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    yield b'"'
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield escape_json_string(text).encode()
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield escape_json_string(text).encode()
+    yield b'"'
+
+
+def stream_content_response(
+    data: dict, chunks: t.Optional[t.Iterator[bytes]], status: int = 200
+) -> StreamingHttpResponse:
+    """
+    Respond with ``data`` as JSON, with an extra ``content`` key holding
+    ``chunks`` decoded as a string (or ``null``).
+
+    The output is identical to rendering the whole dict with
+    ``JSONRenderer``, but content is sent as it is read instead of being
+    held in memory. The first chunk is read before responding, so that
+    errors opening the content aren't hidden behind a 200 status.
+    """
+    body = JSONRenderer().render(data)[:-1]
+    prefix = body + (b',"content":' if data else b'"content":')
+
+    if chunks is None:
+        content = iter([b"null"])
+    else:
+        chunks = iter(chunks)
+        first_chunk = next(chunks, b"")
+        content = iter_json_string(itertools.chain([first_chunk], chunks))
+
+    return StreamingHttpResponse(
+        itertools.chain([prefix], content, [b"}"]),
+        status=status,
+        content_type="application/json",
+    )
+
+
+class JSONArray:
+    """An array whose items are produced while it's streamed by
+    ``iter_json``, so that they needn't all be held in memory."""
+
+    def __init__(self, items: t.Iterable):
+        self.items = items
+
+
+def iter_json(value, renderer=None) -> t.Iterator[bytes]:
+    """
+    Yield ``value`` as JSON, identical to ``JSONRenderer``'s output.
+
+    ``JSONArray`` values, as items of other ``JSONArray`` values or as
+    values of dicts, are rendered an item at a time. Everything else is
+    rendered by ``renderer``, ``ORJSONRenderer`` by default.
+    """
+    renderer = renderer or ORJSONRenderer()
+    if isinstance(value, JSONArray):
+        yield b"["
+        for index, item in enumerate(value.items):
+            if index:
+                yield b","
+            yield from iter_json(item, renderer)
+        yield b"]"
+    elif isinstance(value, dict) and any(
+        isinstance(item, JSONArray) for item in value.values()
+    ):
+        # Consecutive ordinary items are rendered together.
+        yield b"{"
+        run = {}
+        separator = b""
+        for key, item in value.items():
+            if not isinstance(item, JSONArray):
+                run[key] = item
+                continue
+            if run:
+                yield separator + renderer.render(run)[1:-1]
+                run = {}
+                separator = b","
+            yield separator + renderer.render(key) + b":"
+            yield from iter_json(item, renderer)
+            separator = b","
+        if run:
+            yield separator + renderer.render(run)[1:-1]
+        yield b"}"
+    elif value is None:
+        # ``JSONRenderer`` renders ``None`` as an empty body.
+        yield b"null"
+    else:
+        yield renderer.render(value)
+
+
+def iter_buffered(chunks: t.Iterable[bytes], size: int = STORAGE_CHUNK_SIZE):
+    """Join small chunks into ones of at least ``size`` bytes, so they
+    aren't each written to the connection separately."""
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield b"".join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def iter_cache_through(
+    key: str, chunks: t.Iterable[bytes], max_bytes: int, timeout: int
+) -> t.Iterator[bytes]:
+    """Pass chunks on, and cache them joined together once they have all
+    been sent, unless there are more than ``max_bytes`` of them."""
+    cached = []
+    cached_bytes = 0
+    for chunk in chunks:
+        if cached is not None:
+            cached_bytes += len(chunk)
+            if cached_bytes <= max_bytes:
+                cached.append(chunk)
+            else:
+                cached = None
+        yield chunk
+    if cached is not None:
+        cache.set(key, b"".join(cached), timeout)
+
+
+def stream_json_response(value, status: int = 200, headers=None):
+    """Respond with ``value`` rendered by ``iter_json``."""
+    return StreamingHttpResponse(
+        iter_buffered(iter_json(value)),
+        status=status,
+        content_type="application/json",
+        headers=headers,
+    )
+
+
+def stream_json_lines(items: t.Iterable[dict], status: int = 200):
+    """Respond with each dict as a line of JSON, rendered as
+    ``JSONRenderer`` would, sending each line as soon as it's ready."""
+    renderer = ORJSONRenderer()
+    return StreamingHttpResponse(
+        (renderer.render(item) + b"\n" for item in items),
+        status=status,
+        content_type="application/x-ndjson",
+    )
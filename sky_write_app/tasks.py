@@ -0,0 +1,103 @@
+import logging
+from contextlib import suppress
+from datetime import timedelta
+from decimal import Decimal
+
+from celery import shared_task
+from django.db.models import F
+from django.utils import timezone
+
+from sky_write_app import ordering
+from sky_write_app.backends import get_backend, get_content_name
+from sky_write_app.imports import run_import
+from sky_write_app.models import ImportJob, ImportStatus, PendingContent, StorageObject
+from sky_write_django.settings import (
+    CONTENT_WRITE_MAX_ATTEMPTS,
+    CONTENT_WRITE_MAX_RETRIES,
+    CONTENT_WRITE_REQUEUE_AFTER,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def rebalance_siblings(user_id, folder_id, around):
+    """Renumber cramped siblings in a folder; see ``ordering.rebalance``."""
+    return ordering.rebalance(user_id, folder_id, Decimal(around))
+
+
+@shared_task(
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=CONTENT_WRITE_MAX_RETRIES,
+)
+def write_pending_content(storage_object_id):
+    """
+    Write a file's pending content to its owner's storage backend.
+
+    The pending content is only removed if it wasn't replaced while it
+    was being written; otherwise the newer content has its own task. If
+    the file was deleted in the meantime, what was written is deleted
+    again.
+    """
+    pending = (
+        PendingContent.objects.select_related("storage_object__user__custom_config")
+        .filter(storage_object_id=storage_object_id)
+        .first()
+    )
+    if pending is None:
+        # Already written by an earlier task.
+        return False
+
+    PendingContent.objects.filter(id=pending.id).update(attempts=F("attempts") + 1)
+    storage_object = pending.storage_object
+    backend = get_backend(storage_object.user.custom_config)
+    name = get_content_name(storage_object)
+    if backend is not None:
+        try:
+            backend.write(name, bytes(pending.content))
+        except Exception:
+            if pending.attempts + 1 == CONTENT_WRITE_MAX_ATTEMPTS:
+                logger.exception(
+                    "Giving up writing the content of storage object %s after "
+                    "%s attempts; it stays pending until it's saved again.",
+                    storage_object_id,
+                    CONTENT_WRITE_MAX_ATTEMPTS,
+                )
+            raise
+
+    PendingContent.objects.filter(id=pending.id, revision=pending.revision).delete()
+    if (
+        backend is not None
+        and not StorageObject.objects.filter(id=storage_object_id).exists()
+    ):
+        with suppress(FileNotFoundError):
+            backend.delete(name)
+    return True
+
+
+@shared_task
+def requeue_pending_content():
+    """Queue writes for content that has been pending for a while, e.g.
+    because the worker wasn't running when it was saved. Content that
+    has failed ``CONTENT_WRITE_MAX_ATTEMPTS`` times isn't queued again."""
+    cutoff = timezone.now() - timedelta(seconds=CONTENT_WRITE_REQUEUE_AFTER)
+    storage_object_ids = list(
+        PendingContent.objects.filter(
+            updated_at__lt=cutoff, attempts__lt=CONTENT_WRITE_MAX_ATTEMPTS
+        ).values_list("storage_object_id", flat=True)
+    )
+    for storage_object_id in storage_object_ids:
+        write_pending_content.delay(storage_object_id)
+    return len(storage_object_ids)
+
+
+# Acknowledged only once finished, so that a job that was running when
+# its worker stopped is run again, and resumes where it stopped.
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def import_archive(job_id):
+    job = ImportJob.objects.select_related("user__custom_config").get(id=job_id)
+    if job.status == ImportStatus.COMPLETE:
+        return job.members_done
+    run_import(job)
+    return job.members_done
@@ -9,6 +9,16 @@ urlpatterns = [
         views.StorageObjectView.as_view(),
         name="storage-object-view",
     ),
+    path(
+        "storage_objects/batch/",
+        views.StorageObjectBatchView.as_view(),
+        name="storage-object-batch-view",
+    ),
+    path(
+        "storage_objects/multi_get/",
+        views.StorageObjectMultiGetView.as_view(),
+        name="storage-object-multi-get-view",
+    ),
     path(
         "storage_objects/<int:pk>/",
         views.StorageObjectDetailView.as_view(),
@@ -24,6 +34,8 @@ urlpatterns = [
         views.FolderContentsView.as_view(),
         name="folder-contents-view",
     ),
+    path("export/", views.ExportView.as_view(), name="export-view"),
+    path("changes/", views.ChangesView.as_view(), name="changes-view"),
     path(
         "re_order/",
         views.StorageObjectReOrderView.as_view(),
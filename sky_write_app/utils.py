@@ -1,18 +1,33 @@
-import os
+import hashlib
 import typing as t
+from concurrent.futures import Future, ThreadPoolExecutor
 from urllib.parse import quote
 
-import requests
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from django.shortcuts import get_object_or_404
 from django.urls import reverse
-from dropbox import Dropbox, DropboxOAuth2Flow
-from dropbox.files import WriteMode
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+from dropbox import DropboxOAuth2Flow
+from rest_framework.renderers import JSONRenderer
 from rest_framework.request import Request
 
-from sky_write_app.models import StorageObject
+from sky_write_app import ordering
+from sky_write_app.backends import get_backend, get_content_name
+from sky_write_app.cache import content_cache
+from sky_write_app.changes import record_deletions
+from sky_write_app.concurrency import iter_concurrently
+from sky_write_app.models import PendingContent, RevisionCounter, StorageObject
 from sky_write_django.settings import (
+    CONTENT_UPLOAD_WORKERS,
+    CONTENT_WRITE_BEHIND,
     DBX_APP_KEY,
     DBX_APP_SECRET,
     DBX_RESOLUTION_PATH_NAME,
+    MULTI_GET_CONCURRENCY,
+    ORDERING_MAX,
+    ORDERING_STEP,
     SECRET_KEY,
 )
 from users_app.models import CustomConfig
@@ -49,22 +64,90 @@ def get_original_name(filename):
 
 def format_path(storage_object):
     """Return an encoded path for a storage object."""
-    focus_object = storage_object
-    path = quote(focus_object.name, safe="")
-    while focus_object.folder is not None:
-        focus_object = focus_object.folder
-        path = f"{quote(focus_object.name, safe='')}/{path}"
-    return path
+    path_ids = storage_object.path_ids
+    names = {}
+    if path_ids:
+        names = dict(
+            StorageObject.objects.filter(id__in=path_ids).values_list("id", "name")
+        )
+    return "/".join(
+        quote(name, safe="")
+        for name in [*(names[pk] for pk in path_ids), storage_object.name]
+    )
+
+
+def get_objects_in_order(user, object_ids):
+    """
+    Fetch a user's storage objects by ID with a single query. IDs must
+    have been validated as integers (see ``validate_object_ids``).
+
+    Returns the objects in the order their IDs were given, and ``None``.
+    If any ID doesn't belong to one of the user's objects, returns
+    ``None`` and the first such ID instead.
+    """
+    objects_by_id = StorageObject.objects.filter(user=user, id__in=object_ids).in_bulk()
+    objects = []
+    for obj_id in object_ids:
+        obj = objects_by_id.get(obj_id)
+        if obj is None:
+            return None, obj_id
+        objects.append(obj)
+    return objects, None
 
 
-def get_calculated_path_ids(obj: StorageObject):
-    """Get a list of IDs for folders containing a given object."""
-    calculated_path_reversed = []
-    parent_folder = obj.folder
-    while parent_folder is not None:
-        calculated_path_reversed.append(parent_folder.id)
-        parent_folder = parent_folder.folder
-    return reversed(calculated_path_reversed)
+class InvalidMove(Exception):
+    """Raised when objects can't be moved to a folder."""
+
+
+def get_objects_to_move(user, object_ids, folder_id):
+    """
+    Fetch a user's objects and the folder they're being moved into (or
+    ``None`` for the root), checking that the folder is one of the user's
+    and isn't inside any of the objects. Raises ``InvalidMove`` otherwise.
+
+    Should be called with the user's revision counter locked, so that
+    nothing is moved between checking and moving.
+    """
+    objects, invalid_id = get_objects_in_order(user, object_ids)
+    if objects is None:
+        raise InvalidMove(f"An invalid object ID was sent ({invalid_id})")
+    if folder_id is None:
+        return objects, None
+
+    folder = StorageObject.objects.filter(id=folder_id, user=user).first()
+    if folder is None or folder.is_file:
+        raise InvalidMove(f"An invalid folder ID was sent ({folder_id})")
+    # A folder can't be moved inside itself.
+    for obj in objects:
+        if obj.id == folder.id or obj.id in folder.path_ids:
+            raise InvalidMove(f"An invalid folder ID was sent ({folder_id})")
+    return objects, folder
+
+
+def move_objects(user_id, objects, folder, revision):
+    """Move objects after the existing contents of a folder (or of the
+    root, if ``folder`` is ``None``), in order, along with everything
+    inside them."""
+    folder_id = folder.id if folder is not None else None
+    ancestry = folder.descendant_ancestry if folder is not None else ""
+    ordering_parameters = ordering.allocate_last(user_id, folder_id, len(objects))
+    for obj, ordering_parameter in zip(objects, ordering_parameters):
+        obj.ordering_parameter = ordering_parameter
+        obj.revision = revision
+        if not obj.is_file and obj.ancestry != ancestry:
+            # Everything inside a moved folder moves with it, including
+            # other objects being moved.
+            old_prefix = obj.descendant_ancestry
+            new_prefix = f"{ancestry}{obj.id}/"
+            StorageObject.objects.rebase_ancestry(old_prefix, new_prefix)
+            for other in objects:
+                if other.ancestry.startswith(old_prefix):
+                    other.ancestry = f"{new_prefix}{other.ancestry[len(old_prefix):]}"
+        obj.folder_id = folder_id
+        obj.ancestry = ancestry
+    StorageObject.objects.bulk_update(
+        objects, ["ordering_parameter", "folder", "ancestry", "revision"]
+    )
 
 
 def get_dropbox_auth_flow(request: Request, session: dict = None):
@@ -113,82 +196,317 @@ def save_file(request: Request, storage_object_id: int):
     config: CustomConfig = request.user.custom_config
     storage_object = StorageObject.objects.filter(id=storage_object_id).first()
 
-    filename = f"{str(storage_object.file_uuid)}.txt"
+    if CONTENT_WRITE_BEHIND:
+        queue_content(storage_object, bytes_content)
+    else:
+        backend = get_backend(config)
+        if backend is not None:
+            backend.write(get_content_name(storage_object), bytes_content)
+
+    # Bumped after writing, so that content cached under the new revision
+    # can't be the old content.
+    with transaction.atomic():
+        StorageObject.objects.filter(id=storage_object.id).update(
+            content_revision=F("content_revision") + 1,
+            revision=RevisionCounter.allocate(storage_object.user_id),
+        )
+    content_cache.discard(storage_object.file_uuid)
+
+
+def queue_content(storage_object: StorageObject, content: bytes):
+    """
+    Save a file's content as pending, and write it to storage in the
+    background once the current transaction has been committed.
 
-    if config.default_storage == "DX":
-        dbx = Dropbox(
-            oauth2_refresh_token=config.dropbox_token,
-            app_key=DBX_APP_KEY,
-            app_secret=DBX_APP_SECRET,
+    Only the latest pending content of a file is kept, so saving again
+    before the write has happened replaces it.
+    """
+    from sky_write_app.tasks import write_pending_content
+
+    def replace():
+        return PendingContent.objects.filter(storage_object=storage_object).update(
+            content=content,
+            revision=F("revision") + 1,
+            attempts=0,
+            updated_at=timezone.now(),
         )
-        dbx.refresh_access_token()
-        dbx.files_upload(bytes_content, f"/{filename}", mode=WriteMode.overwrite)
 
-    elif config.default_storage == "LS":
-        with open(f"/code/local_storage/{filename}", "w") as file:
-            file.writelines([string_content])
+    if not replace():
+        try:
+            with transaction.atomic():
+                PendingContent.objects.create(
+                    storage_object=storage_object, content=content
+                )
+        except IntegrityError:
+            # Another request created it first.
+            replace()
 
+    transaction.on_commit(lambda: write_pending_content.delay(storage_object.id))
 
-def load_file(request: Request, storage_object_id: int) -> t.Optional[str]:
 
-    if request.data.get("is_file") is False:
+def upload_contents(
+    config: CustomConfig, contents: t.List[t.Tuple[StorageObject, bytes]]
+) -> t.Dict[str, str]:
+    """
+    Upload the content of many new files at once, with uploads running
+    concurrently. Returns an error message for each content name that
+    couldn't be saved. Call it outside any transaction, as uploads can be
+    slow. With write-behind, nothing is uploaded here (see
+    ``queue_contents``).
+    """
+    if CONTENT_WRITE_BEHIND:
+        return {}
+    backend = get_backend(config)
+    if backend is None:
+        return {}
+
+    def write(item):
+        obj, content = item
+        try:
+            backend.write(get_content_name(obj), content)
+        except Exception as e:
+            return str(e) or type(e).__name__
+        return None
+
+    with ThreadPoolExecutor(max_workers=CONTENT_UPLOAD_WORKERS) as executor:
+        errors = list(executor.map(write, contents))
+    return {
+        get_content_name(obj): error
+        for (obj, _content), error in zip(contents, errors)
+        if error is not None
+    }
+
+
+def discard_uploaded_contents(config: CustomConfig, names: t.Iterable[str]):
+    """Delete content uploaded by ``upload_contents`` for files that
+    weren't created after all."""
+    if CONTENT_WRITE_BEHIND:
         return
+    backend = get_backend(config)
+    if backend is not None:
+        backend.delete_many(names)
 
-    config: CustomConfig = request.user.custom_config
-    storage_object = StorageObject.objects.filter(id=storage_object_id).first()
 
-    filename = f"{str(storage_object.file_uuid)}.txt"
+def queue_contents(contents: t.List[t.Tuple[StorageObject, bytes]]):
+    """With write-behind, save the content of many new files to be
+    written to storage once they are committed. Must be called in the
+    transaction that creates them."""
+    if not CONTENT_WRITE_BEHIND:
+        return
+    from sky_write_app.tasks import write_pending_content
 
-    if config.default_storage == "DX":
-        dbx = Dropbox(
-            oauth2_refresh_token=config.dropbox_token,
-            app_key=DBX_APP_KEY,
-            app_secret=DBX_APP_SECRET,
-        )
-        dbx.refresh_access_token()
+    PendingContent.objects.bulk_create(
+        PendingContent(storage_object=obj, content=content) for obj, content in contents
+    )
 
-        # Get file metadata and the Dropbox response, which holds the
-        # POST request we'll use to retrieve file content.
-        _metadata, dbx_response = dbx.files_download(f"/{filename}")
-        post_request_obj = dbx_response.request
+    def queue_writes():
+        for obj, _content in contents:
+            write_pending_content.delay(obj.id)
 
-        # Send the POST request and receive file content.
-        session = requests.Session()
-        file_response = session.send(post_request_obj)
-        return "".join([line.decode() for line in file_response.iter_lines()])
+    transaction.on_commit(queue_writes)
 
-    elif config.default_storage == "LS":
-        with open(f"/code/local_storage/{filename}", "r") as file:
-            return "".join(list(file.readlines()))
 
+def open_file(
+    request: Request, storage_object: StorageObject
+) -> t.Optional[t.Iterator[bytes]]:
+    """Return an iterator over the content of a file in chunks, or
+    ``None`` if the object has no content."""
 
-def delete_object(request: Request, storage_object_id: int, recursive: bool = False):
+    if request.data.get("is_file") is False or not storage_object.is_file:
+        return None
+
+    # Content that hasn't been written to storage yet is newer than
+    # whatever storage has.
+    pending = (
+        PendingContent.objects.filter(storage_object=storage_object)
+        .values_list("content", flat=True)
+        .first()
+    )
+    if pending is not None:
+        return iter([bytes(pending)])
+
+    return open_stored_file(request.user.custom_config, storage_object)
+
+
+def open_stored_file(
+    config: CustomConfig, storage_object: StorageObject
+) -> t.Optional[t.Iterator[bytes]]:
+    """Return an iterator over the content a file has in storage, or
+    ``None`` if the user has no storage. Doesn't query the database, so
+    it can be used from other threads."""
+    backend = get_backend(config)
+    if backend is None:
+        return None
+    version = get_content_version(config, storage_object)
+    content = content_cache.get(storage_object.file_uuid, version)
+    if content is not None:
+        return iter([content])
+    return content_cache.iter_through(
+        storage_object.file_uuid,
+        version,
+        backend.iter_chunks(get_content_name(storage_object)),
+    )
+
+
+def iter_file_contents(
+    config: CustomConfig,
+    storage_objects: t.List[StorageObject],
+    ordered: bool = False,
+) -> t.Iterator[t.Tuple[StorageObject, Future]]:
+    """
+    Read the content of many objects concurrently, with at most
+    ``MULTI_GET_CONCURRENCY`` reads at once. Yields each object with a
+    future for its content (``None`` for folders) as soon as it has been
+    read, or in order if ``ordered``.
+    """
+    pending_contents = dict(
+        PendingContent.objects.filter(
+            storage_object__in=[obj.id for obj in storage_objects if obj.is_file]
+        ).values_list("storage_object_id", "content")
+    )
+
+    def read(storage_object):
+        if not storage_object.is_file:
+            return None
+        if storage_object.id in pending_contents:
+            return bytes(pending_contents[storage_object.id])
+        chunks = open_stored_file(config, storage_object)
+        return None if chunks is None else b"".join(chunks)
+
+    return iter_concurrently(read, storage_objects, MULTI_GET_CONCURRENCY, ordered)
+
+
+def get_content_version(config: CustomConfig, storage_object: StorageObject) -> str:
+    """Identifies the content a file has in a user's storage; it changes
+    whenever the content is saved or the user switches storage."""
+    return f"{config.default_storage}:{storage_object.content_revision}"
+
+
+def get_etag(config: CustomConfig, storage_object: StorageObject, data: dict) -> str:
+    """An ETag for a storage object's data along with its content, which
+    can be computed without reading the content."""
+    digest = hashlib.sha1(JSONRenderer().render(data))
+    digest.update(get_content_version(config, storage_object).encode())
+    return quote_etag(digest.hexdigest())
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header matches an ETag. It
+    uses weak comparison, so "W/" prefixes are ignored."""
+    if_none_match = {
+        tag.removeprefix("W/")
+        for tag in parse_etags(request.headers.get("If-None-Match", ""))
+    }
+    return etag in if_none_match or "*" in if_none_match
+
+
+def get_me_version(user, revision: int) -> str:
+    """Identifies a user's ``/me/`` data: the revision of their storage
+    objects, along with everything else it includes."""
+    config = getattr(user, "custom_config", None)
+    digest = hashlib.sha1(
+        JSONRenderer().render(
+            [
+                user.username,
+                config and config.encryption_key,
+                config and config.last_file,
+            ]
+        )
+    )
+    return f"{revision}:{digest.hexdigest()}"
 
-    config: CustomConfig = request.user.custom_config
-    storage_object = StorageObject.objects.filter(id=storage_object_id).first()
 
-    filename = f"{str(storage_object.file_uuid)}.txt"
+def delete_object(
+    request: Request, storage_object_id: int, recursive: bool = False
+) -> t.List[StorageObject]:
+    """
+    Delete one of the user's storage objects and its content. A folder's
+    contents are deleted too if ``recursive``, and moved up into its
+    parent otherwise. Raises ``Http404`` if the user has no such object.
+
+    Files whose content couldn't be deleted from storage are kept, along
+    with the folders containing them, so that deleting can be retried.
+    Returns those files.
+    """
 
-    if storage_object.is_file:
-        if config.default_storage == "DX":
-            dbx = Dropbox(
-                oauth2_refresh_token=config.dropbox_token,
-                app_key=DBX_APP_KEY,
-                app_secret=DBX_APP_SECRET,
+    storage_object = get_object_or_404(
+        StorageObject, pk=storage_object_id, user=request.user
+    )
+    config: CustomConfig = request.user.custom_config
+
+    if not storage_object.is_file and not recursive:
+        with transaction.atomic():
+            revision = RevisionCounter.allocate(request.user.id)
+            # Fetched again now that the counter is locked, in case the
+            # folder was moved in the meantime.
+            storage_object = get_object_or_404(
+                StorageObject, pk=storage_object_id, user=request.user
             )
-            dbx.refresh_access_token()
+            move_contents_up(storage_object, revision)
+            record_deletions(storage_object.user_id, [storage_object.id], revision)
+            storage_object.delete()
+        return []
+
+    objects = [storage_object]
+    if not storage_object.is_file:
+        objects += (
+            StorageObject.objects.descendants_of(storage_object)
+            .filter(user=request.user)
+            .only("id", "is_file", "file_uuid", "ancestry")
+        )
 
-            dbx.files_delete_v2(f"/{filename}")
+    failed = delete_content(config, [obj for obj in objects if obj.is_file])
+    kept_ids = {pk for obj in failed for pk in [obj.id, *obj.path_ids]}
+    deleted_ids = [obj.id for obj in objects if obj.id not in kept_ids]
+    with transaction.atomic():
+        record_deletions(storage_object.user_id, deleted_ids)
+        StorageObject.objects.filter(id__in=deleted_ids).delete()
+    return failed
 
-        elif config.default_storage == "LS":
-            os.remove(f"/code/local_storage/{filename}")
 
-    else:
-        for obj in storage_object.contents.all():
-            if recursive:
-                delete_object(request, obj.id, recursive=True)
-            else:
-                obj.folder_id = storage_object.folder_id
-                obj.save()
-
-    storage_object.delete()
+def move_contents_up(folder: StorageObject, revision: int):
+    """
+    Move everything in a folder into the folder's parent, after the
+    parent's existing contents and in the same order as before.
+
+    Must be called with the user's revision counter locked, for
+    ``revision``, and with the folder fetched after locking it, so that
+    its ancestry is current. The contents are updated with a single
+    query, and everything further down with another one for their
+    ancestry.
+    """
+    user_id, parent_id = folder.user_id, folder.folder_id
+    contents_max = folder.contents.aggregate(last=Max("ordering_parameter"))["last"]
+    if contents_max is None:
+        return
+
+    last = ordering.get_last_ordering_parameter(user_id, parent_id)
+    try:
+        expression, new_max = ordering.following_expression(last, contents_max)
+    except ordering.OrderingGapExhausted:
+        ordering.rebalance(user_id, parent_id, last)
+        last = ordering.get_last_ordering_parameter(user_id, parent_id)
+        expression, new_max = ordering.following_expression(last, contents_max)
+
+    StorageObject.objects.rebase_ancestry(folder.descendant_ancestry, folder.ancestry)
+    folder.contents.update(
+        folder_id=parent_id,
+        ordering_parameter=expression,
+        revision=revision,
+    )
+    if new_max + ORDERING_STEP >= ORDERING_MAX:
+        ordering.schedule_rebalance(user_id, parent_id, new_max)
+
+
+def delete_content(
+    config: CustomConfig, files: t.List[StorageObject]
+) -> t.List[StorageObject]:
+    """Delete the content of files in bulk. Returns the files whose
+    content couldn't be deleted."""
+    for file in files:
+        content_cache.discard(file.file_uuid)
+    backend = get_backend(config)
+    if backend is None or not files:
+        return []
+    failures = backend.delete_many(get_content_name(file) for file in files)
+    return [file for file in files if get_content_name(file) in failures]
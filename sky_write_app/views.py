@@ -1,18 +1,56 @@
-from decimal import Decimal
-
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import quote_etag
 from rest_framework import generics, views
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from sky_write_app.models import StorageObject
+from sky_write_app.batch import BatchUploadFailed, InvalidBatch, create_batch
+from sky_write_app.changes import get_changes
+from sky_write_app.export import ARCHIVE_FORMATS, iter_export
+from sky_write_app.listing import ROW_FIELDS, get_me_data, iter_listing
+from sky_write_app.models import RevisionCounter, StorageObject
+from sky_write_app.ordering import allocate_last, following
+from sky_write_app.pagination import InvalidCursor, get_page_size, paginate
 from sky_write_app.serializers import (
-    FileSerializer,
-    MeSerializer,
+    BatchItemSerializer,
+    ReOrganizeSerializer,
     StorageObjectSerializer,
+    validate_object_ids,
+)
+from sky_write_app.streaming import (
+    JSONArray,
+    iter_buffered,
+    iter_cache_through,
+    iter_json,
+    stream_content_response,
+    stream_json_lines,
+    stream_json_response,
+)
+from sky_write_app.utils import (
+    InvalidMove,
+    delete_object,
+    etag_matches,
+    format_path,
+    get_etag,
+    get_me_version,
+    get_objects_in_order,
+    get_objects_to_move,
+    iter_file_contents,
+    move_objects,
+    open_file,
+    save_file,
 )
-from sky_write_app.utils import delete_object, load_file, save_file
-from sky_write_django.settings import ORDERING_MAX
+from sky_write_django.settings import (
+    BATCH_CREATE_MAX_OBJECTS,
+    ME_CACHE_MAX_BYTES,
+    ME_CACHE_TIMEOUT,
+    MULTI_GET_MAX_OBJECTS,
+)
+from users_app.authentication import CachedTokenAuthentication
 
 
 class MeView(views.APIView):
@@ -20,11 +58,42 @@ class MeView(views.APIView):
     including username, encryption key, and storage objects."""
 
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     @staticmethod
     def get(request):
-        return Response(MeSerializer(request.user).data)
+        # Read first, so that the data includes at least everything up to
+        # this revision.
+        revision = RevisionCounter.current(request.user.id)
+        version = get_me_version(request.user, revision)
+        # Each format is a different representation of the same data.
+        etag = quote_etag(f"{version}:{request.accepted_renderer.format}")
+        headers = {"ETag": etag, "Vary": "Accept"}
+        if etag_matches(request, etag):
+            return Response(status=304, headers=headers)
+
+        if not isinstance(request.accepted_renderer, JSONRenderer):
+            return Response(get_me_data(request.user, revision), headers=headers)
+
+        # Keys change with the data, so entries never need to be removed,
+        # and every process sees the same ones.
+        cache_key = f"me:{request.user.id}:{version}"
+        body = cache.get(cache_key)
+        if body is not None:
+            return HttpResponse(body, content_type="application/json", headers=headers)
+
+        # The tree is rendered as it's walked, rather than being built as
+        # nested dicts and rendered all at once.
+        data = get_me_data(request.user, revision, lazy=True)
+        chunks = iter_cache_through(
+            cache_key,
+            iter_buffered(iter_json(data)),
+            ME_CACHE_MAX_BYTES,
+            ME_CACHE_TIMEOUT,
+        )
+        return StreamingHttpResponse(
+            chunks, content_type="application/json", headers=headers
+        )
 
 
 class StorageObjectView(generics.ListCreateAPIView):
@@ -32,29 +101,18 @@ class StorageObjectView(generics.ListCreateAPIView):
     only used for creating new objects."""
 
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     serializer_class = StorageObjectSerializer
 
     def get_queryset(self):
         return StorageObject.objects.filter(user=self.request.user).all()
 
     def post(self, request, *args, **kwargs):
-        serializer = self.serializer_class(data=request.data)
+        serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            last_object = (
-                StorageObject.objects.filter(
-                    folder_id=request.data.get("folder_id"),
-                    user=request.user,
-                )
-                .order_by("-ordering_parameter")
-                .first()
+            [ordering_parameter] = allocate_last(
+                request.user.id, request.data.get("folder_id")
             )
-            if last_object:
-                ordering_parameter = (
-                    Decimal(ORDERING_MAX / 2) + last_object.ordering_parameter / 2
-                )
-            else:
-                ordering_parameter = Decimal(ORDERING_MAX / 2)
             serializer.save(
                 user_id=request.user.id,
                 ordering_parameter=ordering_parameter,
@@ -64,18 +122,108 @@ class StorageObjectView(generics.ListCreateAPIView):
         return Response({"detail": serializer.errors}, 400)
 
 
+class StorageObjectBatchView(views.APIView):
+    """An APIView class for creating many Storage Objects, with their
+    content, at once."""
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CachedTokenAuthentication]
+
+    @staticmethod
+    def post(request):
+        if not isinstance(request.data, list):
+            return Response(
+                {"detail": "Request body must be a list of storage objects."}, 400
+            )
+        if len(request.data) > BATCH_CREATE_MAX_OBJECTS:
+            return Response(
+                {
+                    "detail": "A batch can't contain more than "
+                    f"{BATCH_CREATE_MAX_OBJECTS} storage objects."
+                },
+                400,
+            )
+        serializer = BatchItemSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return Response({"detail": serializer.errors}, 400)
+
+        try:
+            objects = create_batch(request.user, serializer.validated_data)
+        except InvalidBatch as e:
+            return Response({"detail": str(e)}, 400)
+        except BatchUploadFailed as e:
+            return Response({"detail": str(e)}, 502)
+
+        data = StorageObjectSerializer(
+            objects, many=True, context={"request": request}
+        ).data
+        for item, obj_data in zip(serializer.validated_data, data):
+            if "temp_id" in item:
+                obj_data["temp_id"] = item["temp_id"]
+        return Response(data, 201)
+
+
+class StorageObjectMultiGetView(views.APIView):
+    """An APIView class for fetching many Storage Objects, with their
+    content, at once. Objects are sent back as lines of JSON, in the
+    order their content was read."""
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CachedTokenAuthentication]
+
+    @staticmethod
+    def post(request):
+        try:
+            object_ids = validate_object_ids(request.data, MULTI_GET_MAX_OBJECTS)
+        except ValidationError as e:
+            return Response({"detail": e.detail}, 400)
+        objects, invalid_id = get_objects_in_order(request.user, object_ids)
+        if objects is None:
+            return Response(
+                {"detail": f"An invalid object ID was sent ({invalid_id})"}, 400
+            )
+
+        def iter_lines():
+            contents = iter_file_contents(request.user.custom_config, objects)
+            for obj, future in contents:
+                data = StorageObjectSerializer(obj, context={"request": request}).data
+                try:
+                    content = future.result()
+                except FileNotFoundError:
+                    data.update(content=None, error="Content not found.")
+                except Exception:
+                    data.update(content=None, error="Content couldn't be read.")
+                else:
+                    data["content"] = None if content is None else content.decode()
+                yield data
+
+        return stream_json_lines(iter_lines())
+
+
 class StorageObjectDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     serializer_class = StorageObjectSerializer
 
     def get_queryset(self):
         return StorageObject.objects.filter(user=self.request.user).all()
 
     def get(self, request, *args, **kwargs):
-        response = super().get(self, request, *args, **kwargs)
-        if response.status_code == 200:
-            response.data["content"] = load_file(request, self.kwargs["pk"])
+        storage_object = self.get_object()
+        data = self.get_serializer(storage_object).data
+        etag = get_etag(request.user.custom_config, storage_object, data)
+        if etag_matches(request, etag):
+            # The client has this already, so there's no need to read it.
+            return Response(status=304, headers={"ETag": etag})
+
+        chunks = open_file(request, storage_object)
+        if isinstance(request.accepted_renderer, JSONRenderer):
+            # Stream the content rather than holding it in memory.
+            response = stream_content_response(data, chunks)
+        else:
+            data["content"] = None if chunks is None else b"".join(chunks).decode()
+            response = Response(data)
+        response["ETag"] = etag
         return response
 
     def update(self, request, *args, **kwargs):
@@ -85,30 +233,79 @@ class StorageObjectDetailView(generics.RetrieveUpdateDestroyAPIView):
         return response
 
     def destroy(self, request, *args, **kwargs):
-        delete_object(request, kwargs["pk"], "recursive" in request.query_params)
+        failed = delete_object(
+            request, kwargs["pk"], "recursive" in request.query_params
+        )
+        if failed:
+            return Response(
+                {
+                    "detail": "Some files couldn't be deleted from storage.",
+                    "failed_ids": [obj.id for obj in failed],
+                },
+                502,
+            )
         return Response(status=204)
 
 
+class ChangesView(views.APIView):
+    """An APIView class that returns what changed in a user's storage
+    objects after a revision, so clients can sync without fetching the
+    whole tree from ``/me/``."""
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CachedTokenAuthentication]
+
+    @staticmethod
+    def get(request):
+        since = request.query_params.get("since", "")
+        if not since.isdigit():
+            return Response({"detail": f"An invalid revision was sent ({since})"}, 400)
+        revision, changed, deleted = get_changes(request.user, int(since))
+        return Response(
+            {
+                "revision": revision,
+                "storage_objects": StorageObjectSerializer(
+                    changed, many=True, context={"request": request}
+                ).data,
+                "deleted": deleted,
+            }
+        )
+
+
+def get_contents_page(request, contents, folder_path):
+    """Return a page of a folder's contents, from the position given by
+    the ``cursor`` query parameter, with the cursor of the next page."""
+    try:
+        page_size = get_page_size(request.query_params.get("page_size"))
+        rows, next_cursor = paginate(
+            contents.values(*ROW_FIELDS),
+            request.query_params.get("cursor"),
+            page_size,
+        )
+    except InvalidCursor as e:
+        return Response({"detail": str(e)}, 400)
+    files = iter_listing(rows, folder_path)
+    if isinstance(request.accepted_renderer, JSONRenderer):
+        return stream_json_response({"files": JSONArray(files), "next": next_cursor})
+    return Response({"files": list(files), "next": next_cursor})
+
+
 class RootContentsView(views.APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     @staticmethod
     def get(request):
-        files = (
-            StorageObject.objects.filter(
-                user=request.user,
-                folder_id=None,
-            )
-            .order_by("ordering_parameter")
-            .all()
+        files = StorageObject.objects.filter(
+            user=request.user,
+            folder_id=None,
         )
-        return Response({"files": [FileSerializer(file).data for file in files]})
+        return get_contents_page(request, files, None)
 
 
 class FolderContentsView(views.APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     @staticmethod
     def get(request, pk):
@@ -119,38 +316,64 @@ class FolderContentsView(views.APIView):
         ).first()
         if folder is None:
             return Response({"detail": "Folder Not Found"}, 404)
-        files = (
-            StorageObject.objects.filter(
-                folder_id=pk,
-                user=request.user,
+        files = StorageObject.objects.filter(
+            folder_id=pk,
+            user=request.user,
+        )
+        return get_contents_page(request, files, format_path(folder))
+
+
+class ExportView(views.APIView):
+    """An APIView class that streams an archive of all of a user's
+    storage objects and their content."""
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CachedTokenAuthentication]
+
+    @staticmethod
+    def get(request):
+        archive_format = request.query_params.get("archive", "zip")
+        archive_class = ARCHIVE_FORMATS.get(archive_format)
+        if archive_class is None:
+            return Response(
+                {"detail": f"Invalid archive format ({archive_format})"}, 400
             )
-            .order_by("ordering_parameter")
-            .all()
+        response = StreamingHttpResponse(
+            iter_export(request.user, archive_class),
+            content_type=archive_class.content_type,
         )
-        return Response({"files": [FileSerializer(file).data for file in files]})
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="sky-write.{archive_class.extension}"'
+        return response
 
 
 class StorageObjectReOrderView(views.APIView):
     """An APIView class for re-ordering Storage Objects."""
 
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     @staticmethod
     def post(request):
-        objects = []
-        for obj_id in request.data:
-            obj = StorageObject.objects.filter(id=obj_id, user=request.user).first()
-            if obj is None:
-                return Response(
-                    {"detail": f"An invalid object ID was sent ({obj_id})"}, 400
-                )
-            objects.append(obj)
+        try:
+            object_ids = validate_object_ids(request.data)
+        except ValidationError as e:
+            return Response({"detail": e.detail}, 400)
+        objects, invalid_id = get_objects_in_order(request.user, object_ids)
+        if objects is None:
+            return Response(
+                {"detail": f"An invalid object ID was sent ({invalid_id})"}, 400
+            )
 
-        ordering_constant = ORDERING_MAX / (len(objects) + 2)
-        for index, obj in enumerate(objects):
-            obj.ordering_parameter = ordering_constant * (index + 1)
-            obj.save()
+        with transaction.atomic():
+            revision = RevisionCounter.allocate(request.user.id)
+            for obj, ordering_parameter in zip(objects, following(count=len(objects))):
+                obj.ordering_parameter = ordering_parameter
+                obj.revision = revision
+            StorageObject.objects.bulk_update(
+                objects, ["ordering_parameter", "revision"]
+            )
 
         return Response("OK")
 
@@ -159,45 +382,33 @@ class StorageObjectReOrganizeView(views.APIView):
     """An APIView class for re-ordering Storage Objects."""
 
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     @staticmethod
     def post(request):
-        if {"files", "folder_id"} - set(request.data) != set():
+        if not isinstance(request.data, dict) or {"files", "folder_id"} - set(
+            request.data
+        ):
             return Response(
                 {"detail": "Request body must contain 'files' and 'folder_id'."},
                 400,
             )
-
-        objects = []
-        for obj_id in request.data["files"]:
-            obj = StorageObject.objects.filter(id=obj_id, user=request.user).first()
-            if obj is None:
-                return Response(
-                    {"detail": f"An invalid object ID was sent ({obj_id})"}, 400
+        serializer = ReOrganizeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"detail": serializer.errors}, 400)
+
+        folder_id = serializer.validated_data["folder_id"]
+        try:
+            with transaction.atomic():
+                # The counter is locked first, so the objects and the
+                # folder can't be moved by another request between being
+                # checked here and being written.
+                revision = RevisionCounter.allocate(request.user.id)
+                objects, folder = get_objects_to_move(
+                    request.user, serializer.validated_data["files"], folder_id
                 )
-            objects.append(obj)
-
-        folder_id = request.data["folder_id"]
-        folder = StorageObject.objects.filter(id=folder_id, user=request.user).first()
-        if folder_id is not None and (folder is None or folder.is_file):
-            return Response(
-                {"detail": f"An invalid folder ID was sent ({folder_id})"}, 400
-            )
-
-        existing_object = (
-            StorageObject.objects.filter(folder_id=folder_id, user=request.user)
-            .order_by("-ordering_parameter")
-            .first()
-        )
-        if existing_object is not None:
-            ordering_base = existing_object.ordering_parameter
-        else:
-            ordering_base = 0
-        ordering_constant = (ORDERING_MAX - ordering_base) / (len(objects) + 2)
-        for index, obj in enumerate(objects):
-            obj.ordering_parameter = ordering_base + ordering_constant * (index + 1)
-            obj.folder_id = folder_id
-            obj.save()
+                move_objects(request.user.id, objects, folder, revision)
+        except InvalidMove as e:
+            return Response({"detail": str(e)}, 400)
 
         return Response("OK")
@@ -0,0 +1,3 @@
+from sky_write_django.celery import app as celery_app
+
+__all__ = ("celery_app",)
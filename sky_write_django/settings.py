@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "sky_write_app.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -131,10 +132,36 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # REST Framework config
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.BasicAuthentication",
-        "rest_framework.authentication.TokenAuthentication",
-    ]
+        "users_app.authentication.CachedTokenAuthentication",
+    ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "sky_write_app.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        "sky_write_app.renderers.MessagePackRenderer",
+    ],
 }
+# Seconds for which each version of a user's /me/ data is cached, and
+# the largest /me/ response that's cached
+ME_CACHE_TIMEOUT = int(os.environ.get("ME_CACHE_TIMEOUT", 300))
+ME_CACHE_MAX_BYTES = 4 * 1024 * 1024
+
+
+# Cache shared by all processes, if configured
+CACHE_URL = os.environ.get("CACHE_URL")
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+# Seconds for which an authenticated token is trusted without checking
+# the database; tokens are also removed from the cache when deleted. They
+# are only cached in a cache shared by all processes, since otherwise a
+# revoked token would still be accepted by every other process.
+AUTH_TOKEN_CACHE_TIMEOUT = (
+    int(os.environ.get("AUTH_TOKEN_CACHE_TIMEOUT", 60)) if CACHE_URL else 0
+)
 
 
 # CORS Configuration
@@ -147,9 +174,79 @@ UI_URI = os.environ.get("UI_URI", "http://localhost:3000")
 DBX_APP_KEY = os.environ.get("DBX_APP_KEY", None)
 DBX_APP_SECRET = os.environ.get("DBX_APP_SECRET")
 DBX_RESOLUTION_PATH_NAME = "dropbox-resolution"
+# Per-user Dropbox clients kept for reuse, and the size of the connection
+# pool they share
+DBX_MAX_CLIENTS = int(os.environ.get("DBX_MAX_CLIENTS", 1000))
+DBX_MAX_CONNECTIONS = int(os.environ.get("DBX_MAX_CONNECTIONS", 16))
 
 # Development settings
 DEV = os.environ.get("DEV", 0)
 
+# Storage backends
+LOCAL_STORAGE_ROOT = os.environ.get("LOCAL_STORAGE_ROOT", "/code/local_storage")
+# Size of the chunks in which content is streamed
+STORAGE_CHUNK_SIZE = 64 * 1024
+# Save content to the database and write it to storage in the background,
+# instead of during the request
+CONTENT_WRITE_BEHIND = bool(int(os.environ.get("CONTENT_WRITE_BEHIND", 0)))
+# Attempts made to write content to storage before giving up
+CONTENT_WRITE_MAX_RETRIES = 5
+# Memory used by each process to cache file content
+CONTENT_CACHE_MAX_BYTES = int(
+    os.environ.get("CONTENT_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+)
+# Files deleted at once from local storage
+STORAGE_DELETE_WORKERS = 8
+# Most objects that can be created with one batch request, and how many
+# of their contents are uploaded at once
+BATCH_CREATE_MAX_OBJECTS = 1000
+CONTENT_UPLOAD_WORKERS = 8
+# Most objects that can be fetched with one multi-get request, and how
+# many of their contents are read at once
+MULTI_GET_MAX_OBJECTS = 1000
+MULTI_GET_CONCURRENCY = int(os.environ.get("MULTI_GET_CONCURRENCY", 8))
+# Responses smaller than this are sent uncompressed; streamed responses
+# hold back up to this much to decide
+COMPRESSION_MIN_BYTES = 1024
+# Objects listed per page of a folder's contents by default, and at most
+LISTING_PAGE_SIZE = 500
+LISTING_MAX_PAGE_SIZE = 1000
+# Notes created per transaction when importing an archive
+IMPORT_BATCH_SIZE = 200
+# Content larger than this is uploaded to Dropbox in several requests
+DBX_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# S3-compatible storage
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")
+S3_REGION = os.environ.get("S3_REGION")
+S3_BUCKET = os.environ.get("S3_BUCKET")
+S3_ACCESS_KEY_ID = os.environ.get("S3_ACCESS_KEY_ID")
+S3_SECRET_ACCESS_KEY = os.environ.get("S3_SECRET_ACCESS_KEY")
+S3_MAX_CONNECTIONS = int(os.environ.get("S3_MAX_CONNECTIONS", 16))
+# Content larger than this is uploaded in parts of this size (S3 requires
+# parts of at least 5 MiB)
+S3_MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+# Content is downloaded in ranges of this size
+S3_RANGE_SIZE = 8 * 1024 * 1024
+
+# Celery
+CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL")
+# Without a broker, tasks run synchronously in the calling process.
+CELERY_TASK_ALWAYS_EAGER = CELERY_BROKER_URL is None
+# Content writes that are still pending after this many seconds (e.g.
+# because the worker was down) are queued again.
+CONTENT_WRITE_REQUEUE_AFTER = 300
+# Content that has failed to be written this many times, counting every
+# retry, is logged and no longer queued again until it's saved again.
+CONTENT_WRITE_MAX_ATTEMPTS = 30
+CELERY_BEAT_SCHEDULE = {
+    "requeue-pending-content": {
+        "task": "sky_write_app.tasks.requeue_pending_content",
+        "schedule": CONTENT_WRITE_REQUEUE_AFTER,
+    },
+}
+
 # sky_write_app settings
 ORDERING_MAX = 1000000000000000
+# Gap left between siblings appended to a folder
+ORDERING_STEP = 1000000
@@ -0,0 +1,28 @@
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from rest_framework.test import APIRequestFactory
+
+from sky_write_app.backends import LocalStorageBackend
+from users_app.models import CustomConfig
+
+
+class LocalStorageMixin:
+    """Gives each test a user whose content is kept in local storage, in
+    a temporary directory that's removed afterwards."""
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        patcher = mock.patch(
+            "sky_write_app.backends.LOCAL_STORAGE_ROOT", self.directory.name
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+        self.backend = LocalStorageBackend(self.directory.name)
+
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user("user 1")
+        CustomConfig.objects.create(user=self.user, default_storage="LS")
@@ -0,0 +1,231 @@
+"""A minimal local stand-in for the Dropbox HTTP API, for tests."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def get_metadata(path, content):
+    name = path.rsplit("/", 1)[-1]
+    return {
+        "name": name,
+        "id": f"id:{name}",
+        "client_modified": "2022-01-01T00:00:00Z",
+        "server_modified": "2022-01-01T00:00:00Z",
+        "rev": "0123456789abcdef",
+        "size": len(content),
+        "path_lower": path.lower(),
+        "path_display": path,
+    }
+
+
+class FakeDropboxHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, data, status=200, headers=None):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_not_found(self, path, tag="path"):
+        self.send_json(
+            {
+                "error_summary": f"{tag}/not_found/ {path}",
+                "error": {".tag": tag, tag: {".tag": "not_found"}},
+            },
+            409,
+        )
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        route = self.path
+        with server.lock:
+            server.requests.append(route)
+
+        if route == "/oauth2/token":
+            with server.lock:
+                server.token_count += 1
+                token = f"access-token-{server.token_count}"
+            self.send_json(
+                {
+                    "access_token": token,
+                    "expires_in": server.expires_in,
+                    "token_type": "bearer",
+                }
+            )
+            return
+
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            self.send_json({"error_summary": "invalid_access_token/"}, 401)
+            return
+
+        if route == "/2/files/upload":
+            path = json.loads(self.headers["Dropbox-API-Arg"])["path"]
+            with server.lock:
+                server.files[path] = body
+            self.send_json(get_metadata(path, body))
+
+        elif route == "/2/files/download":
+            path = json.loads(self.headers["Dropbox-API-Arg"])["path"]
+            content = server.files.get(path)
+            if content is None:
+                self.send_not_found(path)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(content)))
+            self.send_header(
+                "Dropbox-API-Result", json.dumps(get_metadata(path, content))
+            )
+            self.end_headers()
+            self.wfile.write(content)
+
+        elif route == "/2/files/upload_session/start":
+            with server.lock:
+                session_id = f"session-{len(server.sessions)}"
+                server.sessions[session_id] = body
+            self.send_json({"session_id": session_id})
+
+        elif route == "/2/files/upload_session/append_v2":
+            cursor = json.loads(self.headers["Dropbox-API-Arg"])["cursor"]
+            with server.lock:
+                server.sessions[cursor["session_id"]] += body
+            self.send_json(None)
+
+        elif route == "/2/files/upload_session/finish":
+            arg = json.loads(self.headers["Dropbox-API-Arg"])
+            path = arg["commit"]["path"]
+            with server.lock:
+                content = server.sessions.pop(arg["cursor"]["session_id"]) + body
+                server.files[path] = content
+            self.send_json(get_metadata(path, content))
+
+        elif route == "/2/files/get_metadata":
+            path = json.loads(body)["path"]
+            content = server.files.get(path)
+            if content is None:
+                self.send_not_found(path)
+                return
+            self.send_json({".tag": "file", **get_metadata(path, content)})
+
+        elif route == "/2/files/delete_v2":
+            path = json.loads(body)["path"]
+            with server.lock:
+                content = server.files.pop(path, None)
+            if content is None:
+                self.send_not_found(path, "path_lookup")
+                return
+            self.send_json(
+                {"metadata": {".tag": "file", **get_metadata(path, content)}}
+            )
+
+        elif route == "/2/files/delete_batch":
+            entries = []
+            with server.lock:
+                for entry in json.loads(body)["entries"]:
+                    path = entry["path"]
+                    if path in server.failing_deletes:
+                        entries.append(
+                            {
+                                ".tag": "failure",
+                                "failure": {".tag": "too_many_write_operations"},
+                            }
+                        )
+                        continue
+                    content = server.files.pop(path, None)
+                    if content is None:
+                        entries.append(
+                            {
+                                ".tag": "failure",
+                                "failure": {
+                                    ".tag": "path_lookup",
+                                    "path_lookup": {".tag": "not_found"},
+                                },
+                            }
+                        )
+                        continue
+                    entries.append(
+                        {
+                            ".tag": "success",
+                            "metadata": {
+                                ".tag": "file",
+                                **get_metadata(path, content),
+                            },
+                        }
+                    )
+                # Batch deletes finish in the background; report them as
+                # complete on the first check.
+                job_id = f"job-{len(server.jobs)}"
+                server.jobs[job_id] = entries
+            self.send_json({".tag": "async_job_id", "async_job_id": job_id})
+
+        elif route == "/2/files/delete_batch/check":
+            job_id = json.loads(body)["async_job_id"]
+            self.send_json({".tag": "complete", "entries": server.jobs[job_id]})
+
+        else:
+            self.send_json({"error_summary": f"unknown route {route}"}, 400)
+
+
+class FakeDropboxServer(ThreadingHTTPServer):
+    """Serves Dropbox API routes from memory on a local port. ``files``
+    maps Dropbox paths to content, ``requests`` lists every route that
+    was called, and deleting paths in ``failing_deletes`` fails."""
+
+    daemon_threads = True
+
+    def __init__(self, expires_in=14400):
+        super().__init__(("127.0.0.1", 0), FakeDropboxHandler)
+        self.expires_in = expires_in
+        self.lock = threading.Lock()
+        self.files = {}
+        self.sessions = {}
+        self.jobs = {}
+        self.failing_deletes = set()
+        self.requests = []
+        self.token_count = 0
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def create_session(self):
+        """Return a session that sends all Dropbox traffic here."""
+        session = requests.Session()
+        session.mount("https://", RedirectAdapter(self.url))
+        return session
+
+
+class RedirectAdapter(HTTPAdapter):
+    """Sends every request to ``base_url`` instead of its own host."""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = urlsplit(base_url)
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        request.url = urlunsplit(
+            (self.base_url.scheme, self.base_url.netloc, url.path, url.query, "")
+        )
+        return super().send(request, **kwargs)
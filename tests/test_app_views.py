@@ -1,12 +1,25 @@
 import json
 from decimal import Decimal
+from unittest import mock
 
+import msgpack
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
 
-from sky_write_app.models import StorageObject
-from sky_write_app.views import MeView, StorageObjectView
-from sky_write_django.settings import ORDERING_MAX
+from sky_write_app import utils
+from sky_write_app.models import RevisionCounter, StorageObject
+from sky_write_app.utils import format_path
+from sky_write_app.views import (
+    FolderContentsView,
+    MeView,
+    RootContentsView,
+    StorageObjectDetailView,
+    StorageObjectReOrderView,
+    StorageObjectReOrganizeView,
+    StorageObjectView,
+)
+from sky_write_django.settings import ORDERING_STEP
 from users_app.models import CustomConfig
 
 
@@ -51,6 +64,10 @@ class TestAppViews(APITestCase):
         )
         cls.obj_1 = obj_1
 
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
     def test_me_view(self):
         """Test getting user data from ``/me/``"""
         # Create a request for which user_1 is authenticated
@@ -59,22 +76,228 @@ class TestAppViews(APITestCase):
 
         # Get the response
         response = MeView.as_view()(request)
+        data = json.loads(b"".join(response))
 
         # Check that the basic content of the response is good
         assert response.status_code == 200
-        assert response.data["username"] == self.user_1.username
+        assert data["username"] == self.user_1.username
 
         # Check that the storage objects look accurate; i.e. the folder
         # and the file it contains are in their proper places
-        assert len(response.data["storage_objects"]) == 1
-        folder = response.data["storage_objects"][0]
+        assert len(data["storage_objects"]) == 1
+        folder = data["storage_objects"][0]
         assert folder["name"] == "obj 1.1"
         assert len(folder["files"]) == 1
         file = folder["files"][0]
         assert file["name"] == "obj 1.2"
 
         # Check that a file belonging to another user doesn't show up
-        assert "obj 2.1" not in json.dumps(response.data)
+        assert "obj 2.1" not in json.dumps(data)
+
+    def test_me_view_msgpack(self):
+        """Test getting ``/me/`` as MessagePack, with ordering parameters
+        as numbers, and with its own ETag"""
+        request = self.factory.get("/me/")
+        force_authenticate(request, self.user_1)
+        json_response = MeView.as_view()(request)
+        json_data = json.loads(b"".join(json_response))
+
+        request = self.factory.get("/me/", HTTP_ACCEPT="application/msgpack")
+        force_authenticate(request, self.user_1)
+        response = MeView.as_view()(request)
+        response.render()
+        assert response["Content-Type"] == "application/msgpack"
+        assert response["ETag"] != json_response["ETag"]
+        data = msgpack.unpackb(response.content)
+
+        [folder] = data.pop("storage_objects")
+        [file] = folder.pop("files")
+        assert folder["ordering_parameter"] == 10.0
+        assert file["ordering_parameter"] == 20.0
+        [json_folder] = json_data.pop("storage_objects")
+        [json_file] = json_folder.pop("files")
+        for obj, json_obj in ((folder, json_folder), (file, json_file)):
+            json_obj["ordering_parameter"] = float(json_obj["ordering_parameter"])
+            assert obj == json_obj
+        assert data == json_data
+
+    def test_me_view_nested_tree(self):
+        """Test that ``/me/`` builds nested folders, ordering, and paths
+        with a constant number of queries"""
+        user = User.objects.create_user("user 4")
+        CustomConfig.objects.create(user=user)
+        folder = StorageObject.objects.create(
+            name="folder/a", user=user, is_file=False, ordering_parameter=20
+        )
+        sub_folder = StorageObject.objects.create(
+            name="folder b",
+            user=user,
+            folder=folder,
+            is_file=False,
+            ordering_parameter=10,
+        )
+        for index in range(5):
+            StorageObject.objects.create(
+                name=f"note {index}",
+                user=user,
+                folder=sub_folder,
+                ordering_parameter=50 - index,
+            )
+        root_file = StorageObject.objects.create(
+            name="root", name_iv="iv", user=user, ordering_parameter=10
+        )
+
+        last_file = StorageObject.objects.create(
+            name="last", user=user, folder=sub_folder, ordering_parameter=100
+        )
+        CustomConfig.objects.filter(user=user).update(last_file=last_file.id)
+
+        # Reload the user as it's authenticated, with its config
+        user = User.objects.select_related("custom_config").get(id=user.id)
+        request = self.factory.get("/me/")
+        force_authenticate(request, user)
+
+        # One query for the revision, and one for the tree, which also
+        # holds the last file, regardless of the size of the tree
+        with self.assertNumQueries(2):
+            response = MeView.as_view()(request)
+            body = b"".join(response)
+        data = json.loads(body)
+
+        assert response.status_code == 200
+        root, folder_data = data.pop("storage_objects")
+        assert data == {
+            "username": "user 4",
+            "encryption_key": "",
+            "last_file": last_file.id,
+            "path_to_last_file": [folder.id, sub_folder.id],
+            "revision": RevisionCounter.current(user.id),
+        }
+        assert root == {
+            "id": root_file.id,
+            "name": "root",
+            "name_iv": "iv",
+            "is_file": True,
+            "files": [],
+            "path": "root",
+            "ordering_parameter": "10.00000000000",
+        }
+        assert folder_data["path"] == "folder%2Fa"
+        sub_folder_data = folder_data["files"][0]
+        assert sub_folder_data["path"] == "folder%2Fa/folder%20b"
+        assert [file["name"] for file in sub_folder_data["files"]] == [
+            *(f"note {index}" for index in reversed(range(5))),
+            "last",
+        ]
+        assert sub_folder_data["files"][0]["path"] == "folder%2Fa/folder%20b/note%204"
+        assert sub_folder_data["files"][0]["ordering_parameter"] == "46.00000000000"
+
+    def test_folder_contents_view_pages(self):
+        """Test listing a folder's contents a page at a time, following
+        cursors, with a constant number of queries per page"""
+        user = User.objects.create_user("user 5")
+        parent = StorageObject.objects.create(
+            name="parent", user=user, is_file=False, ordering_parameter=1
+        )
+        folder = StorageObject.objects.create(
+            name="a folder",
+            user=user,
+            folder=parent,
+            is_file=False,
+            ordering_parameter=1,
+        )
+        # Ties in ordering are broken by ID.
+        notes = [
+            StorageObject.objects.create(
+                name=f"note {index}",
+                user=user,
+                folder=folder,
+                ordering_parameter=index // 2,
+            )
+            for index in range(7)
+        ]
+
+        pages = []
+        params = {"page_size": 3}
+        while True:
+            request = self.factory.get(f"/folder/{folder.id}/", params)
+            force_authenticate(request, user)
+            # One query for the folder, one for its path, and one for
+            # the page
+            with self.assertNumQueries(3):
+                response = FolderContentsView.as_view()(request, pk=folder.id)
+                data = json.loads(b"".join(response))
+            assert response.status_code == 200
+            pages.append(data["files"])
+            if data["next"] is None:
+                break
+            params["cursor"] = data["next"]
+
+        assert [len(page) for page in pages] == [3, 3, 1]
+        files = [file for page in pages for file in page]
+        assert [file["id"] for file in files] == [note.id for note in notes]
+        assert files[0]["path"] == "parent/a%20folder/note%200"
+
+        request = self.factory.get("/folder/", {"cursor": "not a cursor"})
+        force_authenticate(request, user)
+        assert RootContentsView.as_view()(request).status_code == 400
+
+        request = self.factory.get("/folder/", {"page_size": 100_000})
+        force_authenticate(request, user)
+        data = json.loads(b"".join(RootContentsView.as_view()(request)))
+        assert [file["path"] for file in data["files"]] == ["parent"]
+        assert data["next"] is None
+
+    def test_folder_contents_data(self):
+        """Test the data listed for each object in a folder"""
+        user = User.objects.create_user("user 6")
+        folder = StorageObject.objects.create(
+            name="a/folder", user=user, is_file=False, ordering_parameter=1
+        )
+        objects = [
+            StorageObject.objects.create(
+                name=name,
+                name_iv=f"iv {index}",
+                user=user,
+                folder=folder,
+                is_file=name != "sub folder",
+                ordering_parameter=Decimal("0.5") * index,
+            )
+            for index, name in enumerate(["note", "sub folder", "ünïcode"])
+        ]
+
+        request = self.factory.get(f"/folder/{folder.id}/")
+        force_authenticate(request, user)
+        response = FolderContentsView.as_view()(request, pk=folder.id)
+        assert json.loads(b"".join(response))["files"] == [
+            {
+                "id": objects[0].id,
+                "name": "note",
+                "name_iv": "iv 0",
+                "is_file": True,
+                "files": [],
+                "path": "a%2Ffolder/note",
+                "ordering_parameter": "0.00000000000",
+            },
+            {
+                "id": objects[1].id,
+                "name": "sub folder",
+                "name_iv": "iv 1",
+                "is_file": False,
+                "files": [],
+                "path": "a%2Ffolder/sub%20folder",
+                "ordering_parameter": "0.50000000000",
+            },
+            {
+                "id": objects[2].id,
+                "name": "ünïcode",
+                "name_iv": "iv 2",
+                "is_file": True,
+                "files": [],
+                "path": "a%2Ffolder/%C3%BCn%C3%AFcode",
+                "ordering_parameter": "1.00000000000",
+            },
+        ]
 
     def test_storage_object_list_view(self):
         """Test getting storage objects from ``/storage_objects/``"""
@@ -115,7 +338,7 @@ class TestAppViews(APITestCase):
 
         # Check that the ordering parameter is accurate; 20 is the order
         # param of "obj 2".
-        expected_order_param = Decimal(ORDERING_MAX + 20) / 2
+        expected_order_param = Decimal(20 + ORDERING_STEP)
         assert obj.ordering_parameter == expected_order_param
 
     def test_storage_object_create_view_no_existing_objects(self):
@@ -142,7 +365,7 @@ class TestAppViews(APITestCase):
         assert obj.user == self.user_3
 
         # Check that the ordering parameter is accurate
-        expected_order_param = Decimal(ORDERING_MAX / 2)
+        expected_order_param = Decimal(ORDERING_STEP)
         assert obj.ordering_parameter == expected_order_param
 
     def test_storage_object_create_view_error(self):
@@ -160,3 +383,216 @@ class TestAppViews(APITestCase):
         # Check the response content
         assert response.status_code == 400
         assert "detail" in response.data
+
+    def test_storage_object_invalid_folder(self):
+        """Test that objects can't be created in or moved to another
+        user's folder, or a file"""
+        file = StorageObject.objects.get(name="obj 1.2")
+        other_file = StorageObject.objects.get(name="obj 2.1")
+        for user, folder_id in ((self.user_2, self.obj_1.id), (self.user_1, file.id)):
+            request = self.factory.post(
+                "/storage_objects/", data={"name": "note", "folder_id": folder_id}
+            )
+            force_authenticate(request, user)
+            response = StorageObjectView.as_view()(request)
+            assert response.status_code == 400
+            assert "Invalid folder_id" in str(response.data["detail"])
+
+            request = self.factory.patch(
+                f"/storage_objects/{other_file.id}/",
+                data={"folder_id": folder_id},
+                format="json",
+            )
+            force_authenticate(request, self.user_2)
+            response = StorageObjectDetailView.as_view()(request, pk=other_file.id)
+            assert response.status_code == 400
+        assert not StorageObject.objects.filter(name="note").exists()
+        other_file.refresh_from_db()
+        assert other_file.folder_id is None
+
+    def test_ancestry(self):
+        """Test that ancestry is kept up to date when objects are created
+        and moved, and that paths are computed from it"""
+        folder_a = StorageObject.objects.create(
+            name="a", user=self.user_3, is_file=False, ordering_parameter=10
+        )
+        folder_b = StorageObject.objects.create(
+            name="b", user=self.user_3, is_file=False, ordering_parameter=20
+        )
+        sub_folder = StorageObject.objects.create(
+            name="c",
+            user=self.user_3,
+            folder=folder_a,
+            is_file=False,
+            ordering_parameter=10,
+        )
+        file = StorageObject.objects.create(
+            name="d", user=self.user_3, folder=sub_folder, ordering_parameter=10
+        )
+        assert file.ancestry == f"{folder_a.id}/{sub_folder.id}/"
+        assert list(StorageObject.objects.descendants_of(folder_a)) == [
+            sub_folder,
+            file,
+        ]
+        with self.assertNumQueries(1):
+            assert format_path(file) == "a/c/d"
+
+        # Move the sub-folder into folder B
+        request = self.factory.post(
+            "/re_organize/",
+            data={"files": [sub_folder.id], "folder_id": folder_b.id},
+            format="json",
+        )
+        force_authenticate(request, self.user_3)
+        response = StorageObjectReOrganizeView.as_view()(request)
+        assert response.status_code == 200
+        file.refresh_from_db()
+        assert file.path_ids == [folder_b.id, sub_folder.id]
+        assert format_path(file) == "b/c/d"
+        assert not StorageObject.objects.descendants_of(folder_a).exists()
+
+        # A folder can't be moved inside itself
+        request = self.factory.post(
+            "/re_organize/",
+            data={"files": [folder_b.id], "folder_id": sub_folder.id},
+            format="json",
+        )
+        force_authenticate(request, self.user_3)
+        response = StorageObjectReOrganizeView.as_view()(request)
+        assert response.status_code == 400
+
+        # Deleting a folder moves its contents up a level
+        request = self.factory.delete(f"/storage_objects/{folder_b.id}/")
+        force_authenticate(request, self.user_3)
+        response = StorageObjectDetailView.as_view()(request, pk=folder_b.id)
+        assert response.status_code == 204
+        file.refresh_from_db()
+        assert file.path_ids == [sub_folder.id]
+        assert format_path(file) == "c/d"
+
+    def test_re_order_view(self):
+        """Test re-ordering objects at ``/re_order/`` with a constant
+        number of queries"""
+        objects = [
+            StorageObject.objects.create(
+                name=f"note {index}", user=self.user_3, ordering_parameter=index
+            )
+            for index in range(50)
+        ]
+        new_order = [obj.id for obj in reversed(objects)]
+        request = self.factory.post("/re_order/", data=new_order, format="json")
+        force_authenticate(request, self.user_3)
+
+        # One query to fetch the objects and one to update them, two to
+        # allocate a revision, plus the savepoint around them
+        with self.assertNumQueries(6):
+            response = StorageObjectReOrderView.as_view()(request)
+
+        assert response.status_code == 200
+        assert response.data == "OK"
+        assert (
+            list(
+                StorageObject.objects.filter(user=self.user_3)
+                .order_by("ordering_parameter")
+                .values_list("id", flat=True)
+            )
+            == new_order
+        )
+
+        # Nothing is changed if any ID is invalid
+        request = self.factory.post(
+            "/re_order/", data=[objects[0].id, self.obj_1.id], format="json"
+        )
+        force_authenticate(request, self.user_3)
+        response = StorageObjectReOrderView.as_view()(request)
+        assert response.status_code == 400
+        assert response.data["detail"] == (
+            f"An invalid object ID was sent ({self.obj_1.id})"
+        )
+
+        # IDs must be whole numbers
+        request = self.factory.post("/re_order/", data=["abc"], format="json")
+        force_authenticate(request, self.user_3)
+        assert StorageObjectReOrderView.as_view()(request).status_code == 400
+        request = self.factory.post(
+            "/re_organize/", data={"files": ["abc"], "folder_id": None}, format="json"
+        )
+        force_authenticate(request, self.user_3)
+        assert StorageObjectReOrganizeView.as_view()(request).status_code == 400
+
+        # Both keys must be sent
+        for data in ({"files": []}, [objects[0].id]):
+            request = self.factory.post("/re_organize/", data=data, format="json")
+            force_authenticate(request, self.user_3)
+            response = StorageObjectReOrganizeView.as_view()(request)
+            assert response.status_code == 400
+            assert response.data == {
+                "detail": "Request body must contain 'files' and 'folder_id'."
+            }
+
+    def test_re_organize_view_nested_folders(self):
+        """Test moving a folder and a folder inside it at the same time"""
+        folder_a = StorageObject.objects.create(
+            name="a", user=self.user_3, is_file=False, ordering_parameter=10
+        )
+        folder_b = StorageObject.objects.create(
+            name="b",
+            user=self.user_3,
+            folder=folder_a,
+            is_file=False,
+            ordering_parameter=10,
+        )
+        file = StorageObject.objects.create(
+            name="c", user=self.user_3, folder=folder_b, ordering_parameter=10
+        )
+        folder_d = StorageObject.objects.create(
+            name="d", user=self.user_3, is_file=False, ordering_parameter=20
+        )
+        request = self.factory.post(
+            "/re_organize/",
+            data={"files": [folder_a.id, folder_b.id], "folder_id": folder_d.id},
+            format="json",
+        )
+        force_authenticate(request, self.user_3)
+        response = StorageObjectReOrganizeView.as_view()(request)
+
+        assert response.status_code == 200
+        folder_a.refresh_from_db()
+        folder_b.refresh_from_db()
+        file.refresh_from_db()
+        assert folder_a.folder_id == folder_d.id
+        assert folder_b.folder_id == folder_d.id
+        assert folder_a.ordering_parameter < folder_b.ordering_parameter
+        assert file.path_ids == [folder_d.id, folder_b.id]
+        assert format_path(file) == "d/b/c"
+
+    def test_re_organize_view_checks_after_locking(self):
+        """Test that objects and their new folder are fetched and checked
+        once the revision counter is locked, and that nothing is changed
+        if the check fails"""
+        folder = StorageObject.objects.create(
+            name="folder", user=self.user_3, is_file=False, ordering_parameter=10
+        )
+        note = StorageObject.objects.create(
+            name="note", user=self.user_3, ordering_parameter=20
+        )
+        revision = RevisionCounter.current(self.user_3.id)
+
+        def get_objects_to_move(*args):
+            assert RevisionCounter.current(self.user_3.id) == revision + 1
+            return utils.get_objects_to_move(*args)
+
+        with mock.patch("sky_write_app.views.get_objects_to_move", get_objects_to_move):
+            for folder_id, status_code in ((note.id, 400), (folder.id, 200)):
+                request = self.factory.post(
+                    "/re_organize/",
+                    data={"files": [note.id], "folder_id": folder_id},
+                    format="json",
+                )
+                force_authenticate(request, self.user_3)
+                response = StorageObjectReOrganizeView.as_view()(request)
+                assert response.status_code == status_code
+        note.refresh_from_db()
+        assert note.folder_id == folder.id
+        assert note.ancestry == f"{folder.id}/"
+        assert RevisionCounter.current(self.user_3.id) == revision + 1
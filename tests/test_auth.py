@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from users_app.authentication import CachedTokenAuthentication, get_token_cache_key
+from users_app.models import CustomConfig
+from users_app.views import LogoutView
+
+
+class TestCachedTokenAuthentication(APITestCase):
+    def setUp(self):
+        # As with a shared cache configured
+        patcher = mock.patch("users_app.authentication.AUTH_TOKEN_CACHE_TIMEOUT", 60)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user("user 1", password="password")
+        CustomConfig.objects.create(user=self.user, default_storage="LS")
+        self.token = Token.objects.create(user=self.user)
+
+    def authenticate(self):
+        request = self.factory.get("/me/", HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        user, _token = CachedTokenAuthentication().authenticate(request)
+        return user
+
+    def test_repeat_requests_skip_the_database(self):
+        """Test that a token, its user and the user's config are only looked
+        up in the database once"""
+        with self.assertNumQueries(1):
+            assert self.authenticate() == self.user
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            assert user == self.user
+            assert user.custom_config.default_storage == "LS"
+
+    def test_no_shared_cache(self):
+        """Test that tokens aren't cached without a cache shared by every
+        process, so revoking one takes effect everywhere at once"""
+        with mock.patch("users_app.authentication.AUTH_TOKEN_CACHE_TIMEOUT", 0):
+            assert self.authenticate() == self.user
+            with self.assertNumQueries(1):
+                assert self.authenticate() == self.user
+            assert cache.get(get_token_cache_key(self.token.key)) is None
+
+    def test_config_change(self):
+        """Test that a user's cached config is replaced when it changes"""
+        assert self.authenticate().custom_config.last_file is None
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.custom_config.last_file = 1
+            self.user.custom_config.save()
+        assert self.authenticate().custom_config.last_file == 1
+
+    def test_logout(self):
+        """Test that a token can't be used once its user has logged out,
+        and is only removed from the cache once that's committed"""
+        assert self.authenticate() == self.user
+        request = self.factory.post(
+            "/logout/", HTTP_AUTHORIZATION=f"Token {self.token.key}"
+        )
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = LogoutView.as_view()(request)
+        assert response.status_code == 204
+        assert not Token.objects.filter(user=self.user).exists()
+        # Until then, other requests still see the token in the database.
+        assert cache.get(get_token_cache_key(self.token.key)) is not None
+        for callback in callbacks:
+            callback()
+        assert cache.get(get_token_cache_key(self.token.key)) is None
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_inactive_user(self):
+        """Test that a cached token stops working when its user is
+        deactivated"""
+        assert self.authenticate() == self.user
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_default_authentication(self):
+        """Test that views authenticate with cached tokens by default, and
+        never with a username and password"""
+        assert api_settings.DEFAULT_AUTHENTICATION_CLASSES == [
+            CachedTokenAuthentication
+        ]
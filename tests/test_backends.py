@@ -0,0 +1,245 @@
+import json
+import tempfile
+from unittest import mock
+
+import boto3
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from moto import mock_s3
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from sky_write_app.backends import (
+    DropboxStorageBackend,
+    LocalStorageBackend,
+    S3StorageBackend,
+)
+from sky_write_app.clients import DropboxClientRegistry
+from sky_write_app.models import StorageObject
+from sky_write_app.views import StorageObjectDetailView
+from tests.fake_dropbox import FakeDropboxServer
+from users_app.models import CustomConfig
+
+CONTENT = 'First line\nSecond line, with ünïcödé \u2028 and "quotes"\n'.encode()
+
+
+class BackendTests:
+    """Tests shared by every storage backend."""
+
+    def test_round_trip(self):
+        """Test writing, reading, and deleting content"""
+        self.backend.write("note.txt", CONTENT)
+        assert self.backend.exists("note.txt")
+        assert self.backend.stat("note.txt").size == len(CONTENT)
+        assert self.backend.read("note.txt") == CONTENT
+
+        self.backend.delete("note.txt")
+        assert not self.backend.exists("note.txt")
+
+    def test_streaming(self):
+        """Test that content is written and read in chunks"""
+        content = CONTENT * 100
+        self.backend.chunk_size = 100
+        with self.backend.open_write("note.txt") as file:
+            for chunk in (content[:37], content[37:500], content[500:]):
+                file.write(chunk)
+
+        chunks = list(self.backend.iter_chunks("note.txt"))
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 100 for chunk in chunks)
+        assert b"".join(chunks) == content
+
+    def test_delete_many(self):
+        """Test deleting content in bulk, where missing content counts as
+        deleted"""
+        names = [f"note {index}.txt" for index in range(5)]
+        for name in names:
+            self.backend.write(name, CONTENT)
+        assert self.backend.delete_many([*names, "missing.txt"]) == {}
+        assert not any(self.backend.exists(name) for name in names)
+
+    def test_failed_write(self):
+        """Test that content isn't replaced if writing fails"""
+        self.backend.write("note.txt", CONTENT)
+        with self.assertRaises(ValueError):
+            with self.backend.open_write("note.txt") as file:
+                file.write(b"Partial content")
+                raise ValueError
+        assert self.backend.read("note.txt") == CONTENT
+
+    def test_missing(self):
+        """Test that missing content raises ``FileNotFoundError``"""
+        for method in (self.backend.read, self.backend.delete, self.backend.stat):
+            with self.assertRaises(FileNotFoundError):
+                method("missing.txt")
+
+
+class TestLocalStorageBackend(BackendTests, SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.backend = LocalStorageBackend(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+class TestDropboxStorageBackend(BackendTests, SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeDropboxServer().__enter__()
+        cls.registry = DropboxClientRegistry(
+            session_factory=cls.server.create_session,
+            app_key="app key",
+            app_secret="app secret",
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.__exit__()
+        super().tearDownClass()
+
+    def setUp(self):
+        config = CustomConfig(user_id=1, dropbox_token="refresh token")
+        self.backend = DropboxStorageBackend(self.registry.get(config))
+        self.server.files.clear()
+        self.server.requests.clear()
+
+    def test_upload_session(self):
+        """Test that large content is uploaded in several requests"""
+        self.backend.upload_chunk_size = 1000
+        self.backend.write("note.txt", CONTENT * 50)
+
+        assert self.server.files["/note.txt"] == CONTENT * 50
+        assert self.server.requests[0] == "/2/files/upload_session/start"
+        assert "/2/files/upload_session/append_v2" in self.server.requests
+        assert self.server.requests[-1] == "/2/files/upload_session/finish"
+
+    def test_delete_batch(self):
+        """Test that content is deleted with one batch, and that entries
+        that failed are reported"""
+        self.server.failing_deletes = {"/note 1.txt"}
+        self.addCleanup(setattr, self.server, "failing_deletes", set())
+        for name in ("note 0.txt", "note 1.txt"):
+            self.backend.write(name, CONTENT)
+        self.server.requests.clear()
+
+        failures = self.backend.delete_many(["note 0.txt", "note 1.txt", "missing"])
+        assert list(failures) == ["note 1.txt"]
+        assert list(self.server.files) == ["/note 1.txt"]
+        assert self.server.requests == [
+            "/2/files/delete_batch",
+            "/2/files/delete_batch/check",
+        ]
+
+
+class TestS3StorageBackend(BackendTests, SimpleTestCase):
+    def setUp(self):
+        s3_mock = mock_s3()
+        s3_mock.start()
+        self.addCleanup(s3_mock.stop)
+        self.client = boto3.client(
+            "s3",
+            region_name="us-east-1",
+            aws_access_key_id="access key",
+            aws_secret_access_key="secret key",
+        )
+        self.client.create_bucket(Bucket="bucket")
+        self.backend = S3StorageBackend(self.client, "bucket", "1/")
+
+    def test_missing(self):
+        """Test that missing content raises ``FileNotFoundError``, except
+        when deleting it"""
+        for method in (self.backend.read, self.backend.stat):
+            with self.assertRaises(FileNotFoundError):
+                method("missing.txt")
+        self.backend.delete("missing.txt")
+
+    def test_multipart_upload(self):
+        """Test that large content is uploaded in parts, and that the
+        keys are prefixed per user"""
+        # S3 requires parts of at least 5 MiB, except for the last one
+        self.backend.multipart_chunk_size = 5 * 1024 * 1024
+        content = CONTENT * (6 * 1024 * 1024 // len(CONTENT))
+        with mock.patch.object(
+            self.client, "upload_part", wraps=self.client.upload_part
+        ) as upload_part:
+            self.backend.write("note.txt", content)
+        assert upload_part.call_count == 2
+
+        response = self.client.get_object(Bucket="bucket", Key="1/note.txt")
+        assert response["Body"].read() == content
+
+    def test_ranged_reads(self):
+        """Test that content is downloaded one range at a time"""
+        content = CONTENT * 100
+        self.backend.write("note.txt", content)
+        self.backend.range_size = 1000
+        with mock.patch.object(
+            self.client, "get_object", wraps=self.client.get_object
+        ) as get_object:
+            assert self.backend.read("note.txt") == content
+        ranges = [call.kwargs["Range"] for call in get_object.call_args_list]
+        assert ranges == [
+            f"bytes={start}-{start + 999}" for start in range(0, len(content), 1000)
+        ]
+
+    def test_empty(self):
+        """Test reading empty content"""
+        self.backend.write("note.txt", b"")
+        assert self.backend.read("note.txt") == b""
+
+
+class TestContentStreaming(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        patcher = mock.patch(
+            "sky_write_app.backends.LOCAL_STORAGE_ROOT", self.directory.name
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user("user 1")
+        CustomConfig.objects.create(user=self.user, default_storage="LS")
+
+    def get(self, obj):
+        request = self.factory.get(f"/storage_objects/{obj.id}/")
+        force_authenticate(request, self.user)
+        return StorageObjectDetailView.as_view()(request, pk=obj.id)
+
+    def test_content_is_streamed(self):
+        """Test that note content is streamed, and that the output is the
+        same as rendering it all at once"""
+        obj = StorageObject.objects.create(
+            name="note", user=self.user, ordering_parameter=10
+        )
+        content = CONTENT * 5000
+        LocalStorageBackend(self.directory.name).write(f"{obj.file_uuid}.txt", content)
+
+        response = self.get(obj)
+        assert response.status_code == 200
+        assert response.streaming
+        body = b"".join(response.streaming_content)
+        expected = {
+            "id": obj.id,
+            "name": "note",
+            "name_iv": None,
+            "content_iv": None,
+            "is_file": True,
+            "folder_id": None,
+            "user_id": self.user.id,
+            "ordering_parameter": "10.00000000000",
+            "content": content.decode(),
+        }
+        assert body == JSONRenderer().render(expected)
+        assert json.loads(body) == expected
+
+    def test_folder_has_no_content(self):
+        """Test that folders are returned with ``null`` content"""
+        folder = StorageObject.objects.create(
+            name="folder", user=self.user, is_file=False, ordering_parameter=10
+        )
+        response = self.get(folder)
+        assert json.loads(b"".join(response.streaming_content))["content"] is None
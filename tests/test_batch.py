@@ -0,0 +1,152 @@
+import os
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from rest_framework.test import APITestCase, force_authenticate
+
+from sky_write_app import batch
+from sky_write_app.backends import LocalStorageBackend
+from sky_write_app.models import RevisionCounter, StorageObject
+from sky_write_app.views import StorageObjectBatchView
+from sky_write_django.settings import ORDERING_STEP
+from tests.base import LocalStorageMixin
+
+
+class TestBatchCreate(LocalStorageMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.folder = StorageObject.objects.create(
+            name="folder", user=self.user, is_file=False, ordering_parameter=10
+        )
+        StorageObject.objects.create(
+            name="note", user=self.user, folder=self.folder, ordering_parameter=20
+        )
+
+    def post(self, data):
+        request = self.factory.post("/storage_objects/batch/", data, format="json")
+        force_authenticate(request, self.user)
+        return StorageObjectBatchView.as_view()(request)
+
+    def test_batch_create(self):
+        """Test creating nested folders and notes, in new and existing
+        folders, with a fixed number of queries"""
+        notes = [
+            {"name": f"note {index}", "folder_temp_id": "b", "content": f"{index}"}
+            for index in range(20)
+        ]
+        # The existing folder is checked before uploading, and fetched
+        # again in the transaction.
+        with self.assertNumQueries(11):
+            response = self.post(
+                [
+                    *notes,
+                    {
+                        "temp_id": "b",
+                        "name": "b",
+                        "is_file": False,
+                        "folder_temp_id": "a",
+                    },
+                    {"temp_id": "a", "name": "a", "is_file": False},
+                    {"name": "c", "folder_id": self.folder.id, "content": "c"},
+                ]
+            )
+        assert response.status_code == 201
+        *note_data, b, a, c = response.data
+        assert (a["temp_id"], b["temp_id"]) == ("a", "b")
+        assert b["folder_id"] == a["id"]
+        assert a["ordering_parameter"] == f"{ORDERING_STEP + 10}.00000000000"
+        assert c["ordering_parameter"] == f"{ORDERING_STEP + 20}.00000000000"
+
+        created = StorageObject.objects.filter(folder_id=b["id"]).order_by(
+            "ordering_parameter"
+        )
+        assert [obj.name for obj in created] == [note["name"] for note in notes]
+        assert {obj.ancestry for obj in created} == {f"{a['id']}/{b['id']}/"}
+        assert [self.backend.read(f"{obj.file_uuid}.txt") for obj in created] == [
+            note["content"].encode() for note in notes
+        ]
+
+    def test_invalid_folders(self):
+        """Test that nothing is created if any folder reference is bad"""
+        other = User.objects.create_user("user 2")
+        other_folder = StorageObject.objects.create(
+            name="folder", user=other, is_file=False, ordering_parameter=10
+        )
+        for data in (
+            [{"name": "note", "folder_id": other_folder.id}],
+            [{"name": "note", "folder_temp_id": "missing"}],
+            [{"temp_id": "a", "name": "a"}, {"name": "b", "folder_temp_id": "a"}],
+            [
+                {"temp_id": "a", "name": "a", "is_file": False, "folder_temp_id": "b"},
+                {"temp_id": "b", "name": "b", "is_file": False, "folder_temp_id": "a"},
+            ],
+            [{"name": "note", "folder_id": self.folder.id, "folder_temp_id": "a"}],
+            [{"name": "note", "folder_id": 0}],
+        ):
+            response = self.post(data)
+            assert response.status_code == 400, data
+        assert StorageObject.objects.filter(user=self.user).count() == 2
+
+    def test_failed_upload(self):
+        """Test that nothing is kept if some content couldn't be saved"""
+        write = LocalStorageBackend.write
+
+        def write_or_fail(backend, name, content):
+            if content == b"fail":
+                raise PermissionError(name)
+            write(backend, name, content)
+
+        with mock.patch.object(LocalStorageBackend, "write", write_or_fail):
+            response = self.post(
+                [{"name": "note", "content": "ok"}, {"name": "note", "content": "fail"}]
+            )
+        assert response.status_code == 502
+        assert StorageObject.objects.filter(user=self.user).count() == 2
+        # The content that was saved is deleted again.
+        assert os.listdir(self.directory.name) == []
+
+    def test_uploads_outside_transaction(self):
+        """Test that content is uploaded before the transaction that locks
+        the user's revision, and deleted again if the rows can't be
+        created"""
+        upload_contents = batch.upload_contents
+        depth = len(connection.savepoint_ids)
+
+        def check_upload(config, contents):
+            assert len(connection.savepoint_ids) == depth
+            return upload_contents(config, contents)
+
+        with mock.patch.object(batch, "upload_contents", check_upload):
+            response = self.post([{"name": "note", "content": "ok"}])
+            assert response.status_code == 201
+
+            with mock.patch.object(
+                RevisionCounter, "allocate", side_effect=RuntimeError("stopped")
+            ):
+                with self.assertRaises(RuntimeError):
+                    self.post([{"name": "new note", "content": "new"}])
+        assert not StorageObject.objects.filter(name="new note").exists()
+        assert len(os.listdir(self.directory.name)) == 1
+
+    def test_folders_read_after_locking(self):
+        """Test that existing folders are read once the revision counter
+        is locked, so a folder moved in the meantime is seen where it is
+        now"""
+        parent = StorageObject.objects.create(
+            name="parent", user=self.user, is_file=False, ordering_parameter=30
+        )
+        allocate = RevisionCounter.allocate
+
+        def move_then_allocate(user_id):
+            # Another request moves the folder and commits first.
+            StorageObject.objects.filter(id=self.folder.id).update(
+                folder=parent, ancestry=f"{parent.id}/"
+            )
+            return allocate(user_id)
+
+        with mock.patch.object(RevisionCounter, "allocate", move_then_allocate):
+            response = self.post([{"name": "new note", "folder_id": self.folder.id}])
+        assert response.status_code == 201
+        note = StorageObject.objects.get(name="new note")
+        assert note.ancestry == f"{parent.id}/{self.folder.id}/"
@@ -0,0 +1,162 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from sky_write_app.backends import LocalStorageBackend
+from sky_write_app.cache import ContentCache, content_cache
+from sky_write_app.models import StorageObject
+from sky_write_app.views import MeView, StorageObjectDetailView, StorageObjectView
+from tests.base import LocalStorageMixin
+from users_app.models import CustomConfig
+
+
+class TestContentCache(SimpleTestCase):
+    def test_version_must_match(self):
+        """Test that content is only returned for the version it was
+        cached with"""
+        cache = ContentCache(max_bytes=100)
+        cache.set("note", 1, b"Hello")
+        assert cache.get("note", 1) == b"Hello"
+        assert cache.get("note", 2) is None
+        assert cache.stats()["hits"] == 1
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that the cache stays within its size in bytes"""
+        cache = ContentCache(max_bytes=10, max_item_bytes=10)
+        cache.set("a", 1, b"aaaa")
+        cache.set("b", 1, b"bbbb")
+        cache.get("a", 1)
+        cache.set("c", 1, b"cccc")
+        assert cache.get("a", 1) == b"aaaa"
+        assert cache.get("b", 1) is None
+        assert cache.stats()["bytes"] == 8
+
+    def test_large_content_is_not_cached(self):
+        """Test that content read through the cache is only cached if it
+        is small enough"""
+        cache = ContentCache(max_bytes=100, max_item_bytes=10)
+        assert list(cache.iter_through("a", 1, [b"12345", b"6789"])) == [
+            b"12345",
+            b"6789",
+        ]
+        assert b"".join(cache.iter_through("b", 1, [b"123456", b"789012"]))
+        assert cache.get("a", 1) == b"123456789"
+        assert cache.get("b", 1) is None
+
+
+class TestCachedContent(LocalStorageMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        content_cache.clear()
+        self.addCleanup(content_cache.clear)
+
+        request = self.factory.post(
+            "/storage_objects/",
+            {"name": "note", "content": "Hello", "is_file": True},
+            format="json",
+        )
+        force_authenticate(request, self.user)
+        self.obj_id = StorageObjectView.as_view()(request).data["id"]
+
+    def get(self, **headers):
+        request = self.factory.get(f"/storage_objects/{self.obj_id}/", **headers)
+        force_authenticate(request, self.user)
+        return StorageObjectDetailView.as_view()(request, pk=self.obj_id)
+
+    def get_content(self, response):
+        return json.loads(b"".join(response.streaming_content))["content"]
+
+    def test_not_modified(self):
+        """Test that an unchanged note is answered with 304, without
+        reading it from storage"""
+        response = self.get()
+        etag = response["ETag"]
+        assert self.get_content(response) == "Hello"
+
+        with mock.patch.object(LocalStorageBackend, "iter_chunks") as iter_chunks:
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304
+            assert response["ETag"] == etag
+            response = self.get(HTTP_IF_NONE_MATCH=f"W/{etag}")
+            assert response.status_code == 304
+        iter_chunks.assert_not_called()
+
+    def test_content_is_cached(self):
+        """Test that content is read from storage once, and read again
+        after it has been saved"""
+        with mock.patch.object(
+            LocalStorageBackend,
+            "iter_chunks",
+            wraps=LocalStorageBackend(self.directory.name).iter_chunks,
+        ) as iter_chunks:
+            assert self.get_content(self.get()) == "Hello"
+            etag = self.get()["ETag"]
+            assert iter_chunks.call_count == 1
+
+            request = self.factory.put(
+                f"/storage_objects/{self.obj_id}/",
+                {"name": "note", "content": "Goodbye", "is_file": True},
+                format="json",
+            )
+            force_authenticate(request, self.user)
+            StorageObjectDetailView.as_view()(request, pk=self.obj_id)
+
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200
+            assert self.get_content(response) == "Goodbye"
+            assert iter_chunks.call_count == 2
+
+
+class TestCachedMe(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user("user 1")
+        CustomConfig.objects.create(user=self.user)
+        StorageObject.objects.create(
+            name="folder", user=self.user, is_file=False, ordering_parameter=1
+        )
+
+    def get(self, **headers):
+        request = self.factory.get("/me/", **headers)
+        force_authenticate(request, self.user)
+        return MeView.as_view()(request)
+
+    def test_me_is_cached(self):
+        """Test that /me/ is built once per revision, and answered with
+        304 if the client has it already"""
+        response = self.get()
+        etag = response["ETag"]
+        body = b"".join(response)
+        # Only the revision is read.
+        with self.assertNumQueries(1):
+            assert b"".join(self.get()) == body
+        with self.assertNumQueries(1):
+            assert self.get(HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        StorageObject.objects.create(name="note", user=self.user, ordering_parameter=2)
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+        data = json.loads(b"".join(response))
+        assert len(data["storage_objects"]) == 2
+        etag = response["ETag"]
+
+        self.user.custom_config.last_file = data["storage_objects"][1]["id"]
+        self.user.custom_config.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        data = json.loads(b"".join(response))
+        assert data["last_file"] == self.user.custom_config.last_file
+
+    def test_large_me_is_not_cached(self):
+        """Test that /me/ isn't cached if it's too large"""
+        with mock.patch("sky_write_app.views.ME_CACHE_MAX_BYTES", 10):
+            body = b"".join(self.get())
+            with self.assertNumQueries(2):
+                assert b"".join(self.get()) == body
@@ -0,0 +1,110 @@
+import json
+from decimal import Decimal
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase, force_authenticate
+
+from sky_write_app.views import (
+    ChangesView,
+    MeView,
+    StorageObjectDetailView,
+    StorageObjectReOrderView,
+    StorageObjectView,
+)
+from tests.base import LocalStorageMixin
+
+
+class TestChanges(LocalStorageMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def create(self, name, **data):
+        request = self.factory.post(
+            "/storage_objects/", {"name": name, **data}, format="json"
+        )
+        force_authenticate(request, self.user)
+        return StorageObjectView.as_view()(request).data["id"]
+
+    def get_changes(self, since):
+        request = self.factory.get("/changes/", {"since": since})
+        force_authenticate(request, self.user)
+        return ChangesView.as_view()(request)
+
+    def get_revision(self):
+        request = self.factory.get("/me/")
+        force_authenticate(request, self.user)
+        return json.loads(b"".join(MeView.as_view()(request)))["revision"]
+
+    def test_changes(self):
+        """Test that creating, editing, re-ordering and deleting objects
+        are each returned once, after the revision a client last saw"""
+        folder_id = self.create("folder", is_file=False)
+        note_id = self.create("note", content="Hello", folder_id=folder_id)
+        other_id = self.create("other", content="Hi")
+        revision = self.get_revision()
+
+        response = self.get_changes(0)
+        assert response.data["revision"] == revision
+        assert [obj["id"] for obj in response.data["storage_objects"]] == [
+            folder_id,
+            note_id,
+            other_id,
+        ]
+        assert response.data["deleted"] == []
+        assert self.get_changes(revision).data["storage_objects"] == []
+
+        request = self.factory.put(
+            f"/storage_objects/{note_id}/",
+            {"name": "renamed", "content": "Goodbye", "folder_id": folder_id},
+            format="json",
+        )
+        force_authenticate(request, self.user)
+        StorageObjectDetailView.as_view()(request, pk=note_id)
+        response = self.get_changes(revision)
+        assert [obj["name"] for obj in response.data["storage_objects"]] == ["renamed"]
+        revision = response.data["revision"]
+
+        request = self.factory.post("/re_order/", [other_id, folder_id], format="json")
+        force_authenticate(request, self.user)
+        StorageObjectReOrderView.as_view()(request)
+        response = self.get_changes(revision)
+        ordering = {
+            obj["id"]: Decimal(obj["ordering_parameter"])
+            for obj in response.data["storage_objects"]
+        }
+        assert sorted(ordering, key=ordering.get) == [other_id, folder_id]
+        revision = response.data["revision"]
+
+        request = self.factory.delete(f"/storage_objects/{folder_id}/?recursive")
+        force_authenticate(request, self.user)
+        StorageObjectDetailView.as_view()(request, pk=folder_id)
+        response = self.get_changes(revision)
+        assert response.data["storage_objects"] == []
+        assert sorted(response.data["deleted"]) == [folder_id, note_id]
+        assert response.data["revision"] > revision
+        assert response.data["revision"] == self.get_revision()
+
+    def test_contents_moved_up(self):
+        """Test that deleting a folder non-recursively reports its
+        contents as changed, and the folder as deleted"""
+        folder_id = self.create("folder", is_file=False)
+        note_id = self.create("note", content="Hello", folder_id=folder_id)
+        revision = self.get_revision()
+
+        request = self.factory.delete(f"/storage_objects/{folder_id}/")
+        force_authenticate(request, self.user)
+        StorageObjectDetailView.as_view()(request, pk=folder_id)
+        response = self.get_changes(revision)
+        [note] = response.data["storage_objects"]
+        assert note["id"] == note_id
+        assert note["folder_id"] is None
+        assert response.data["deleted"] == [folder_id]
+
+    def test_invalid_revision(self):
+        """Test that a revision must be given as a whole number"""
+        assert self.get_changes("-1").status_code == 400
+        request = self.factory.get("/changes/")
+        force_authenticate(request, self.user)
+        assert ChangesView.as_view()(request).status_code == 400
@@ -0,0 +1,114 @@
+import json
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from sky_write_app.clients import DropboxClientRegistry
+from sky_write_app.models import StorageObject
+from sky_write_app.views import StorageObjectDetailView, StorageObjectView
+from tests.fake_dropbox import FakeDropboxServer
+from users_app.models import CustomConfig
+
+
+class TestDropboxClientRegistry(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.factory = APIRequestFactory()
+        cls.server = FakeDropboxServer().__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.__exit__()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.files.clear()
+        self.server.requests.clear()
+        self.registry = DropboxClientRegistry(
+            max_clients=2,
+            session_factory=self.server.create_session,
+            app_key="app key",
+            app_secret="app secret",
+        )
+        self.user = User.objects.create_user("user 1")
+        self.config = CustomConfig.objects.create(
+            user=self.user, default_storage="DX", dropbox_token="refresh token"
+        )
+
+    def test_clients_are_reused(self):
+        """Test that a user's client and access token are reused until
+        the token is about to expire"""
+        client = self.registry.get(self.config)
+        for _ in range(5):
+            assert self.registry.get(self.config) is client
+        assert self.registry.stats() == {
+            "clients": 1,
+            "hits": 5,
+            "misses": 1,
+            "refreshes": 1,
+        }
+        assert self.server.requests == ["/oauth2/token"]
+
+        # Let the token get close to expiring
+        client._oauth2_access_token_expiration = datetime.utcnow() + timedelta(
+            seconds=60
+        )
+        assert self.registry.get(self.config) is client
+        assert self.registry.refreshes == 2
+
+    def test_clients_are_replaced(self):
+        """Test that a new client is created when the user's refresh token
+        changes, and that the least recently used clients are dropped"""
+        client = self.registry.get(self.config)
+        self.config.dropbox_token = "new refresh token"
+        assert self.registry.get(self.config) is not client
+        assert self.registry.misses == 2
+
+        for index in range(2):
+            user = User.objects.create_user(f"other user {index}")
+            self.registry.get(
+                CustomConfig(user=user, default_storage="DX", dropbox_token="token")
+            )
+        assert self.registry.stats()["clients"] == 2
+        self.registry.get(self.config)
+        assert self.registry.misses == 5
+
+    def test_storage_round_trip(self):
+        """Test creating, reading and deleting a note stored in Dropbox
+        with a single token refresh"""
+        with mock.patch("sky_write_app.backends.dropbox_clients", self.registry):
+            request = self.factory.post(
+                "/storage_objects/",
+                data={"name": "note", "content": "Hello"},
+                format="json",
+            )
+            force_authenticate(request, self.user)
+            response = StorageObjectView.as_view()(request)
+            assert response.status_code == 201
+            pk = response.data["id"]
+            obj = StorageObject.objects.get(id=pk)
+            assert self.server.files == {f"/{obj.file_uuid}.txt": b"Hello"}
+
+            request = self.factory.get(f"/storage_objects/{pk}/")
+            force_authenticate(request, self.user)
+            response = StorageObjectDetailView.as_view()(request, pk=pk)
+            data = json.loads(b"".join(response.streaming_content))
+            assert data["id"] == pk
+            assert data["content"] == "Hello"
+
+            request = self.factory.delete(f"/storage_objects/{pk}/")
+            force_authenticate(request, self.user)
+            response = StorageObjectDetailView.as_view()(request, pk=pk)
+            assert response.status_code == 204
+            assert self.server.files == {}
+
+        assert self.server.requests == [
+            "/oauth2/token",
+            "/2/files/upload",
+            "/2/files/download",
+            "/2/files/delete_v2",
+        ]
+        assert self.registry.stats()["hits"] == 2
@@ -0,0 +1,113 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from sky_write_app.models import StorageObject
+
+
+class TestCommands(TestCase):
+    def test_benchmark_listing_queries(self):
+        """Test that the listing benchmark reports on every query and
+        leaves no seeded rows behind"""
+        out = StringIO()
+        call_command(
+            "benchmark_listing_queries",
+            rows=500,
+            users=3,
+            folders=5,
+            repeat=1,
+            yes=True,
+            stdout=out,
+        )
+        output = out.getvalue()
+        for name in (
+            "root contents",
+            "folder contents",
+            "folder contents, next page",
+            "last object in folder",
+        ):
+            assert name in output
+        assert output.count("with index") == 4
+        assert not StorageObject.objects.exists()
+
+    def test_benchmark_listing_queries_requires_confirmation(self):
+        """Test that the listing benchmark refuses to run unconfirmed"""
+        with self.assertRaises(CommandError):
+            call_command("benchmark_listing_queries", rows=10)
+
+    def test_benchmark_auth(self):
+        """Test that the auth benchmark reports on every authentication
+        class, and leaves no user behind"""
+        out = StringIO()
+        with mock.patch("users_app.authentication.AUTH_TOKEN_CACHE_TIMEOUT", 60):
+            call_command("benchmark_auth", repeat=5, basic_repeat=1, stdout=out)
+        output = out.getvalue()
+        assert "token: " in output
+        assert "cached token: " in output
+        assert "cached token: 0" not in output
+        assert output.splitlines()[-1].endswith(" 0 queries per request")
+        assert not User.objects.exists()
+
+    def test_benchmark_serialization(self):
+        """Test that the serialization benchmark renders each view the same
+        way every time, and leaves no seeded tree behind"""
+        out = StringIO()
+        err = StringIO()
+        call_command(
+            "benchmark_serialization",
+            nodes=60,
+            fanout=2,
+            depth=2,
+            listing=20,
+            repeat=1,
+            stdout=out,
+            stderr=err,
+        )
+        output = out.getvalue()
+        assert "serializers and JSONRenderer" in output
+        assert "rows and orjson, streamed" in output
+        assert "folder listing (" in output
+        assert err.getvalue() == ""
+        assert not StorageObject.objects.exists()
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(0.05)
+        self.send_response(200 if self.headers["Authorization"] else 401)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestLoadTest(TestCase):
+    def test_load_test(self):
+        """Test that the load test reports how many requests were served
+        at once, and their statuses"""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        out = StringIO()
+        call_command(
+            "load_test",
+            f"http://127.0.0.1:{server.server_port}/me/",
+            token="token",
+            requests=20,
+            concurrency=10,
+            stdout=out,
+        )
+        output = out.getvalue()
+        assert "200: 20" in output
+        served = float(output.split("served concurrently: ")[1].split()[0])
+        assert served > 1
@@ -0,0 +1,77 @@
+import gzip
+import zlib
+from unittest import mock
+
+import brotli
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from sky_write_app.middleware import CompressionMiddleware, get_encoding
+
+
+class TestCompression(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("sky_write_app.middleware.COMPRESSION_MIN_BYTES", 100)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def respond(self, response, accept_encoding="gzip, deflate, br"):
+        request = self.factory.get("/me/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda _: response)(request)
+
+    def test_get_encoding(self):
+        """Test choosing the encoding the client prefers"""
+        assert get_encoding("gzip, deflate, br") == "br"
+        assert get_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+        assert get_encoding("br;q=0, gzip") == "gzip"
+        assert get_encoding("*") == "br"
+        assert get_encoding("*;q=0, gzip;q=0.1") == "gzip"
+        assert get_encoding("identity") is None
+        assert get_encoding("gzip;q=nonsense") is None
+        assert get_encoding("") is None
+
+    def test_compresses_large_responses(self):
+        """Test that responses over the threshold are compressed, and
+        small ones aren't"""
+        body = b'{"name_iv": "abc", "is_file": true}' * 20
+        response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = '"version"'
+        response = self.respond(response, "gzip")
+        assert response["Content-Encoding"] == "gzip"
+        assert response["Content-Length"] == str(len(response.content))
+        assert response["ETag"] == 'W/"version"'
+        assert response["Vary"] == "Accept-Encoding"
+        assert gzip.decompress(response.content) == body
+
+        response = self.respond(HttpResponse(body, content_type="application/json"))
+        assert response["Content-Encoding"] == "br"
+        assert brotli.decompress(response.content) == body
+
+        response = self.respond(HttpResponse(b"{}", content_type="application/json"))
+        assert not response.has_header("Content-Encoding")
+        assert response.content == b"{}"
+
+        response = self.respond(HttpResponse(body, content_type="application/zip"))
+        assert not response.has_header("Content-Encoding")
+
+    def test_streaming(self):
+        """Test that streamed responses are compressed a chunk at a time,
+        and sent as they are if they end before the threshold"""
+        chunks = [b'{"files": [', *(b'{"path": "folder/note"},' for _ in range(10))]
+        response = StreamingHttpResponse(chunks, content_type="application/json")
+        response = self.respond(response, "gzip")
+        assert response["Content-Encoding"] == "gzip"
+        decompressor = zlib.decompressobj(31)
+        compressed = iter(response.streaming_content)
+        # Each chunk can be read as soon as it arrives.
+        for chunk in chunks:
+            assert decompressor.decompress(next(compressed)) == chunk
+        assert decompressor.decompress(b"".join(compressed)) == b""
+        assert decompressor.eof
+
+        chunks = [b"[", b"]"]
+        response = StreamingHttpResponse(chunks, content_type="application/json")
+        response = self.respond(response)
+        assert not response.has_header("Content-Encoding")
+        assert b"".join(response.streaming_content) == b"[]"
@@ -0,0 +1,147 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase, force_authenticate
+
+from sky_write_app.backends import LocalStorageBackend
+from sky_write_app.models import RevisionCounter, StorageObject
+from sky_write_app.views import StorageObjectDetailView
+from tests.base import LocalStorageMixin
+from users_app.models import CustomConfig
+
+
+class TestDelete(LocalStorageMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+
+        # A folder holding a subfolder, each with some notes
+        self.folder = self.create("folder", is_file=False)
+        self.subfolder = self.create("subfolder", self.folder, is_file=False)
+        self.notes = [
+            self.create(f"note {index}", folder)
+            for folder in (self.folder, self.subfolder)
+            for index in range(3)
+        ]
+        self.other = self.create("other note")
+
+    def create(self, name, folder=None, is_file=True):
+        obj = StorageObject.objects.create(
+            name=name,
+            user=self.user,
+            folder=folder,
+            is_file=is_file,
+            ordering_parameter=10,
+        )
+        if is_file:
+            self.backend.write(f"{obj.file_uuid}.txt", name.encode())
+        return obj
+
+    def delete(self, obj, recursive=True, user=None):
+        query = "?recursive" if recursive else ""
+        request = self.factory.delete(f"/storage_objects/{obj.id}/{query}")
+        force_authenticate(request, user or self.user)
+        return StorageObjectDetailView.as_view()(request, pk=obj.id)
+
+    def test_recursive_delete(self):
+        """Test that a folder is deleted along with everything in it, with
+        a number of queries that doesn't depend on how much it holds"""
+        with self.assertNumQueries(13):
+            response = self.delete(self.folder)
+        assert response.status_code == 204
+        assert list(StorageObject.objects.all()) == [self.other]
+        assert not any(
+            self.backend.exists(f"{note.file_uuid}.txt") for note in self.notes
+        )
+
+    def test_partial_failure(self):
+        """Test that files whose content couldn't be deleted are kept,
+        along with the folders containing them"""
+        failing = self.notes[4]
+        delete = LocalStorageBackend.delete
+
+        def delete_or_fail(backend, name):
+            if name == f"{failing.file_uuid}.txt":
+                raise PermissionError(name)
+            delete(backend, name)
+
+        with mock.patch.object(LocalStorageBackend, "delete", delete_or_fail):
+            response = self.delete(self.folder)
+        assert response.status_code == 502
+        assert response.data["failed_ids"] == [failing.id]
+        assert set(StorageObject.objects.all()) == {
+            self.folder,
+            self.subfolder,
+            failing,
+            self.other,
+        }
+
+    def test_contents_move_up(self):
+        """Test that deleting a folder non-recursively moves its contents
+        after the parent's existing contents, in their old order"""
+        for index, obj in enumerate([self.subfolder, *self.notes[:3]]):
+            obj.ordering_parameter = 40 - 10 * index
+            obj.save()
+        self.other.ordering_parameter = 1000
+        self.other.save()
+
+        with self.assertNumQueries(16):
+            response = self.delete(self.folder, recursive=False)
+        assert response.status_code == 204
+
+        contents = list(
+            StorageObject.objects.filter(folder=None).order_by("ordering_parameter")
+        )
+        assert contents == [self.other, *reversed(self.notes[:3]), self.subfolder]
+        assert [obj.ordering_parameter for obj in contents] == [
+            1000,
+            1010,
+            1020,
+            1030,
+            1040,
+        ]
+        assert [obj.ancestry for obj in contents] == [""] * 5
+        subfolder_notes = StorageObject.objects.filter(folder=self.subfolder)
+        assert {obj.ancestry for obj in subfolder_notes} == {f"{self.subfolder.id}/"}
+
+    def test_not_found(self):
+        """Test that deleting an object that doesn't exist, or that belongs
+        to another user, fails without deleting anything"""
+        missing = StorageObject(id=self.other.id + 1000)
+        assert self.delete(missing).status_code == 404
+
+        other_user = User.objects.create_user("user 2")
+        CustomConfig.objects.create(user=other_user, default_storage="LS")
+        for recursive in (True, False):
+            response = self.delete(self.folder, recursive, user=other_user)
+            assert response.status_code == 404
+        assert StorageObject.objects.count() == 9
+        assert all(self.backend.exists(f"{note.file_uuid}.txt") for note in self.notes)
+
+    def test_contents_move_up_after_concurrent_move(self):
+        """Test that a folder moved while waiting for the revision
+        counter moves its contents into its new parent"""
+        target = self.create("target", is_file=False)
+        allocate = RevisionCounter.allocate
+
+        def move_then_allocate(user_id):
+            # Another request moves the folder and commits first.
+            StorageObject.objects.rebase_ancestry(
+                self.folder.descendant_ancestry, f"{target.id}/{self.folder.id}/"
+            )
+            StorageObject.objects.filter(id=self.folder.id).update(
+                folder=target, ancestry=f"{target.id}/"
+            )
+            with mock.patch.object(RevisionCounter, "allocate", allocate):
+                return allocate(user_id)
+
+        with mock.patch.object(RevisionCounter, "allocate", move_then_allocate):
+            response = self.delete(self.folder, recursive=False)
+        assert response.status_code == 204
+
+        self.subfolder.refresh_from_db()
+        assert self.subfolder.folder_id == target.id
+        assert self.subfolder.ancestry == f"{target.id}/"
+        subfolder_notes = StorageObject.objects.filter(folder=self.subfolder)
+        assert {obj.ancestry for obj in subfolder_notes} == {
+            f"{target.id}/{self.subfolder.id}/"
+        }
@@ -0,0 +1,89 @@
+import io
+import json
+import tarfile
+import zipfile
+from unittest import mock
+
+from rest_framework.test import APITestCase, force_authenticate
+
+from sky_write_app.backends import LocalStorageBackend
+from sky_write_app.models import StorageObject
+from sky_write_app.views import ExportView
+from tests.base import LocalStorageMixin
+
+
+class TestExport(LocalStorageMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.folder = self.create("folder/a", is_file=False)
+        self.subfolder = self.create("..", self.folder, is_file=False)
+        self.note = self.create("note", self.subfolder, content=b"\x00encrypted")
+        self.twin = self.create("note", self.subfolder, content=b"twin")
+        self.missing = self.create("missing")
+
+    def create(self, name, folder=None, is_file=True, content=None):
+        obj = StorageObject.objects.create(
+            name=name,
+            name_iv="name iv",
+            content_iv="content iv",
+            user=self.user,
+            folder=folder,
+            is_file=is_file,
+            ordering_parameter=10,
+        )
+        if content is not None:
+            self.backend.write(f"{obj.file_uuid}.txt", content)
+        return obj
+
+    def get(self, archive):
+        request = self.factory.get(f"/export/?archive={archive}")
+        force_authenticate(request, self.user)
+        return ExportView.as_view()(request)
+
+    def check_archive(self, members, manifest):
+        objects = {obj["id"]: obj for obj in manifest["storage_objects"]}
+        assert objects[self.note.id]["content_iv"] == "content iv"
+        assert objects[self.note.id]["path"] == "folder%2Fa/../note"
+        assert objects[self.note.id]["member"] == "notes/folder%2Fa/%2E%2E/note"
+        assert objects[self.twin.id]["member"] == (
+            f"notes/folder%2Fa/%2E%2E/note ({self.twin.id})"
+        )
+        assert members[objects[self.note.id]["member"]] == b"\x00encrypted"
+        assert members[objects[self.twin.id]["member"]] == b"twin"
+        assert json.loads(members["errors.json"]) == [
+            {"id": self.missing.id, "error": "FileNotFoundError"}
+        ]
+
+    def test_zip(self):
+        """Test exporting a zip archive, which starts with the manifest"""
+        response = self.get("zip")
+        assert response["Content-Type"] == "application/zip"
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        assert archive.namelist()[0] == "manifest.json"
+        assert "notes/folder%2Fa/%2E%2E/" in archive.namelist()
+        members = {name: archive.read(name) for name in archive.namelist()}
+        self.check_archive(members, json.loads(members["manifest.json"]))
+
+    def test_tar(self):
+        """Test exporting a tar archive"""
+        response = self.get("tar")
+        archive = tarfile.open(fileobj=io.BytesIO(b"".join(response.streaming_content)))
+        members = {
+            info.name: archive.extractfile(info).read()
+            for info in archive.getmembers()
+            if info.isfile()
+        }
+        assert archive.getmember("notes/folder%2Fa").isdir()
+        self.check_archive(members, json.loads(members["manifest.json"]))
+
+    def test_streamed(self):
+        """Test that the archive starts before any content is read"""
+        with mock.patch.object(LocalStorageBackend, "iter_chunks") as iter_chunks:
+            response = self.get("tar")
+            first_chunk = next(iter(response.streaming_content))
+            assert b"manifest.json" in first_chunk
+            iter_chunks.assert_not_called()
+
+    def test_invalid_format(self):
+        """Test that only known archive formats can be asked for"""
+        assert self.get("rar").status_code == 400
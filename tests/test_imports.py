@@ -0,0 +1,170 @@
+import io
+import os
+import tarfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from sky_write_app import imports
+from sky_write_app.export import EXPORT_FIELDS, TarArchive, ZipArchive, iter_export
+from sky_write_app.listing import RowTree
+from sky_write_app.models import ImportJob, ImportStatus, StorageObject
+from tests.base import LocalStorageMixin
+from users_app.models import CustomConfig
+
+
+class TestImportArchive(LocalStorageMixin, TestCase):
+    def write_archive(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "wb") as file:
+            file.write(content)
+        return path
+
+    def get_tree(self, user):
+        """Return every object as (path, IVs, content), in display order."""
+        tree = RowTree.for_user(user, EXPORT_FIELDS)
+        paths = dict((row["id"], path) for row, path in tree.iter_paths())
+        return [
+            (
+                paths[row["id"]],
+                row["name_iv"],
+                row["content_iv"],
+                self.backend.read(f"{row['file_uuid']}.txt")
+                if row["is_file"]
+                else None,
+            )
+            for row in tree.rows.values()
+        ]
+
+    def test_exported_archive(self):
+        """Test that an exported archive is imported as it was exported"""
+        other = User.objects.create_user("user 2")
+        CustomConfig.objects.create(user=other, default_storage="LS")
+        folder = StorageObject.objects.create(
+            name="folder",
+            name_iv="iv 1",
+            user=other,
+            is_file=False,
+            ordering_parameter=1,
+        )
+        for index in range(3):
+            obj = StorageObject.objects.create(
+                name=f"note {index % 2}",
+                name_iv=f"name iv {index}",
+                content_iv=f"content iv {index}",
+                user=other,
+                folder=folder,
+                ordering_parameter=10 - index,
+            )
+            self.backend.write(f"{obj.file_uuid}.txt", f"content {index}".encode())
+
+        for archive_class in (ZipArchive, TarArchive):
+            StorageObject.objects.filter(user=self.user).delete()
+            path = self.write_archive(
+                f"export.{archive_class.extension}",
+                b"".join(iter_export(other, archive_class)),
+            )
+            call_command("import_archive", path, user="user 1", stdout=io.StringIO())
+            assert self.get_tree(self.user) == self.get_tree(other)
+
+    def test_same_named_folders(self):
+        """Test that the contents of sibling folders with the same name are
+        imported into the right folder"""
+        other = User.objects.create_user("user 2")
+        CustomConfig.objects.create(user=other, default_storage="LS")
+        for index in range(2):
+            folder = StorageObject.objects.create(
+                name="Notes",
+                name_iv=f"folder iv {index}",
+                user=other,
+                is_file=False,
+                ordering_parameter=index,
+            )
+            sub_folder = StorageObject.objects.create(
+                name="Sub",
+                name_iv=f"sub folder iv {index}",
+                user=other,
+                folder=folder,
+                is_file=False,
+                ordering_parameter=1,
+            )
+            for parent in (folder, sub_folder):
+                obj = StorageObject.objects.create(
+                    name="note",
+                    name_iv=f"{parent.name_iv} note",
+                    user=other,
+                    folder=parent,
+                    ordering_parameter=2,
+                )
+                self.backend.write(f"{obj.file_uuid}.txt", parent.name_iv.encode())
+
+        path = self.write_archive(
+            "export.tar", b"".join(iter_export(other, TarArchive))
+        )
+        call_command("import_archive", path, user="user 1", stdout=io.StringIO())
+
+        def get_contents(user):
+            objects = StorageObject.objects.filter(user=user).select_related("folder")
+            return sorted(
+                (
+                    obj.folder.name_iv if obj.folder else "",
+                    obj.name,
+                    obj.name_iv,
+                    self.backend.read(f"{obj.file_uuid}.txt") if obj.is_file else None,
+                )
+                for obj in objects
+            )
+
+        assert get_contents(self.user) == get_contents(other)
+
+    def test_resume(self):
+        """Test that an interrupted import resumes after the last batch it
+        completed, without creating anything twice"""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for name in ["a/b/1", "a/2", "3", "a/b/4", "5"]:
+                content = name.encode()
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+        path = self.write_archive("notes.tar", buffer.getvalue())
+
+        create_batch = imports.create_batch
+        calls = []
+
+        def fail_third_batch(user, items, **kwargs):
+            calls.append(items)
+            if len(calls) == 4:
+                raise OSError("Worker stopped")
+            return create_batch(user, items, **kwargs)
+
+        with mock.patch.object(imports, "create_batch", fail_third_batch):
+            with self.assertRaises(CommandError):
+                call_command(
+                    "import_archive",
+                    path,
+                    user="user 1",
+                    batch_size=2,
+                    stdout=io.StringIO(),
+                )
+        job = ImportJob.objects.get()
+        assert job.status == ImportStatus.FAILED
+        assert job.members_done == 2
+
+        call_command("import_archive", resume=job.id, stdout=io.StringIO())
+        job.refresh_from_db()
+        assert job.status == ImportStatus.COMPLETE
+        assert job.members_done == 5
+        assert sorted(
+            (path, content) for path, _, _, content in self.get_tree(self.user)
+        ) == [
+            ("3", b"3"),
+            ("5", b"5"),
+            ("a", None),
+            ("a/2", b"a/2"),
+            ("a/b", None),
+            ("a/b/1", b"a/b/1"),
+            ("a/b/4", b"a/b/4"),
+        ]
@@ -0,0 +1,90 @@
+import json
+import threading
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase, force_authenticate
+
+from sky_write_app.concurrency import iter_concurrently
+from sky_write_app.models import StorageObject
+from sky_write_app.views import StorageObjectMultiGetView
+from tests.base import LocalStorageMixin
+
+
+class TestIterConcurrently(SimpleTestCase):
+    def test_completion_order(self):
+        """Test that results are yielded as they complete, unless they're
+        asked for in order"""
+        first_done = threading.Event()
+
+        def work(item):
+            if item == 0:
+                # Only finish after a later item has.
+                first_done.wait(5)
+            else:
+                first_done.set()
+            return item * 10
+
+        results = [
+            (item, future.result())
+            for item, future in iter_concurrently(work, range(2), max_workers=2)
+        ]
+        assert results == [(1, 10), (0, 0)]
+
+        first_done.clear()
+        results = iter_concurrently(work, range(5), max_workers=2, ordered=True)
+        assert [future.result() for _item, future in results] == [0, 10, 20, 30, 40]
+
+
+class TestMultiGet(LocalStorageMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.folder = StorageObject.objects.create(
+            name="folder", user=self.user, is_file=False, ordering_parameter=10
+        )
+        self.notes = [
+            StorageObject.objects.create(
+                name=f"note {index}", user=self.user, ordering_parameter=20 + index
+            )
+            for index in range(10)
+        ]
+        for note in self.notes[1:]:
+            self.backend.write(f"{note.file_uuid}.txt", f"{note.name}\n".encode())
+
+    def post(self, data):
+        request = self.factory.post("/storage_objects/multi_get/", data, format="json")
+        force_authenticate(request, self.user)
+        return StorageObjectMultiGetView.as_view()(request)
+
+    def test_multi_get(self):
+        """Test that objects are streamed as JSON lines, with their content
+        read using a fixed number of queries"""
+        ids = [self.folder.id, *(note.id for note in self.notes)]
+        with self.assertNumQueries(2):
+            response = self.post(ids)
+            body = b"".join(response.streaming_content)
+        assert response["Content-Type"] == "application/x-ndjson"
+
+        lines = {line["id"]: line for line in map(json.loads, body.splitlines())}
+        assert list(sorted(lines)) == sorted(ids)
+        assert lines[self.folder.id]["content"] is None
+        assert lines[self.notes[0].id]["error"] == "Content not found."
+        for note in self.notes[1:]:
+            assert lines[note.id]["content"] == f"{note.name}\n"
+            assert lines[note.id]["name"] == note.name
+
+    def test_other_users_objects(self):
+        """Test that objects belonging to other users can't be fetched"""
+        other = User.objects.create_user("user 2")
+        obj = StorageObject.objects.create(
+            name="note", user=other, ordering_parameter=10
+        )
+        response = self.post([self.notes[1].id, obj.id])
+        assert response.status_code == 400
+        assert response.data == {"detail": f"An invalid object ID was sent ({obj.id})"}
+
+    def test_invalid_ids(self):
+        """Test that anything but a list of whole numbers is rejected"""
+        for data in (["abc"], {"ids": [self.notes[1].id]}, [[1]], "1"):
+            response = self.post(data)
+            assert response.status_code == 400, data
@@ -0,0 +1,138 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from sky_write_app.models import StorageObject
+from sky_write_app.ordering import (
+    ORDERING_PRECISION,
+    OrderingGapExhausted,
+    allocate_last,
+    between,
+    following,
+    following_expression,
+    rebalance,
+)
+from sky_write_app.tasks import rebalance_siblings
+from sky_write_django.settings import ORDERING_MAX, ORDERING_STEP
+
+
+class TestOrdering(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("user 1")
+
+    def create_siblings(self, ordering_parameters):
+        return [
+            StorageObject.objects.create(
+                name=f"note {index}",
+                user=self.user,
+                ordering_parameter=ordering_parameter,
+            )
+            for index, ordering_parameter in enumerate(ordering_parameters)
+        ]
+
+    def get_ordering_parameters(self):
+        return list(
+            StorageObject.objects.filter(user=self.user)
+            .order_by("ordering_parameter")
+            .values_list("id", "ordering_parameter")
+        )
+
+    def test_following(self):
+        """Test that appended values are a full step apart while there is
+        room, and squeezed into the remaining gap otherwise"""
+        assert following(count=2) == [ORDERING_STEP, 2 * ORDERING_STEP]
+        assert following(Decimal(10)) == [10 + ORDERING_STEP]
+        last = Decimal(ORDERING_MAX - 30)
+        assert following(last, 2) == [last + 10, last + 20]
+        with self.assertRaises(OrderingGapExhausted):
+            following(ORDERING_MAX - ORDERING_PRECISION)
+
+    def test_following_expression(self):
+        """Test that values are shifted after the last value if there is
+        room, and scaled down into the remaining gap otherwise"""
+        expression, new_max = following_expression(Decimal(10), Decimal(50))
+        assert new_max == 60
+        last = Decimal(ORDERING_MAX) * 3 / 4
+        expression, new_max = following_expression(last, Decimal(ORDERING_MAX) / 2)
+        assert last < new_max < ORDERING_MAX
+        with self.assertRaises(OrderingGapExhausted):
+            following_expression(ORDERING_MAX - ORDERING_PRECISION, Decimal(1))
+
+    def test_between(self):
+        """Test inserting between neighbours until the gap is used up"""
+        assert between(Decimal(10), Decimal(20)) == 15
+        assert between() == Decimal(ORDERING_MAX) / 2
+        with self.assertRaises(OrderingGapExhausted):
+            between(Decimal(1), Decimal(1) + ORDERING_PRECISION)
+
+    def test_appending_does_not_run_out_of_room(self):
+        """Test that many appends keep siblings apart, where the old
+        halving scheme ran out of precision after a few dozen"""
+        for index in range(100):
+            StorageObject.objects.create(
+                name=f"note {index}",
+                user=self.user,
+                ordering_parameter=allocate_last(self.user.id, None)[0],
+            )
+        values = [value for _, value in self.get_ordering_parameters()]
+        assert len(set(values)) == 100
+        assert values == sorted(values)
+        assert values[-1] == 100 * ORDERING_STEP
+
+    # SQLite can't store the full precision of ``ordering_parameter`` near
+    # ``ORDERING_MAX``, so exhaustion is tested on a smaller range.
+    @mock.patch("sky_write_app.ordering.ORDERING_STEP", 10)
+    @mock.patch("sky_write_app.ordering.ORDERING_MAX", 1000)
+    def test_allocate_last_renumbers_when_exhausted(self):
+        """Test that an exhausted gap at the end of a folder is widened
+        by renumbering only the last few siblings"""
+        first, *crowded = self.create_siblings(
+            [
+                10,
+                1000 - 3 * ORDERING_PRECISION,
+                1000 - 2 * ORDERING_PRECISION,
+                1000 - ORDERING_PRECISION,
+            ]
+        )
+        [value] = allocate_last(self.user.id, None)
+
+        ordering_parameters = self.get_ordering_parameters()
+        assert [pk for pk, _ in ordering_parameters] == [
+            first.id,
+            *(obj.id for obj in crowded),
+        ]
+        # The first sibling is far enough away to be left alone
+        assert ordering_parameters[0][1] == 10
+        assert ordering_parameters[-1][1] < value < 1000
+        assert 1000 - ordering_parameters[-1][1] >= 10
+
+    def test_rebalance_only_touches_affected_range(self):
+        """Test that rebalancing a cramped spot in the middle of a
+        folder leaves distant siblings alone"""
+        self.create_siblings(
+            [
+                ORDERING_STEP,
+                2 * ORDERING_STEP,
+                10 * ORDERING_STEP,
+                10 * ORDERING_STEP + 1,
+                10 * ORDERING_STEP + 2,
+                20 * ORDERING_STEP,
+                ORDERING_MAX - ORDERING_STEP,
+            ]
+        )
+        before = self.get_ordering_parameters()
+        around = 10 * ORDERING_STEP + 1
+        assert rebalance_siblings(self.user.id, None, str(around)) == 3
+        after = self.get_ordering_parameters()
+
+        assert [pk for pk, _ in after] == [pk for pk, _ in before]
+        changed = [a[1] != b[1] for a, b in zip(after, before)]
+        assert changed == [False, False, True, True, True, False, False]
+        values = [value for _, value in after]
+        assert all(b - a >= ORDERING_STEP for a, b in zip(values, values[1:]))
+
+        # Nothing left to do the second time around
+        assert rebalance(self.user.id, None, around) == 0
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from sky_write_app.renderers import ORJSONRenderer
+from sky_write_app.streaming import JSONArray, iter_buffered, iter_json
+
+
+class TestIterJSON(SimpleTestCase):
+    def test_output_matches_renderer(self):
+        """Test that streamed JSON is identical to ``JSONRenderer``'s"""
+
+        def get_value(lazy):
+            def array(items):
+                return JSONArray(iter(items)) if lazy else list(items)
+
+            return {
+                "files": array(
+                    [
+                        {"name": "a\u2028b", "files": array([]), "value": None},
+                        {"id": 1, "files": array([{"files": array([])}])},
+                    ]
+                ),
+                "name": "ünïcode",
+                "ordering_parameter": Decimal("1.50000000000"),
+                "next": None,
+            }
+
+        expected = JSONRenderer().render(get_value(lazy=False))
+        assert b"".join(iter_json(get_value(lazy=True))) == expected
+        assert b"".join(iter_json(None)) == b"null"
+
+    def test_buffered(self):
+        """Test that small chunks are joined up"""
+        chunks = list(iter_buffered([b"ab", b"c", b"de", b"f"], size=3))
+        assert chunks == [b"abc", b"def"]
+
+
+class TestORJSONRenderer(SimpleTestCase):
+    def test_output_matches_renderer(self):
+        """Test that orjson's output is identical to ``JSONRenderer``'s"""
+        data = {
+            "name": 'a\u2028b\u2029c ünïcode "quoted" </script>',
+            "files": [{"id": 1, "is_file": True, "files": []}],
+            "ordering_parameter": "1.50000000000",
+            "decimal": Decimal("2.5"),
+            "next": None,
+        }
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+        assert ORJSONRenderer().render(None) == b""
+
+    def test_falls_back(self):
+        """Test that what orjson can't render is rendered by
+        ``JSONRenderer``"""
+        data = {1: "integer key", "big": 2**70}
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+        context = {"indent": 2}
+        assert ORJSONRenderer().render(
+            data, renderer_context=context
+        ) == JSONRenderer().render(data, renderer_context=context)
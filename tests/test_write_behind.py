@@ -0,0 +1,121 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+from rest_framework.test import APITestCase, force_authenticate
+
+from sky_write_app.backends import LocalStorageBackend
+from sky_write_app.models import PendingContent, StorageObject
+from sky_write_app.tasks import requeue_pending_content, write_pending_content
+from sky_write_app.utils import queue_content
+from sky_write_app.views import StorageObjectDetailView, StorageObjectView
+from sky_write_django.settings import CONTENT_WRITE_MAX_ATTEMPTS
+from tests.base import LocalStorageMixin
+
+
+class TestWriteBehind(LocalStorageMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch("sky_write_app.utils.CONTENT_WRITE_BEHIND", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_note(self, content):
+        request = self.factory.post(
+            "/storage_objects/",
+            {"name": "note", "content": content, "is_file": True},
+            format="json",
+        )
+        force_authenticate(request, self.user)
+        response = StorageObjectView.as_view()(request)
+        assert response.status_code == 201
+        return StorageObject.objects.get(id=response.data["id"])
+
+    def test_content_is_written_after_commit(self):
+        """Test that content is saved as pending, served from there, and
+        written to storage once the request's transaction is committed"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            obj = self.create_note("Hello")
+        name = f"{obj.file_uuid}.txt"
+        assert not self.backend.exists(name)
+        assert len(callbacks) == 1
+
+        request = self.factory.get(f"/storage_objects/{obj.id}/")
+        force_authenticate(request, self.user)
+        response = StorageObjectDetailView.as_view()(request, pk=obj.id)
+        assert b'"content":"Hello"' in b"".join(response.streaming_content)
+
+        callbacks[0]()
+        assert self.backend.read(name) == b"Hello"
+        assert not PendingContent.objects.exists()
+
+    def test_latest_content_wins(self):
+        """Test that saving again before a write happens replaces the
+        pending content, and that an outdated write leaves it pending"""
+        with self.captureOnCommitCallbacks():
+            obj = self.create_note("First")
+        pending = PendingContent.objects.get()
+        with mock.patch.object(
+            LocalStorageBackend,
+            "write",
+            side_effect=lambda *args: PendingContent.objects.filter(
+                id=pending.id
+            ).update(content=b"Second", revision=2),
+        ):
+            write_pending_content(obj.id)
+
+        pending.refresh_from_db()
+        assert bytes(pending.content) == b"Second"
+        write_pending_content(obj.id)
+        assert self.backend.read(f"{obj.file_uuid}.txt") == b"Second"
+        assert not PendingContent.objects.exists()
+
+    def test_failed_write_stays_pending(self):
+        """Test that content stays pending when storage fails, and is
+        queued again later"""
+        with self.captureOnCommitCallbacks():
+            obj = self.create_note("Hello")
+        with mock.patch.object(LocalStorageBackend, "write", side_effect=OSError):
+            with self.assertRaises(OSError):
+                write_pending_content(obj.id)
+        assert PendingContent.objects.get().attempts == 1
+
+        PendingContent.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        assert requeue_pending_content() == 1
+        assert self.backend.read(f"{obj.file_uuid}.txt") == b"Hello"
+
+    def test_failing_write_gives_up(self):
+        """Test that content that keeps failing to be written is logged
+        and no longer queued again, until it's saved again"""
+        with self.captureOnCommitCallbacks():
+            obj = self.create_note("Hello")
+        PendingContent.objects.update(
+            attempts=CONTENT_WRITE_MAX_ATTEMPTS - 1,
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        with mock.patch.object(LocalStorageBackend, "write", side_effect=OSError):
+            with self.assertLogs("sky_write_app.tasks", "ERROR"):
+                with self.assertRaises(OSError):
+                    write_pending_content(obj.id)
+        assert PendingContent.objects.get().attempts == CONTENT_WRITE_MAX_ATTEMPTS
+        assert requeue_pending_content() == 0
+
+        # Saving again starts over.
+        with self.captureOnCommitCallbacks(execute=True):
+            queue_content(obj, b"Hello again")
+        assert self.backend.read(f"{obj.file_uuid}.txt") == b"Hello again"
+
+    def test_deleted_while_writing(self):
+        """Test that content written for a file that was deleted in the
+        meantime is deleted again"""
+        with self.captureOnCommitCallbacks():
+            obj = self.create_note("Hello")
+        write = LocalStorageBackend.write
+
+        def write_and_delete(backend, name, content):
+            write(backend, name, content)
+            StorageObject.objects.filter(id=obj.id).delete()
+
+        with mock.patch.object(LocalStorageBackend, "write", write_and_delete):
+            write_pending_content(obj.id)
+        assert not self.backend.exists(f"{obj.file_uuid}.txt")
@@ -0,0 +1,56 @@
+import hashlib
+
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from sky_write_django.settings import AUTH_TOKEN_CACHE_TIMEOUT
+
+
+def get_token_cache_key(key):
+    # Tokens are credentials, so they aren't stored in the cache as they are.
+    return f"auth-token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def invalidate_tokens(keys):
+    cache.delete_many([get_token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that keeps each authenticated user and token in
+    the cache for ``AUTH_TOKEN_CACHE_TIMEOUT`` seconds, so repeat requests
+    don't query the database.
+
+    Tokens are removed from the cache when they're deleted (on logout or
+    rotation) and when their user or the user's config is saved. Without a
+    shared cache (``CACHE_URL``), nothing is cached, as removing a token
+    would only remove it from one process's cache.
+    """
+
+    def authenticate_credentials(self, key):
+        if not AUTH_TOKEN_CACHE_TIMEOUT:
+            return self.load_credentials(key)
+        cache_key = get_token_cache_key(key)
+        credentials = cache.get(cache_key)
+        if credentials is None:
+            credentials = self.load_credentials(key)
+            cache.set(cache_key, credentials, AUTH_TOKEN_CACHE_TIMEOUT)
+        return credentials
+
+    def load_credentials(self, key):
+        """Fetch the token with its user and the user's config, which
+        almost every view needs, in one query."""
+        try:
+            token = (
+                self.get_model()
+                .objects.select_related("user__custom_config")
+                .get(key=key)
+            )
+        except ObjectDoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return token.user, token
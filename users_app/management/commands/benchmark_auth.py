@@ -0,0 +1,63 @@
+import base64
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import BasicAuthentication, TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from sky_write_app.management.benchmark import BenchmarkCommand
+from users_app.authentication import CachedTokenAuthentication, invalidate_tokens
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Compare the time and queries per request spent authenticating with "
+        "HTTP basic authentication, token authentication, and cached token "
+        "authentication. The benchmark user is created in a transaction that "
+        "is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=1000)
+        parser.add_argument(
+            "--basic-repeat",
+            type=int,
+            default=10,
+            help="Requests made with basic authentication, which is much slower.",
+        )
+
+    def run(self, options):
+        password = "benchmark password"
+        user = User.objects.create_user("benchmark auth user", password=password)
+        token = Token.objects.create(user=user)
+        invalidate_tokens([token.key])
+        credentials = base64.b64encode(f"{user.username}:{password}".encode()).decode()
+
+        factory = RequestFactory()
+        token_request = factory.get("/me/", HTTP_AUTHORIZATION=f"Token {token.key}")
+        basic_request = factory.get("/me/", HTTP_AUTHORIZATION=f"Basic {credentials}")
+        cached = CachedTokenAuthentication()
+        authenticators = [
+            ("basic", BasicAuthentication(), basic_request, options["basic_repeat"]),
+            ("token", TokenAuthentication(), token_request, options["repeat"]),
+            # The first request fills the cache.
+            ("cached token, first request", cached, token_request, 1),
+            ("cached token", cached, token_request, options["repeat"]),
+        ]
+
+        try:
+            for name, authenticator, request, repeat in authenticators:
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for _ in range(repeat):
+                        assert authenticator.authenticate(request)[0] == user
+                    seconds = (time.perf_counter() - start) / repeat
+                self.stdout.write(
+                    f"{name}: {seconds * 1_000_000:.1f} µs, "
+                    f"{len(queries) / repeat:g} queries per request"
+                )
+        finally:
+            invalidate_tokens([token.key])
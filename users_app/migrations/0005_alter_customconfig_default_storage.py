@@ -0,0 +1,26 @@
+# Generated by Django 4.0.5 on 2026-10-18 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users_app", "0004_customconfig_last_file"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="customconfig",
+            name="default_storage",
+            field=models.CharField(
+                choices=[
+                    (None, "(Not selected)"),
+                    ("LS", "Local Storage"),
+                    ("DX", "Dropbox"),
+                    ("S3", "S3"),
+                ],
+                max_length=2,
+            ),
+        ),
+    ]
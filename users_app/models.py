@@ -8,6 +8,7 @@ class DefaultStorage(models.TextChoices):
 
     LOCAL_STORAGE = "LS", _("Local Storage")  # For development only; not for production
     DROPBOX = "DX", _("Dropbox")
+    S3 = "S3", _("S3")
 
     __empty__ = _("(Not selected)")
 
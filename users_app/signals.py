@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users_app.authentication import invalidate_tokens
+from users_app.models import CustomConfig
+
+
+def invalidate_on_commit(keys):
+    """Invalidate cached tokens once the change to them is committed.
+    Invalidating any sooner would let a concurrent request cache the
+    old token again before the change is visible to it."""
+    keys = list(keys)
+    transaction.on_commit(lambda: invalidate_tokens(keys))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_on_commit([instance.key])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Cached tokens hold a copy of their user, which may now be stale
+    (or inactive)."""
+    if not created:
+        invalidate_on_commit(
+            Token.objects.filter(user=instance).values_list("key", flat=True)
+        )
+
+
+@receiver(post_save, sender=CustomConfig)
+@receiver(post_delete, sender=CustomConfig)
+def invalidate_config_tokens(sender, instance, **kwargs):
+    """Cached tokens also hold a copy of their user's config."""
+    invalidate_on_commit(
+        Token.objects.filter(user_id=instance.user_id).values_list("key", flat=True)
+    )
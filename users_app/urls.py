@@ -24,6 +24,11 @@ urlpatterns = [
         views.StorageOptionsView.as_view(),
         name="storage-options",
     ),
+    path(
+        "logout/",
+        views.LogoutView.as_view(),
+        name="logout",
+    ),
     path(
         "dropbox_resolution/",
         views.DropboxResolutionView.as_view(),
@@ -1,12 +1,12 @@
 from django.contrib.auth.models import User
 from django.http import HttpResponseRedirect
 from rest_framework import generics, views
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from sky_write_app.utils import get_dropbox_auth_flow
-from sky_write_django.settings import DBX_APP_KEY, DEV, SECRET_KEY, UI_URI
+from sky_write_django.settings import DBX_APP_KEY, DEV, S3_BUCKET, SECRET_KEY, UI_URI
+from users_app.authentication import CachedTokenAuthentication
 from users_app.models import CustomConfig, DefaultStorage
 from users_app.serializers import ConfigForUISerializer, KeySerializer, UserSerializer
 
@@ -27,7 +27,7 @@ class UserCreationView(generics.CreateAPIView):
 
 class KeyCreationView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     serializer_class = KeySerializer
 
     def post(self, request, *args, **kwargs):
@@ -43,7 +43,7 @@ class KeyCreationView(generics.CreateAPIView):
 
 class ConfigRetrieveView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     serializer_class = ConfigForUISerializer
 
     def get_queryset(self):
@@ -78,17 +78,32 @@ class ConfigRetrieveView(generics.RetrieveUpdateAPIView):
 
 class StorageOptionsView(views.APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     @staticmethod
     def get(_request):
         storage_options = {}
         for item in list(DefaultStorage):
-            if DEV or item.value != "LS":
-                storage_options[str(item.label)] = item.value
+            if item.value == "LS" and not DEV:
+                continue
+            if item.value == "S3" and S3_BUCKET is None:
+                continue
+            storage_options[str(item.label)] = item.value
         return Response(storage_options)
 
 
+class LogoutView(views.APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CachedTokenAuthentication]
+
+    @staticmethod
+    def post(request):
+        """Delete the token the request was made with. Logging in again
+        creates a new one."""
+        request.auth.delete()
+        return Response(status=204)
+
+
 class DropboxResolutionView(views.APIView):
     @staticmethod
     def get(request):